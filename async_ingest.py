@@ -0,0 +1,44 @@
+import asyncio
+import data_handler
+import instrumentation
+import main
+
+"""
+Concurrent ingestion of the three input files with asyncio. The sonar, GNSS and speed of sound files
+are read and parsed at the same time in worker threads (on network storage most of the time is spent waiting
+for the data), then the auxiliary data is connected to the pings in one join step.
+"""
+
+
+async def read_auxiliary_columns(filename, frequency, headers, metrics=None):
+    """Reads a file without timestamps in a worker thread, see data_handler.read_data_columns."""
+    return await asyncio.to_thread(data_handler.read_data_columns, filename, main.START_TIME, frequency, headers, metrics)
+
+
+async def ingest_files(sonar_filename, gnss_filename, speed_of_sound_filename, alignment="nearest", metrics=None):
+    """
+    Reads the three files concurrently, and returns the extended sonar data as a columnar.SonarColumns container,
+    the same as main.get_sonar_columns would return for these files.
+    """
+    if alignment not in main.ALIGNMENTS:
+        raise ValueError('Unknown alignment: ', alignment)
+    sources = [(gnss_filename, main.GNSS_FREQUENCY, main.GNSS_HEADERS),
+               (speed_of_sound_filename, main.SPEED_OF_SOUND_FREQUENCY, main.SPEED_OF_SOUND_HEADERS)]
+    sonar_columns, *auxiliary_columns = await asyncio.gather(
+        asyncio.to_thread(data_handler.read_sonar_columns, sonar_filename, main.START_TIME, metrics),
+        *[read_auxiliary_columns(filename, frequency, headers, metrics) for filename, frequency, headers in sources])
+    with instrumentation.stage(metrics, "join", len(sonar_columns)):
+        for (filename, frequency, headers), (other_columns, lines_skipped) in zip(sources, auxiliary_columns):
+            if alignment == "interpolate":
+                data_handler.interpolate_sonar_columns(sonar_columns, other_columns, headers, main.ANGULAR_HEADERS)
+            else:
+                data_handler.extend_sonar_columns(sonar_columns, other_columns, headers, frequency, lines_skipped)
+    return sonar_columns
+
+
+def get_sonar_columns(alignment="nearest", metrics=None):
+    """
+    Concurrent version of main.get_sonar_columns, reads the files defined by the constants of the main module.
+    """
+    print("Collecting data...")
+    return asyncio.run(ingest_files(main.SONAR_FILENAME, main.GNSS_FILENAME, main.SPEED_OF_SOUND_FILENAME, alignment, metrics))
@@ -0,0 +1,27 @@
+import unittest
+import asyncio
+import async_ingest
+import main
+import fixtures
+
+
+class AsyncIngestTest(unittest.TestCase):
+
+    def test_0_ingest_files_same_as_get_sonar_columns(self):
+        with fixtures.temporary_survey():
+            for alignment in main.ALIGNMENTS:
+                expected_outcome = main.get_sonar_columns(alignment)
+                actual_value = asyncio.run(async_ingest.ingest_files(main.SONAR_FILENAME, main.GNSS_FILENAME,
+                                                                     main.SPEED_OF_SOUND_FILENAME, alignment))
+                self.assertEqual(expected_outcome.time.tolist(), actual_value.time.tolist())
+                for header in main.GNSS_HEADERS + main.SPEED_OF_SOUND_HEADERS:
+                    self.assertEqual(expected_outcome.ping_values[header].tolist(), actual_value.ping_values[header].tolist())
+
+
+    def test_1_ingest_files_unknown_alignment(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(async_ingest.ingest_files("sonar.txt", "gnss.txt", "speed_of_sound.txt", "unknown"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+import main
+import vectorized_locator
+
+"""
+Command-line entry point for processing many survey lines at once. A survey line is a set of sonar, GNSS and
+speed of sound files, found in a directory tree: every file that ends with the name of the sonar file (sonar.txt,
+for example line_012_sonar.txt) is a survey line, its other files have the same prefix (line_012_gnss.txt).
+If a line has no own GNSS or speed of sound file, the unprefixed file of its directory is used (gnss.txt),
+so for example one speed of sound file can be shared by the lines of a directory.
+The lines are processed in a process pool, the largest lines (by the total size of their files) are started first,
+so the workers finish at about the same time. Every line gets its own output directory, with the messages
+of the processing (corrupted lines) in a log file, and a summary of all lines is written into the output directory.
+Usage: python batch.py survey_directory --output located_points --workers 8
+"""
+
+SONAR_SUFFIX = os.path.basename(main.SONAR_FILENAME)
+GNSS_SUFFIX = os.path.basename(main.GNSS_FILENAME)
+SPEED_OF_SOUND_SUFFIX = os.path.basename(main.SPEED_OF_SOUND_FILENAME)
+LOG_FILENAME = "log.txt"
+SUMMARY_FILENAME = "summary.json"
+
+
+@dataclass
+class SurveyLine:
+    """The input files of a survey line and its output directory."""
+    name: str
+    sonar_filename: str
+    gnss_filename: str
+    speed_of_sound_filename: str
+    output_directory: str
+
+    def get_size(self):
+        """The total size of the input files in bytes, the estimate of the processing time."""
+        return sum(os.path.getsize(filename) for filename in [self.sonar_filename, self.gnss_filename, self.speed_of_sound_filename]
+                   if os.path.exists(filename))
+
+
+def find_survey_lines(directory, output_directory=main.OUTPUT_DIRECTORY):
+    """
+    Finds the survey lines in the directory and its subdirectories, ordered by name.
+    The name of a line is its directory (relative to the searched directory) and the prefix of its files,
+    the output of the line is written into the directory with the same name in output_directory.
+    """
+    survey_lines = []
+    for path, directories, filenames in os.walk(directory):
+        directories.sort()
+        for filename in sorted(filenames):
+            if not filename.endswith(SONAR_SUFFIX):
+                continue
+            prefix = filename[:-len(SONAR_SUFFIX)]
+            relative_path = os.path.relpath(path, directory)
+            name = os.path.normpath(os.path.join(relative_path, prefix.rstrip("_-.") or "."))
+            if name == ".":
+                name = os.path.basename(os.path.abspath(directory))
+            other_filenames = []
+            for suffix in [GNSS_SUFFIX, SPEED_OF_SOUND_SUFFIX]:
+                other_filename = os.path.join(path, prefix + suffix)
+                other_filenames.append(other_filename if os.path.exists(other_filename) else os.path.join(path, suffix))
+            survey_lines.append(SurveyLine(name, os.path.join(path, filename), other_filenames[0], other_filenames[1],
+                                           os.path.join(output_directory, name)))
+    return sorted(survey_lines, key=lambda survey_line: survey_line.name)
+
+
+def order_by_size(survey_lines):
+    """
+    Orders the lines for the scheduler: the largest first (longest processing time first), so the small lines
+    fill the gaps at the end, and no worker gets a large line when the others are already finished.
+    """
+    return sorted(survey_lines, key=lambda survey_line: survey_line.get_size(), reverse=True)
+
+
+def process_survey_line(survey_line, settings={}):
+    """
+    Processes one survey line with main.main: the filenames, the output directory and the settings
+    (values of the constants of main, by name) are set for the time of the processing.
+    The messages are written into the log file of the line. An error does not stop the other lines,
+    it is returned in the result: the name of the line, the number of points, the wall time and the error (or None).
+    """
+    constants = dict(settings, SONAR_FILENAME=survey_line.sonar_filename, GNSS_FILENAME=survey_line.gnss_filename,
+                     SPEED_OF_SOUND_FILENAME=survey_line.speed_of_sound_filename, OUTPUT_DIRECTORY=survey_line.output_directory)
+    original_constants = {name: getattr(main, name) for name in constants}
+    result = {"line": survey_line.name, "sonar_filename": survey_line.sonar_filename, "points": None, "error": None}
+    start = time.perf_counter()
+    with io.StringIO() as output:
+        try:
+            for name, value in constants.items():
+                setattr(main, name, value)
+            with contextlib.redirect_stdout(output):
+                result["points"] = main.main()
+        except Exception as exception:
+            result["error"] = repr(exception)
+            output.write(traceback.format_exc())
+        finally:
+            for name, value in original_constants.items():
+                setattr(main, name, value)
+        result["wall_time"] = time.perf_counter() - start
+        os.makedirs(survey_line.output_directory, exist_ok=True)
+        with open(os.path.join(survey_line.output_directory, LOG_FILENAME), "w") as log_file:
+            log_file.write(output.getvalue())
+    return result
+
+
+def process_survey_lines(survey_lines, settings={}, workers=None):
+    """
+    Processes the lines in a process pool of the given number of workers (None means one for every core),
+    or one after the other if workers is 1. The lines are submitted by order_by_size.
+    Prints a message when a line is finished, and returns the results in the order of the lines.
+    """
+    results = {}
+
+    def report(result):
+        results[result["line"]] = result
+        if result["error"] is None:
+            print("Finished ", result["line"], ": ", result["points"], " points in ", round(result["wall_time"], 2), " s")
+        else:
+            print("Failed ", result["line"], ": ", result["error"])
+
+    if workers == 1:
+        for survey_line in order_by_size(survey_lines):
+            report(process_survey_line(survey_line, settings))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_survey_line, survey_line, settings) for survey_line in order_by_size(survey_lines)]
+            for future in as_completed(futures):
+                report(future.result())
+    return [results[survey_line.name] for survey_line in survey_lines]
+
+
+def get_settings(arguments):
+    """Converts the command-line arguments into the values of the constants of main."""
+    settings = {}
+    if arguments.time_window is not None:
+        settings["TIME_WINDOW"] = tuple(arguments.time_window)
+    if arguments.ping_window is not None:
+        settings["PING_WINDOW"] = tuple(arguments.ping_window)
+    if arguments.grid_resolution is not None:
+        settings["GRID_RESOLUTION"] = arguments.grid_resolution
+    if arguments.attitude_model is not None:
+        settings["ATTITUDE_MODEL"] = arguments.attitude_model
+    if arguments.sound_velocity_profile is not None:
+        settings["SOUND_VELOCITY_PROFILE_FILENAME"] = os.path.abspath(arguments.sound_velocity_profile)
+    if arguments.no_cache:
+        settings["CACHE_DIRECTORY"] = None
+    return settings
+
+
+def run(directory, output_directory=main.OUTPUT_DIRECTORY, settings={}, workers=None):
+    """
+    Finds and processes the survey lines of the directory, and writes the summary of the results
+    into the output directory. Returns the results.
+    """
+    survey_lines = find_survey_lines(directory, output_directory)
+    if survey_lines == []:
+        print("No survey lines found in ", directory)
+        return []
+    print("Processing ", len(survey_lines), " survey lines...")
+    results = process_survey_lines(survey_lines, settings, workers)
+    os.makedirs(output_directory, exist_ok=True)
+    with open(os.path.join(output_directory, SUMMARY_FILENAME), "w") as summary_file:
+        json.dump(results, summary_file, indent=2)
+    failed = [result["line"] for result in results if result["error"] is not None]
+    print("Finished, ", len(results) - len(failed), " lines processed, ", len(failed), " failed, ",
+          sum(result["points"] or 0 for result in results), " points written to ", output_directory)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Locates the points of every survey line found in a directory.")
+    parser.add_argument("directory", help="directory of the survey lines (searched recursively for *" + SONAR_SUFFIX + " files)")
+    parser.add_argument("--output", default=main.OUTPUT_DIRECTORY, help="output directory, every line gets a subdirectory")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: one for every core)")
+    parser.add_argument("--time-window", type=float, nargs=2, metavar=("START", "END"), help="process only the pings of the time window")
+    parser.add_argument("--ping-window", type=int, nargs=2, metavar=("FIRST", "END"), help="process only the pings of the ping window")
+    parser.add_argument("--grid-resolution", type=float, help="grid the located points with the resolution in meters")
+    parser.add_argument("--attitude-model", choices=vectorized_locator.ATTITUDE_MODELS, help="georeferencing model")
+    parser.add_argument("--sound-velocity-profile", help="sound velocity profile file, the rays are bent according to it")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the result cache")
+    arguments = parser.parse_args()
+    results = run(arguments.directory, arguments.output, get_settings(arguments), arguments.workers)
+    raise SystemExit(1 if any(result["error"] is not None for result in results) else 0)
@@ -0,0 +1,80 @@
+import unittest
+import os
+import io
+import json
+import shutil
+import tempfile
+import contextlib
+import batch
+import benchmark
+import point_writer
+
+
+def create_survey_lines(directory):
+    """Two lines in subdirectories, and two lines with prefixed files sharing one speed of sound file."""
+    for line_directory, duration in [(os.path.join(directory, "day_1"), 3), (os.path.join(directory, "day_2", "line_a"), 1)]:
+        os.makedirs(line_directory)
+        benchmark.generate_survey(line_directory, duration, 8)
+    for prefix, duration in [("line_b_", 2), ("line_c_", 4)]:
+        for filename in benchmark.generate_survey(directory, duration, 4, seed=duration):
+            shutil.move(filename, os.path.join(directory, prefix + os.path.basename(filename)))
+    os.remove(os.path.join(directory, "line_b_speed_of_sound.txt"))
+    os.rename(os.path.join(directory, "line_c_speed_of_sound.txt"), os.path.join(directory, "speed_of_sound.txt"))
+
+
+class BatchTest(unittest.TestCase):
+
+    def test_0_find_survey_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            create_survey_lines(directory)
+            survey_lines = batch.find_survey_lines(directory, "output")
+        self.assertEqual(["day_1", os.path.join("day_2", "line_a"), "line_b", "line_c"], [survey_line.name for survey_line in survey_lines])
+        self.assertEqual(os.path.join("output", "day_2", "line_a"), survey_lines[1].output_directory)
+        self.assertEqual(["line_b_gnss.txt", "speed_of_sound.txt"],
+                         [os.path.basename(survey_lines[2].gnss_filename), os.path.basename(survey_lines[2].speed_of_sound_filename)])
+
+
+    def test_1_order_by_size(self):
+        with tempfile.TemporaryDirectory() as directory:
+            create_survey_lines(directory)
+            survey_lines = batch.order_by_size(batch.find_survey_lines(directory))
+            sizes = [survey_line.get_size() for survey_line in survey_lines]
+        self.assertEqual(sorted(sizes, reverse=True), sizes)
+        self.assertEqual("line_c", survey_lines[0].name)
+
+
+    def test_2_process_survey_lines(self):
+        with tempfile.TemporaryDirectory() as directory:
+            create_survey_lines(directory)
+            os.remove(os.path.join(directory, "line_b_gnss.txt"))
+            output_directory = os.path.join(directory, "output")
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                results = batch.run(directory, output_directory, {"CACHE_DIRECTORY": None}, workers=1)
+            with open(os.path.join(output_directory, batch.SUMMARY_FILENAME)) as summary_file:
+                summary = json.load(summary_file)
+            points = point_writer.read_located_points(os.path.join(output_directory, "day_1"), mmap_mode=None)
+            with open(os.path.join(output_directory, "line_b", batch.LOG_FILENAME)) as log_file:
+                log = log_file.read()
+        self.assertEqual(results, summary)
+        self.assertEqual([3 * 10 * 8, 10 * 8, None, 4 * 10 * 4], [result["points"] for result in results])
+        self.assertEqual(len(points["X"]), results[0]["points"])
+        self.assertIn("ValueError", results[2]["error"])
+        self.assertIn("Invalid filename provided", log)
+        self.assertIn("Failed  line_b", output.getvalue())
+
+
+    def test_3_parallel_matches_sequential(self):
+        with tempfile.TemporaryDirectory() as directory:
+            create_survey_lines(directory)
+            all_points = []
+            for workers in [1, 2]:
+                output_directory = os.path.join(directory, "output_" + str(workers))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = batch.run(directory, output_directory, {"CACHE_DIRECTORY": None}, workers)
+                all_points.append([point_writer.read_located_points(os.path.join(output_directory, result["line"]), mmap_mode=None)["X"].tolist()
+                                   for result in results])
+        self.assertEqual(all_points[0], all_points[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import argparse
+import contextlib
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from math import cos
+import numpy as np
+import columnar
+import data_handler
+import main
+import projection
+
+"""
+Benchmark for the data_handler -> main pipeline. It generates synthetic sonar, GNSS and speed of sound files
+with configurable duration, beam count and corruption rate, then measures every stage of the record based
+(Decimal) and the columnar (numpy) pipeline: wall time, pings per second, soundings per second and peak memory.
+Usage: python benchmark.py --duration 60 --beams 256
+"""
+
+SONAR_FREQUENCY = 10
+START_TIMESTAMP = 1000.0
+WATER_DEPTH = 20
+SPEED_OF_SOUND = 1480.0
+
+
+def corrupt(value, corruption_rate, generator):
+    """Returns an invalid value instead of the original one with the given probability."""
+    return "corrupted" if generator.random() < corruption_rate else value
+
+
+def generate_sonar_file(filename, duration, beam_count, corruption_rate=0, seed=0):
+    """
+    Generates a sonar file with SONAR_FREQUENCY pings per second and beam_count angle/sample index pairs per ping.
+    The sample indexes are calculated from a flat seabed at WATER_DEPTH meters.
+    Corrupted timestamps and pairs are generated with the given probability.
+    """
+    generator = random.Random(seed)
+    angles = np.linspace(-1, 1, beam_count)
+    sample_indexes = np.round(WATER_DEPTH / np.cos(angles) * 2 / SPEED_OF_SOUND * main.SAMPLE_FREQUENCY).astype(int)
+    pairs = ["%.6f,%d" % (angle, sample_index) for angle, sample_index in zip(angles, sample_indexes)]
+    with open(filename, "w") as sonar_file:
+        sonar_file.write("# Time (s)\tAngle (rad),Sample index\n")
+        for ping in range(int(duration * SONAR_FREQUENCY)):
+            timestamp = corrupt("%.3f" % (START_TIMESTAMP + ping / SONAR_FREQUENCY), corruption_rate, generator)
+            ping_pairs = [corrupt(pair, corruption_rate, generator) for pair in pairs] if corruption_rate > 0 else pairs
+            sonar_file.write(timestamp + "\t" + " ".join(ping_pairs) + "\n")
+
+
+def generate_gnss_file(filename, duration, corruption_rate=0, seed=0):
+    """
+    Generates a GNSS file with main.GNSS_FREQUENCY lines per second: a vessel moving north
+    with slowly changing attitude. Corrupted fields are generated with the given probability.
+    """
+    generator = random.Random(seed)
+    with open(filename, "w") as gnss_file:
+        gnss_file.write("# Roll (rad)\tPitch (rad)\tHeading (rad)\tLatitude (rad)\tLongitude (rad)\tAltitude (m)\tHeave (m)\n")
+        for index in range(int(duration * main.GNSS_FREQUENCY) + 1):
+            elapsed = index / main.GNSS_FREQUENCY
+            values = ["%.15g" % value for value in [0.03 * cos(elapsed), 0.01 * cos(elapsed / 3), 0.5 + 0.001 * elapsed,
+                                                     0.796 + 1e-7 * elapsed, -2.14 + 1e-8 * elapsed, -20.3, 0.003 * cos(elapsed)]]
+            gnss_file.write("\t".join(corrupt(value, corruption_rate, generator) for value in values) + "\n")
+
+
+def generate_speed_of_sound_file(filename, duration):
+    """Generates a speed of sound file with main.SPEED_OF_SOUND_FREQUENCY lines per second."""
+    with open(filename, "w") as speed_file:
+        speed_file.write("# m/s\n")
+        for index in range(int(duration * main.SPEED_OF_SOUND_FREQUENCY) + 1):
+            speed_file.write("%.2f\n" % (SPEED_OF_SOUND + 0.01 * index))
+
+
+def generate_survey(directory, duration, beam_count, corruption_rate=0, seed=0):
+    """
+    Generates the three input files into the directory.
+    Returns the filenames of the sonar, GNSS and speed of sound files.
+    """
+    filenames = [os.path.join(directory, filename) for filename in ["sonar.txt", "gnss.txt", "speed_of_sound.txt"]]
+    generate_sonar_file(filenames[0], duration, beam_count, corruption_rate, seed)
+    generate_gnss_file(filenames[1], duration, corruption_rate, seed)
+    generate_speed_of_sound_file(filenames[2], duration)
+    return filenames
+
+
+def measure(function, measure_memory=True):
+    """
+    Calls the function and measures its wall time, the messages of the function (about corrupted lines) are hidden.
+    If measure_memory is set, the function is called again with tracemalloc running to get the peak memory usage
+    (tracemalloc would slow down the first measurement).
+    Returns the result of the function, the wall time in seconds and the peak memory in bytes (or None).
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        result = function()
+        wall_time = time.perf_counter() - start
+        peak_memory = None
+        if measure_memory:
+            tracemalloc.start()
+            function()
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, wall_time, peak_memory
+
+
+def run_benchmark(duration=60, beam_count=256, corruption_rate=0, include_decimal=True, measure_memory=True, seed=0):
+    """
+    Generates a synthetic survey and measures every stage of the pipeline on it.
+    Returns an array of dictionaries, one for each stage, with the stage name, the wall time,
+    the number of pings and soundings processed per second, and the peak memory.
+    """
+    results = []
+
+    def add_result(stage, function, ping_count=None, sounding_count=None):
+        result, wall_time, peak_memory = measure(function, measure_memory)
+        ping_count = len(result) if ping_count is None else ping_count
+        if sounding_count is None and isinstance(result, columnar.SonarColumns):
+            sounding_count = result.beam_count
+        results.append({
+            "stage": stage,
+            "wall_time": wall_time,
+            "pings_per_second": ping_count / wall_time if wall_time > 0 else None,
+            "soundings_per_second": sounding_count / wall_time if sounding_count and wall_time > 0 else None,
+            "peak_memory": peak_memory
+        })
+        return result
+
+    with tempfile.TemporaryDirectory() as directory:
+        sonar_filename, gnss_filename, speed_filename = generate_survey(directory, duration, beam_count, corruption_rate, seed)
+
+        sonar_columns = add_result("read_sonar_columns", lambda: data_handler.read_sonar_columns(sonar_filename, main.START_TIME))
+        ping_count, sounding_count = len(sonar_columns), sonar_columns.beam_count
+        gnss_columns, gnss_skipped = add_result("read_data_columns (gnss)", lambda: data_handler.read_data_columns(
+            gnss_filename, main.START_TIME, main.GNSS_FREQUENCY, main.GNSS_HEADERS), ping_count)
+        speed_columns, speed_skipped = data_handler.read_data_columns(speed_filename, main.START_TIME, main.SPEED_OF_SOUND_FREQUENCY,
+                                                                      main.SPEED_OF_SOUND_HEADERS)
+        add_result("extend_sonar_columns (gnss)", lambda: data_handler.extend_sonar_columns(
+            sonar_columns, gnss_columns, main.GNSS_HEADERS, main.GNSS_FREQUENCY, gnss_skipped), ping_count)
+        data_handler.extend_sonar_columns(sonar_columns, speed_columns, main.SPEED_OF_SOUND_HEADERS, main.SPEED_OF_SOUND_FREQUENCY, speed_skipped)
+        add_result("transform_coordinates_bulk", lambda: projection.transform_coordinates_bulk(
+            sonar_columns.ping_values["longitude"], sonar_columns.ping_values["latitude"])[0], ping_count)
+        add_result("locate_columns", lambda: main.locate_columns(sonar_columns), ping_count, sounding_count)
+
+        if include_decimal:
+            sonar_data = add_result("read_sonar_data", lambda: data_handler.read_sonar_data(sonar_filename, main.START_TIME),
+                                    ping_count, sounding_count)
+            gnss_data, gnss_skipped = add_result("read_data (gnss)", lambda: data_handler.read_data(
+                gnss_filename, main.START_TIME, main.GNSS_FREQUENCY, main.GNSS_HEADERS), ping_count)
+            speed_data, speed_skipped = data_handler.read_data(speed_filename, main.START_TIME, main.SPEED_OF_SOUND_FREQUENCY,
+                                                               main.SPEED_OF_SOUND_HEADERS)
+            add_result("extend_sonar_data (gnss)", lambda: data_handler.extend_sonar_data(
+                sonar_data, gnss_data, main.GNSS_HEADERS, main.GNSS_FREQUENCY, gnss_skipped))
+            data_handler.extend_sonar_data(sonar_data, speed_data, main.SPEED_OF_SOUND_HEADERS, main.SPEED_OF_SOUND_FREQUENCY, speed_skipped)
+            add_result("transform_coordinates", lambda: [main.transform_coordinates(data_line["longitude"], data_line["latitude"])
+                                                         for data_line in sonar_data])
+            add_result("locate_points", lambda: [main.locate_points(data_line) for data_line in sonar_data], ping_count, sounding_count)
+    return results
+
+
+def print_results(results):
+    """Prints the results of run_benchmark as a table."""
+    print("%-30s %12s %14s %18s %16s" % ("stage", "wall time (s)", "pings/s", "soundings/s", "peak memory (MB)"))
+    for result in results:
+        print("%-30s %12.4f %14s %18s %16s" % (
+            result["stage"], result["wall_time"],
+            "-" if result["pings_per_second"] is None else "%.0f" % result["pings_per_second"],
+            "-" if result["soundings_per_second"] is None else "%.0f" % result["soundings_per_second"],
+            "-" if result["peak_memory"] is None else "%.1f" % (result["peak_memory"] / 1e6)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark of the point locator pipeline on synthetic survey data.")
+    parser.add_argument("--duration", type=float, default=60, help="duration of the survey in seconds")
+    parser.add_argument("--beams", type=int, default=256, help="number of beams per ping")
+    parser.add_argument("--corruption-rate", type=float, default=0, help="probability of a corrupted field")
+    parser.add_argument("--skip-decimal", action="store_true", help="do not measure the Decimal based pipeline")
+    parser.add_argument("--skip-memory", action="store_true", help="do not measure the peak memory")
+    arguments = parser.parse_args()
+    print_results(run_benchmark(arguments.duration, arguments.beams, arguments.corruption_rate,
+                                not arguments.skip_decimal, not arguments.skip_memory))
@@ -0,0 +1,42 @@
+import unittest
+import tempfile
+import benchmark
+import data_handler
+import main
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_0_generate_survey_sizes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sonar_filename, gnss_filename, speed_filename = benchmark.generate_survey(directory, 2, 16)
+            sonar_columns = data_handler.read_sonar_columns(sonar_filename, 0)
+            gnss_columns, lines_skipped = data_handler.read_data_columns(gnss_filename, 0, main.GNSS_FREQUENCY, main.GNSS_HEADERS)
+        self.assertEqual(2 * benchmark.SONAR_FREQUENCY, len(sonar_columns))
+        self.assertEqual(2 * benchmark.SONAR_FREQUENCY * 16, sonar_columns.beam_count)
+        self.assertEqual(2 * main.GNSS_FREQUENCY + 1, len(gnss_columns))
+        self.assertFalse(lines_skipped)
+
+
+    def test_1_generate_survey_corrupted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sonar_filename, gnss_filename, speed_filename = benchmark.generate_survey(directory, 2, 16, corruption_rate=0.2)
+            sonar_columns = benchmark.measure(lambda: data_handler.read_sonar_columns(sonar_filename, 0), False)[0]
+            gnss_columns, lines_skipped = benchmark.measure(lambda: data_handler.read_data_columns(
+                gnss_filename, 0, main.GNSS_FREQUENCY, main.GNSS_HEADERS), False)[0]
+        self.assertLess(sonar_columns.beam_count, 2 * benchmark.SONAR_FREQUENCY * 16)
+        self.assertTrue(lines_skipped)
+
+
+    def test_2_run_benchmark_stages(self):
+        results = benchmark.run_benchmark(duration=1, beam_count=8)
+        stages = [result["stage"] for result in results]
+        self.assertIn("locate_columns", stages)
+        self.assertIn("locate_points", stages)
+        for result in results:
+            self.assertGreater(result["wall_time"], 0)
+            self.assertIsNotNone(result["peak_memory"])
+
+
+if __name__ == '__main__':
+    unittest.main()
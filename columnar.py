@@ -0,0 +1,202 @@
+from dataclasses import dataclass, field
+import numpy as np
+
+"""
+Compact columnar (struct of arrays) representation of the data. Instead of one dictionary of Decimals
+for every line and every angle/sample index pair, the values are stored in typed numpy arrays.
+The beams of all pings are stored in flat arrays, the ping_offsets array tells where the beams of each ping start:
+the beams of the i-th ping are between ping_offsets[i] and ping_offsets[i + 1].
+The record based representation (arrays of dictionaries) can be converted to and from these containers.
+"""
+
+
+def create_ping_offsets(beam_counts):
+    """
+    Creates the ping offsets array from the number of beams of each ping.
+    """
+    ping_offsets = np.zeros(len(beam_counts) + 1, dtype=np.int64)
+    np.cumsum(beam_counts, out=ping_offsets[1:])
+    return ping_offsets
+
+
+@dataclass
+class TimeSeriesColumns:
+    """
+    Data without beams (GNSS, speed of sound): one time value and one value for each header per line.
+    """
+    time: np.ndarray
+    values: dict = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.time)
+
+    @classmethod
+    def from_records(cls, data, headers):
+        """
+        Creates the container from the output of data_handler.read_data.
+        """
+        time = np.fromiter((data_line["time"] for data_line in data), dtype=np.float64, count=len(data))
+        values = {header: np.fromiter((data_line[header] for data_line in data), dtype=np.float64, count=len(data))
+                  for header in headers}
+        return cls(time, values)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Joins consecutive parts of the data into one container.
+        """
+        return cls(np.concatenate([part.time for part in parts]),
+                   {header: np.concatenate([part.values[header] for part in parts]) for header in parts[0].values})
+
+
+@dataclass
+class SonarColumns:
+    """
+    Sonar data: the time of each ping, the angle and sample index of each beam, and the ping offsets.
+    The values connected to the pings from other data (attitude, position, speed of sound)
+    are stored in ping_values, one array for each header, with one element per ping.
+    The two way travel time of each beam (the sample index divided by the sample frequency) is optional,
+    if it is calculated in advance, the distances are calculated from it.
+    """
+    time: np.ndarray
+    ping_offsets: np.ndarray
+    angle: np.ndarray
+    sample_index: np.ndarray
+    ping_values: dict = field(default_factory=dict)
+    travel_time: np.ndarray = None
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def beam_count(self):
+        return int(self.ping_offsets[-1])
+
+    def beam_counts(self):
+        """Returns the number of beams of each ping."""
+        return np.diff(self.ping_offsets)
+
+    def repeat_for_beams(self, ping_array):
+        """Repeats a per ping array, so it has one element for every beam."""
+        return np.repeat(ping_array, self.beam_counts())
+
+    def select_pings(self, start, end):
+        """
+        Returns the pings between start and end as a new container. The arrays are views, nothing is copied,
+        except the ping offsets, which are shifted to start from zero.
+        """
+        beam_start, beam_end = self.ping_offsets[start], self.ping_offsets[end]
+        return SonarColumns(self.time[start:end],
+                            self.ping_offsets[start:end + 1] - beam_start,
+                            self.angle[beam_start:beam_end],
+                            self.sample_index[beam_start:beam_end],
+                            {header: values[start:end] for header, values in self.ping_values.items()},
+                            None if self.travel_time is None else self.travel_time[beam_start:beam_end])
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Joins consecutive parts of the data (for example the pings read from different parts of a file) into one container.
+        """
+        beam_counts = np.concatenate([np.diff(part.ping_offsets) for part in parts])
+        return cls(np.concatenate([part.time for part in parts]),
+                   create_ping_offsets(beam_counts),
+                   np.concatenate([part.angle for part in parts]),
+                   np.concatenate([part.sample_index for part in parts]),
+                   {header: np.concatenate([part.ping_values[header] for part in parts]) for header in parts[0].ping_values},
+                   None if any(part.travel_time is None for part in parts) else np.concatenate([part.travel_time for part in parts]))
+
+    def to_arrays(self):
+        """
+        Returns every array of the container in one flat dictionary (for example to save them with numpy.savez),
+        the ping values get the "ping_values." prefix.
+        """
+        arrays = {"time": self.time, "ping_offsets": self.ping_offsets, "angle": self.angle, "sample_index": self.sample_index}
+        arrays.update({"ping_values." + header: values for header, values in self.ping_values.items()})
+        if self.travel_time is not None:
+            arrays["travel_time"] = self.travel_time
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """Creates the container from the output of to_arrays."""
+        ping_values = {name[len("ping_values."):]: values for name, values in arrays.items() if name.startswith("ping_values.")}
+        return cls(arrays["time"], arrays["ping_offsets"], arrays["angle"], arrays["sample_index"], ping_values, arrays.get("travel_time"))
+
+    @classmethod
+    def from_records(cls, data, headers=None):
+        """
+        Creates the container from extended (or not yet extended) sonar data, the output of data_handler.read_sonar_data.
+        If headers is not provided, every value of the first line except the time and the angle/sample index pairs is stored.
+        """
+        if headers is None:
+            headers = [header for header in (data[0] if data else {}) if header not in ("time", "angle_index_pairs")]
+        beam_counts = np.fromiter((len(data_line["angle_index_pairs"]) for data_line in data), dtype=np.int64, count=len(data))
+        ping_offsets = create_ping_offsets(beam_counts)
+        beam_count = int(ping_offsets[-1])
+        angle = np.fromiter((pair["angle"] for data_line in data for pair in data_line["angle_index_pairs"]),
+                            dtype=np.float64, count=beam_count)
+        sample_index = np.fromiter((pair["sample_index"] for data_line in data for pair in data_line["angle_index_pairs"]),
+                                   dtype=np.float64, count=beam_count)
+        time = np.fromiter((data_line["time"] for data_line in data), dtype=np.float64, count=len(data))
+        ping_values = {header: np.fromiter((data_line[header] for data_line in data), dtype=np.float64, count=len(data))
+                       for header in headers}
+        return cls(time, ping_offsets, angle, sample_index, ping_values)
+
+
+@dataclass
+class LocatedPoints:
+    """
+    The located points: the time and the UTM zone of each ping, and the coordinates of each point.
+    The points of the i-th ping are between ping_offsets[i] and ping_offsets[i + 1].
+    """
+    time: np.ndarray
+    ping_offsets: np.ndarray
+    X: np.ndarray
+    Y: np.ndarray
+    altitude: np.ndarray
+    zone: np.ndarray
+
+    def __len__(self):
+        return len(self.time)
+
+    @property
+    def point_count(self):
+        return int(self.ping_offsets[-1])
+
+    def ping_ids(self, first_ping_id=0):
+        """Returns the index of the ping of every point."""
+        return np.repeat(np.arange(first_ping_id, first_ping_id + len(self), dtype=np.int64), np.diff(self.ping_offsets))
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Joins the located points of consecutive parts of the data into one container.
+        """
+        beam_counts = np.concatenate([np.diff(part.ping_offsets) for part in parts])
+        return cls(np.concatenate([part.time for part in parts]),
+                   create_ping_offsets(beam_counts),
+                   np.concatenate([part.X for part in parts]),
+                   np.concatenate([part.Y for part in parts]),
+                   np.concatenate([part.altitude for part in parts]),
+                   np.concatenate([part.zone for part in parts]))
+
+    def to_records(self):
+        """
+        Converts the points to the same structure as main.get_located_points returns:
+        an array of dictionaries, each of them contains the time and the points located in that time.
+        """
+        all_located_points = []
+        for ping_index, (time, zone) in enumerate(zip(self.time.tolist(), self.zone.tolist())):
+            start, end = self.ping_offsets[ping_index], self.ping_offsets[ping_index + 1]
+            located_points = [{
+                "X": x,
+                "Y": y,
+                "zone": zone,
+                "altitude": altitude
+            } for x, y, altitude in zip(self.X[start:end].tolist(), self.Y[start:end].tolist(), self.altitude[start:end].tolist())]
+            all_located_points.append({
+                "time": time,
+                "points": located_points
+            })
+        return all_located_points
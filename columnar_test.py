@@ -0,0 +1,106 @@
+import unittest
+import columnar
+import numpy as np
+from decimal import Decimal
+
+
+def create_test_data():
+    """
+    Creates a small extended sonar dataset, the second line has no angle/sample index pairs.
+    """
+    data = []
+    for time, pairs in [(0, [(-1, 3000), (0, 2500), (1, 3000)]), (1, []), (2, [(0.5, 2000), (-0.5, 2100)])]:
+        data.append({
+            "time": Decimal(time),
+            "angle_index_pairs": [{"angle": Decimal(angle), "sample_index": Decimal(sample_index)} for angle, sample_index in pairs],
+            "speed": Decimal("1434.07") + time
+        })
+    return data
+
+
+class ColumnarTest(unittest.TestCase):
+
+    def test_0_sonar_columns_from_records_offsets(self):
+        sonar_columns = columnar.SonarColumns.from_records(create_test_data())
+        expected_outcome = [0, 3, 3, 5]
+        self.assertEqual(expected_outcome, sonar_columns.ping_offsets.tolist())
+
+
+    def test_1_sonar_columns_from_records_ping_values(self):
+        sonar_columns = columnar.SonarColumns.from_records(create_test_data())
+        expected_outcome = [1434.07, 1435.07, 1436.07]
+        self.assertEqual(expected_outcome, sonar_columns.ping_values["speed"].tolist())
+
+
+    def test_2_sonar_columns_repeat_for_beams(self):
+        sonar_columns = columnar.SonarColumns.from_records(create_test_data())
+        expected_outcome = [0, 0, 0, 2, 2]
+        self.assertEqual(expected_outcome, sonar_columns.repeat_for_beams(sonar_columns.time).tolist())
+
+
+    def test_3_sonar_columns_select_pings(self):
+        sonar_columns = columnar.SonarColumns.from_records(create_test_data()).select_pings(1, 3)
+        self.assertEqual([0, 0, 2], sonar_columns.ping_offsets.tolist())
+        self.assertEqual([0.5, -0.5], sonar_columns.angle.tolist())
+        self.assertEqual([1435.07, 1436.07], sonar_columns.ping_values["speed"].tolist())
+
+
+    def test_4_time_series_columns_from_records(self):
+        data = [{"time": Decimal(0), "speed": Decimal(1)}, {"time": Decimal(1), "speed": Decimal(2)}]
+        time_series = columnar.TimeSeriesColumns.from_records(data, ["speed"])
+        self.assertEqual(2, len(time_series))
+        self.assertEqual([1, 2], time_series.values["speed"].tolist())
+
+
+    def test_5_located_points_to_records(self):
+        located_points = columnar.LocatedPoints(np.array([0.0, 1.0]), np.array([0, 1, 1]), np.array([1.0]), np.array([2.0]),
+                                                np.array([3.0]), np.array(["U10", "U10"]))
+        expected_outcome = [{"time": 0.0, "points": [{"X": 1.0, "Y": 2.0, "zone": "U10", "altitude": 3.0}]},
+                            {"time": 1.0, "points": []}]
+        self.assertEqual(expected_outcome, located_points.to_records())
+
+
+    def test_6_located_points_ping_ids(self):
+        located_points = columnar.LocatedPoints(np.array([0.0, 1.0, 2.0]), np.array([0, 2, 2, 3]), np.zeros(3), np.zeros(3),
+                                                np.zeros(3), np.array(["U10"] * 3))
+        expected_outcome = [5, 5, 7]
+        self.assertEqual(expected_outcome, located_points.ping_ids(5).tolist())
+
+
+    def test_7_located_points_concatenate(self):
+        first = columnar.LocatedPoints(np.array([0.0]), np.array([0, 2]), np.array([1.0, 2.0]), np.zeros(2), np.zeros(2), np.array(["U10"]))
+        second = columnar.LocatedPoints(np.array([1.0, 2.0]), np.array([0, 0, 1]), np.array([3.0]), np.zeros(1), np.zeros(1), np.array(["U10", "U11"]))
+        located_points = columnar.LocatedPoints.concatenate([first, second])
+        self.assertEqual([0, 2, 2, 3], located_points.ping_offsets.tolist())
+        self.assertEqual([1.0, 2.0, 3.0], located_points.X.tolist())
+        self.assertEqual(["U10", "U10", "U11"], located_points.zone.tolist())
+
+
+    def test_8_sonar_columns_concatenate(self):
+        first = columnar.SonarColumns(np.array([0.0]), np.array([0, 2]), np.array([1.0, 2.0]), np.zeros(2), {"speed": np.array([1.0])})
+        second = columnar.SonarColumns(np.array([1.0, 2.0]), np.array([0, 0, 1]), np.array([3.0]), np.zeros(1), {"speed": np.array([2.0, 3.0])})
+        sonar_columns = columnar.SonarColumns.concatenate([first, second])
+        self.assertEqual([0, 2, 2, 3], sonar_columns.ping_offsets.tolist())
+        self.assertEqual([1.0, 2.0, 3.0], sonar_columns.angle.tolist())
+        self.assertEqual([1.0, 2.0, 3.0], sonar_columns.ping_values["speed"].tolist())
+
+
+    def test_9_sonar_columns_to_and_from_arrays(self):
+        sonar_columns = columnar.SonarColumns(np.array([0.0]), np.array([0, 2]), np.array([1.0, 2.0]), np.zeros(2), {"speed": np.array([1.0])})
+        actual_value = columnar.SonarColumns.from_arrays(sonar_columns.to_arrays())
+        self.assertEqual([0, 2], actual_value.ping_offsets.tolist())
+        self.assertEqual([1.0, 2.0], actual_value.angle.tolist())
+        self.assertEqual({"speed": [1.0]}, {header: values.tolist() for header, values in actual_value.ping_values.items()})
+
+
+    def test_10_sonar_columns_travel_time(self):
+        sonar_columns = columnar.SonarColumns(np.array([0.0, 1.0]), np.array([0, 2, 3]), np.array([1.0, 2.0, 3.0]), np.zeros(3),
+                                              {"speed": np.array([1.0, 2.0])}, np.array([0.1, 0.2, 0.3]))
+        self.assertEqual([0.3], sonar_columns.select_pings(1, 2).travel_time.tolist())
+        self.assertEqual([0.1, 0.2, 0.3], columnar.SonarColumns.from_arrays(sonar_columns.to_arrays()).travel_time.tolist())
+        self.assertEqual([0.1, 0.2, 0.3, 0.1, 0.2, 0.3], columnar.SonarColumns.concatenate([sonar_columns, sonar_columns]).travel_time.tolist())
+        self.assertIsNone(columnar.SonarColumns.from_arrays(columnar.SonarColumns(np.zeros(0), np.zeros(1), np.zeros(0), np.zeros(0)).to_arrays()).travel_time)
+
+
+if __name__ == '__main__':
+    unittest.main()
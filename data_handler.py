@@ -1,4 +1,13 @@
+import os
 import re
+import mmap
+import io
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_left
+import numpy as np
+import columnar
+import instrumentation
 from decimal import Decimal, InvalidOperation
 
 """
@@ -8,6 +17,13 @@ point locator file do not have to be modified.
 For now, exceptions only print an error message, but in the future this can be updated.
 """
 
+PARSE_BLOCK_SIZE = 65536
+SONAR_PARSE_BLOCK_SIZE = 1024
+MMAP_BLOCK_SIZE = 16 * 1024 * 1024
+NUMBER_PATTERN = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+CLEAN_SONAR_LINE = re.compile(NUMBER_PATTERN + r'(?:\t' + NUMBER_PATTERN + ',' + NUMBER_PATTERN + r')*')
+
+
 def read_from_file(filename):
     """
     A simple function for reading the data from the file. Splits the text afterwards instead of using readline, 
@@ -16,8 +32,8 @@ def read_from_file(filename):
     If the provided filename is invalid, it returns empty array, and prints an error message.
     """
     try:
-        f = open(filename,"r")
-        full_data = f.read()
+        with open(filename, "r") as f:
+            full_data = f.read()
     except FileNotFoundError:
         print("Invalid filename provided: ", filename)
         return []
@@ -25,34 +41,40 @@ def read_from_file(filename):
     return data_lines[1:]
 
 
-def read_data(filename, start_time, frequency, headers):
+def read_data(filename, start_time, frequency, headers, metrics=None, number_type=Decimal):
     """
     Reads data from the files that have no timestamps included.
     It creates an array of dictionaries, each of the elements has their own time value 
     based on the frequency and the starting time.
     If a line is corrupted (has missing or invalid data), an error message is printed, the line is skipped,
     and the next line is getting processed. This way one corrupted line is not ruining the whole process.
+    If a metrics object is provided, the reading and the parsing of the file are recorded as separate stages.
+    The numbers are converted to number_type: Decimal by default, or float for the faster float64 precision.
     """
-    data_lines = read_from_file(filename)
+    with instrumentation.stage(metrics, "read " + filename) as current:
+        data_lines = read_from_file(filename)
+        current["items"] = len(data_lines)
     if data_lines == []:
         return [], True
-    converted_data = []
-    lines_skipped = False
-    time = Decimal(start_time)
-    for index, data_line in enumerate(data_lines):
-        if data_line != "":
-            split_data = re.split('\t| ', data_line)
-            formatted_data = format_data(split_data, time, headers)
-            if (formatted_data == {}):
-                print("Invalid or missing data in ", filename, " at line ", index)
-                lines_skipped = True
-            else:
-                converted_data.append(formatted_data)
-            time += Decimal(1) / Decimal(frequency)
+    with instrumentation.stage(metrics, "parse " + filename) as current:
+        converted_data = []
+        lines_skipped = False
+        time = number_type(start_time)
+        for index, data_line in enumerate(data_lines):
+            if data_line != "":
+                split_data = re.split('\t| ', data_line)
+                formatted_data = format_data(split_data, time, headers, number_type)
+                if (formatted_data == {}):
+                    print("Invalid or missing data in ", filename, " at line ", index)
+                    lines_skipped = True
+                else:
+                    converted_data.append(formatted_data)
+                time += number_type(1) / number_type(frequency)
+        current["items"] = len(converted_data)
     return converted_data, lines_skipped
 
 
-def format_data(one_line_of_data, time, headers):
+def format_data(one_line_of_data, time, headers, number_type=Decimal):
     """
     A function for formatting data that has no timestamp included. It creates a dictionary 
     from the input line: an array of strings.
@@ -66,36 +88,42 @@ def format_data(one_line_of_data, time, headers):
         return {}
     for index, data in enumerate(one_line_of_data):
         try:
-            formatted_data[headers[index]] = Decimal(data)
-        except InvalidOperation:
+            formatted_data[headers[index]] = number_type(data)
+        except (InvalidOperation, ValueError):
             return {}
     return formatted_data
 
 
-def read_sonar_data(filename, start_time):
+def read_sonar_data(filename, start_time, metrics=None, number_type=Decimal):
     """
     Reads timestamped data. Operating with the same starting time as the other functions,
     the first timestamp qualifies as the starting time, the others will be measured to the reference point.
     If the timestamp is corrupted, the function throws an error message, skips the current line, 
     and start processing the next one. This way one corrupted line is not ruining the whole file.
+    If a metrics object is provided, the reading and the parsing of the file are recorded as separate stages.
+    The numbers are converted to number_type, the same way as in read_data.
     """
-    data_lines = read_from_file(filename)
+    with instrumentation.stage(metrics, "read " + filename) as current:
+        data_lines = read_from_file(filename)
+        current["items"] = len(data_lines)
     if data_lines == []:
         return []
-    time_diff = Decimal(re.split('\t| ', data_lines[0])[0]) - Decimal(start_time)
-    converted_data = []
-    for index, data_line in enumerate(data_lines):
-        if data_line != "":
-            split_data = re.split('\t| ', data_line)
-            formatted_data = format_sonar_data(split_data, time_diff)
-            if (formatted_data == {}):
-                print("Sonar data timestamp corrupted at line ", index)
-            else:
-                converted_data.append(formatted_data)
+    with instrumentation.stage(metrics, "parse " + filename) as current:
+        time_diff = number_type(re.split('\t| ', data_lines[0])[0]) - number_type(start_time)
+        converted_data = []
+        for index, data_line in enumerate(data_lines):
+            if data_line != "":
+                split_data = re.split('\t| ', data_line)
+                formatted_data = format_sonar_data(split_data, time_diff, number_type)
+                if (formatted_data == {}):
+                    print("Sonar data timestamp corrupted at line ", index)
+                else:
+                    converted_data.append(formatted_data)
+        current["items"] = len(converted_data)
     return converted_data
 
 
-def format_sonar_data(one_line_of_data, time_diff):
+def format_sonar_data(one_line_of_data, time_diff, number_type=Decimal):
     """
     Formats one line of timestamped data, creates a dictionary with 
     the modified time value (compared to the starting time), and an array of dictionaries, each of them contains
@@ -106,17 +134,17 @@ def format_sonar_data(one_line_of_data, time_diff):
     """
     formatted_data = {}
     try:
-        timestamp = Decimal(one_line_of_data[0])
+        timestamp = number_type(one_line_of_data[0])
         formatted_data["time"] = timestamp - time_diff
-    except InvalidOperation:
+    except (InvalidOperation, ValueError):
         return {}
     angle_index_pairs = []
     for index in range(1, len(one_line_of_data)):
         if one_line_of_data[index] != "":
             try:
-                angle = Decimal(one_line_of_data[index].split(",")[0])
-                sample_index = Decimal(one_line_of_data[index].split(",")[1])
-            except (IndexError, InvalidOperation):
+                angle = number_type(one_line_of_data[index].split(",")[0])
+                sample_index = number_type(one_line_of_data[index].split(",")[1])
+            except (IndexError, InvalidOperation, ValueError):
                 print("Invalid data in sonar file: ", one_line_of_data[index])
             else:
                 angle_index_pair = {
@@ -128,20 +156,563 @@ def format_sonar_data(one_line_of_data, time_diff):
     return formatted_data
 
 
+def parse_numeric_block(data_lines, column_count):
+    """
+    Converts a block of non-empty lines with column_count numbers each (separated by a tab or a space) into a 2D array.
+    The number of fields is checked for every line first, then all the valid lines are converted with one numpy call.
+    Only if that fails (a field is not a number) the lines are converted one by one to find the corrupted ones.
+    Returns the values of the valid lines, and a boolean array that tells which lines are valid.
+    """
+    field_counts = np.fromiter((data_line.count('\t') + data_line.count(' ') + 1 for data_line in data_lines),
+                               dtype=np.int64, count=len(data_lines))
+    valid = field_counts == column_count
+    valid_lines = [data_line for data_line, is_valid in zip(data_lines, valid) if is_valid]
+    try:
+        values = np.array('\t'.join(valid_lines).replace(' ', '\t').split('\t'), dtype=np.float64)
+        return values.reshape(-1, column_count), valid
+    except ValueError:
+        pass
+    rows = []
+    for index in np.flatnonzero(valid):
+        try:
+            rows.append(np.array(data_lines[index].replace(' ', '\t').split('\t'), dtype=np.float64))
+        except ValueError:
+            valid[index] = False
+    return np.array(rows, dtype=np.float64).reshape(-1, column_count), valid
+
+
+@contextmanager
+def map_file(filename):
+    """
+    Memory-maps the file for reading, so its content is not read into memory at once, only the used parts are loaded.
+    Yields the mapped file (or an empty bytes object for an empty file, which cannot be mapped).
+    """
+    with open(filename, "rb") as data_file:
+        if os.fstat(data_file.fileno()).st_size == 0:
+            yield b""
+        else:
+            with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+
+def align_to_line(mapped, position):
+    """
+    Moves the byte position to the beginning of a line: if it is not at the beginning of a line already,
+    it is moved to the beginning of the next line. A line belongs to the byte range that contains its first byte.
+    """
+    if position <= 0:
+        return 0
+    if position >= len(mapped):
+        return len(mapped)
+    newline = mapped.find(b'\n', position - 1)
+    return len(mapped) if newline == -1 else newline + 1
+
+
+def get_data_range(mapped, start=0, end=None):
+    """
+    Returns the line aligned byte range of the data lines between start and end (the header is always left out).
+    """
+    header_end = align_to_line(mapped, 1)
+    start = max(align_to_line(mapped, start), header_end)
+    end = align_to_line(mapped, len(mapped) if end is None else end)
+    return start, max(start, end)
+
+
+def count_lines(mapped, start, end, block_size=MMAP_BLOCK_SIZE):
+    """
+    Counts the lines and the non-empty lines in a line aligned byte range, block by block with numpy.
+    It is used to find the line number and the time value of the first line of a byte range.
+    """
+    line_count = 0
+    non_empty_line_count = 0
+    previous_byte = b'\n'[0]
+    for block_start in range(start, end, block_size):
+        block = np.frombuffer(mapped[block_start:min(block_start + block_size, end)], dtype=np.uint8)
+        newlines = block == b'\n'[0]
+        empty_lines = newlines & (np.concatenate([[previous_byte], block[:-1]]) == b'\n'[0])
+        line_count += int(newlines.sum())
+        non_empty_line_count += int(newlines.sum() - empty_lines.sum())
+        previous_byte = block[-1]
+    return line_count, non_empty_line_count
+
+
+def iterate_line_blocks(mapped, start, end, block_size=MMAP_BLOCK_SIZE):
+    """
+    Yields the lines of a line aligned byte range in blocks of about block_size bytes.
+    The blocks are cut at line boundaries, so only one block is copied out of the mapped file at a time.
+    """
+    position = start
+    while position < end:
+        block_end = align_to_line(mapped, min(position + block_size, end))
+        data_lines = mapped[position:block_end].decode().split('\n')
+        if data_lines[-1] == "":
+            data_lines.pop()
+        yield data_lines
+        position = block_end
+
+
+def read_data_columns(filename, start_time, frequency, headers, metrics=None, start=0, end=None, line_counts=None):
+    """
+    Reads data without timestamps into a columnar.TimeSeriesColumns container.
+    This is the fast version of read_data: the file is memory-mapped, and the lines are parsed in blocks
+    with numpy instead of creating a Decimal for every field. Corrupted lines are reported with their line numbers,
+    skipped, and their time values are left out, the same way as in read_data.
+    Only the lines starting in the byte range between start and end are processed (the whole file by default),
+    the line numbers and time values are still calculated from the beginning of the file.
+    If the number of lines and non-empty lines before start is already known, it can be provided in line_counts
+    (see count_lines), so the beginning of the file is not scanned again.
+    Returns the container and whether lines were skipped.
+    """
+    empty_columns = columnar.TimeSeriesColumns(np.zeros(0), {header: np.zeros(0) for header in headers})
+    try:
+        with map_file(filename) as mapped:
+            start, end = get_data_range(mapped, start, end)
+            line_number, non_empty_line_number = line_counts or count_lines(mapped, get_data_range(mapped)[0], start)
+            blocks = iterate_line_blocks(mapped, start, end)
+            all_values, all_times = [], []
+            lines_skipped = False
+            while True:
+                with instrumentation.stage(metrics, "read " + filename) as current:
+                    data_lines = next(blocks, None)
+                    current["items"] = 0 if data_lines is None else len(data_lines)
+                if data_lines is None:
+                    break
+                with instrumentation.stage(metrics, "parse " + filename) as current:
+                    line_numbers = line_number + np.array([index for index, data_line in enumerate(data_lines) if data_line != ""], dtype=np.int64)
+                    non_empty_lines = [data_line for data_line in data_lines if data_line != ""]
+                    values, valid = parse_numeric_block(non_empty_lines, len(headers))
+                    for corrupted_line_number in line_numbers[~valid]:
+                        print("Invalid or missing data in ", filename, " at line ", corrupted_line_number)
+                    lines_skipped = lines_skipped or not valid.all()
+                    all_values.append(values)
+                    all_times.append(float(start_time) + (non_empty_line_number + np.flatnonzero(valid)) / frequency)
+                    line_number += len(data_lines)
+                    non_empty_line_number += len(non_empty_lines)
+                    current["items"] = len(values)
+    except FileNotFoundError:
+        print("Invalid filename provided: ", filename)
+        return empty_columns, True
+    if all_values == []:
+        return empty_columns, lines_skipped
+    values = np.concatenate(all_values)
+    return columnar.TimeSeriesColumns(np.concatenate(all_times), {header: values[:, index] for index, header in enumerate(headers)}), lines_skipped
+
+
+def parse_sonar_line(data_line):
+    """
+    Parses one line of sonar data with the same rules as format_sonar_data, but into floats instead of Decimals.
+    Returns the timestamp (None if it is corrupted) and the list of valid angle/sample index pairs as tuples.
+    Invalid pairs are reported and skipped.
+    """
+    split_data = re.split('\t| ', data_line)
+    try:
+        timestamp = float(split_data[0])
+    except ValueError:
+        return None, []
+    pairs = []
+    for field in split_data[1:]:
+        if field != "":
+            try:
+                values = field.split(",")
+                pairs.append((float(values[0]), float(values[1])))
+            except (IndexError, ValueError):
+                print("Invalid data in sonar file: ", field)
+    return timestamp, pairs
+
+
+def convert_sonar_lines(data_lines):
+    """Converts all the numbers of clean sonar lines into one array, raises ValueError if a number is invalid."""
+    return np.array('\t'.join(data_lines).replace(',', '\t').split('\t'), dtype=np.float64)
+
+
+def parse_sonar_block(data_lines):
+    """
+    Parses a block of non-empty sonar lines into flat arrays in one pass.
+    A line is clean, if it is a number followed by fields of exactly two numbers separated by one comma
+    (see CLEAN_SONAR_LINE). All the clean lines are converted with one numpy call: after replacing the commas
+    with separators the line is a timestamp followed by angle, sample index, angle, sample index... values.
+    If the conversion still fails, only the lines that cannot be converted are left out of it.
+    The other lines are parsed one by one with parse_sonar_line, so invalid pairs and corrupted timestamps
+    are handled the same way as in format_sonar_data.
+    Returns the timestamps, a boolean array that tells which lines have valid timestamps,
+    the number of beams of each line, and the angle and sample index arrays.
+    """
+    data_lines = [data_line.replace(' ', '\t') for data_line in data_lines]
+    comma_counts = np.fromiter((data_line.count(',') for data_line in data_lines), dtype=np.int64, count=len(data_lines))
+    clean = np.fromiter((CLEAN_SONAR_LINE.fullmatch(data_line) is not None for data_line in data_lines), dtype=bool, count=len(data_lines))
+    try:
+        clean_numbers = convert_sonar_lines([data_line for data_line, is_clean in zip(data_lines, clean) if is_clean])
+    except ValueError:
+        for index in np.flatnonzero(clean):
+            try:
+                convert_sonar_lines([data_lines[index]])
+            except ValueError:
+                clean[index] = False
+        clean_numbers = convert_sonar_lines([data_line for data_line, is_clean in zip(data_lines, clean) if is_clean])
+
+    timestamps = np.zeros(len(data_lines), dtype=np.float64)
+    valid = np.ones(len(data_lines), dtype=bool)
+    beam_counts = np.where(clean, comma_counts, 0)
+    other_pairs = []
+    for index in np.flatnonzero(~clean):
+        timestamp, pairs = parse_sonar_line(data_lines[index])
+        if timestamp is None:
+            valid[index] = False
+        else:
+            timestamps[index] = timestamp
+            beam_counts[index] = len(pairs)
+            other_pairs.extend(pairs)
+
+    angle = np.empty(int(beam_counts.sum()), dtype=np.float64)
+    sample_index = np.empty(len(angle), dtype=np.float64)
+    clean_beams = np.repeat(clean, beam_counts)
+    if clean.any():
+        clean_field_offsets = columnar.create_ping_offsets(1 + 2 * comma_counts[clean])[:-1]
+        timestamps[clean] = clean_numbers[clean_field_offsets]
+        clean_pairs = np.delete(clean_numbers, clean_field_offsets).reshape(-1, 2)
+        angle[clean_beams] = clean_pairs[:, 0]
+        sample_index[clean_beams] = clean_pairs[:, 1]
+    if other_pairs:
+        other_pairs = np.array(other_pairs, dtype=np.float64)
+        angle[~clean_beams] = other_pairs[:, 0]
+        sample_index[~clean_beams] = other_pairs[:, 1]
+    return timestamps, valid, beam_counts, angle, sample_index
+
+
+def read_sonar_columns(filename, start_time, metrics=None, start=0, end=None, line_counts=None):
+    """
+    Reads timestamped sonar data into a columnar.SonarColumns container.
+    This is the fast version of read_sonar_data: the file is memory-mapped, and the lines are parsed in blocks
+    by parse_sonar_block, without creating a Decimal and a dictionary for every angle/sample index pair.
+    The first timestamp of the file qualifies as the starting time, corrupted timestamps are reported and skipped.
+    Only the lines starting in the byte range between start and end are processed (the whole file by default),
+    line_counts can be provided the same way as for read_data_columns.
+    """
+    empty_columns = columnar.SonarColumns(np.zeros(0), np.zeros(1, dtype=np.int64), np.zeros(0), np.zeros(0))
+    try:
+        with map_file(filename) as mapped:
+            data_start = get_data_range(mapped)[0]
+            if data_start == len(mapped):
+                return empty_columns
+            first_line = mapped[data_start:align_to_line(mapped, data_start + 1)].decode().rstrip('\n')
+            time_diff = float(re.split('\t| ', first_line)[0]) - float(start_time)
+            start, end = get_data_range(mapped, start, end)
+            line_number = (line_counts or count_lines(mapped, data_start, start))[0]
+            line_blocks = iterate_line_blocks(mapped, start, end)
+            parsed_blocks = []
+            while True:
+                with instrumentation.stage(metrics, "read " + filename) as current:
+                    data_lines = next(line_blocks, None)
+                    current["items"] = 0 if data_lines is None else len(data_lines)
+                if data_lines is None:
+                    break
+                with instrumentation.stage(metrics, "parse " + filename) as current:
+                    line_numbers = line_number + np.array([index for index, data_line in enumerate(data_lines) if data_line != ""], dtype=np.int64)
+                    non_empty_lines = [data_line for data_line in data_lines if data_line != ""]
+                    for block_start in range(0, len(non_empty_lines), SONAR_PARSE_BLOCK_SIZE):
+                        block = parse_sonar_block(non_empty_lines[block_start:block_start + SONAR_PARSE_BLOCK_SIZE])
+                        for corrupted_line_number in line_numbers[block_start:block_start + SONAR_PARSE_BLOCK_SIZE][~block[1]]:
+                            print("Sonar data timestamp corrupted at line ", corrupted_line_number)
+                        parsed_blocks.append(block)
+                    line_number += len(data_lines)
+                    current["items"] = int(sum(block[2].sum() for block in parsed_blocks))
+    except FileNotFoundError:
+        print("Invalid filename provided: ", filename)
+        return empty_columns
+    if parsed_blocks == []:
+        return empty_columns
+    timestamps, valid, beam_counts, angle, sample_index = [np.concatenate(arrays) for arrays in zip(*parsed_blocks)]
+    return columnar.SonarColumns(timestamps[valid] - time_diff, columnar.create_ping_offsets(beam_counts[valid]), angle, sample_index)
+
+
+def split_file(filename, parts):
+    """
+    Splits the data lines of the file into (at most) the given number of line aligned byte ranges of similar size.
+    Returns the start, the end, and the line counts before the start (see count_lines) of each range.
+    """
+    with map_file(filename) as mapped:
+        data_start, data_end = get_data_range(mapped)
+        boundaries = sorted({data_start, data_end} | {align_to_line(mapped, data_start + (data_end - data_start) * part // parts)
+                                                      for part in range(1, parts)})
+        byte_ranges = []
+        line_counts = (0, 0)
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            byte_ranges.append((start, end, line_counts))
+            range_line_counts = count_lines(mapped, start, end)
+            line_counts = (line_counts[0] + range_line_counts[0], line_counts[1] + range_line_counts[1])
+    return byte_ranges
+
+
+def call_with_output(function, *args, **kwargs):
+    """
+    Calls the function, and returns its result with everything it printed. Used in the worker processes,
+    so the messages about corrupted lines can be printed in the order of the lines.
+    """
+    with io.StringIO() as output, redirect_stdout(output):
+        result = function(*args, **kwargs)
+        return result, output.getvalue()
+
+
+def read_in_parallel(filename, function, args, workers, metrics):
+    """
+    Splits the file into byte ranges, calls the reader function on each range in a process pool,
+    prints the messages of the workers in order, and returns the results of the ranges in order.
+    """
+    with instrumentation.stage(metrics, "parallel read " + filename) as current:
+        try:
+            byte_ranges = split_file(filename, workers or os.cpu_count() or 1)
+        except FileNotFoundError:
+            print("Invalid filename provided: ", filename)
+            return None
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(call_with_output, function, filename, *args, start=start, end=end, line_counts=line_counts)
+                       for start, end, line_counts in byte_ranges]
+            results = []
+            for future in futures:
+                result, output = future.result()
+                print(output, end="")
+                results.append(result)
+        current["items"] = sum(len(result[0] if isinstance(result, tuple) else result) for result in results)
+    return results
+
+
+def read_data_columns_parallel(filename, start_time, frequency, headers, workers=None, metrics=None):
+    """
+    Parallel version of read_data_columns. The file is split into newline aligned byte ranges,
+    one for each worker (all cores by default), and the ranges are parsed in a process pool.
+    The result and the reported line numbers are the same as the result and the messages of read_data_columns.
+    In parallel mode only the total time is recorded into the metrics.
+    """
+    results = read_in_parallel(filename, read_data_columns, (start_time, frequency, headers), workers, metrics)
+    if results is None:
+        return columnar.TimeSeriesColumns(np.zeros(0), {header: np.zeros(0) for header in headers}), True
+    if results == []:
+        return columnar.TimeSeriesColumns(np.zeros(0), {header: np.zeros(0) for header in headers}), False
+    return columnar.TimeSeriesColumns.concatenate([columns for columns, lines_skipped in results]), any(lines_skipped for columns, lines_skipped in results)
+
+
+def read_sonar_columns_parallel(filename, start_time, workers=None, metrics=None):
+    """
+    Parallel version of read_sonar_columns, the file is split and parsed the same way as in read_data_columns_parallel.
+    """
+    results = read_in_parallel(filename, read_sonar_columns, (start_time,), workers, metrics)
+    if not results:
+        return columnar.SonarColumns(np.zeros(0), np.zeros(1, dtype=np.int64), np.zeros(0), np.zeros(0))
+    return columnar.SonarColumns.concatenate(results)
+
+
+def create_time_index(other_data):
+    """
+    Creates a sorted index over the time values of the data, so the nearest line can be found with binary search.
+    Returns the sorted time values, and the original position of each of them.
+    The sort is stable, so lines with equal time values keep their original order.
+    """
+    order = sorted(range(len(other_data)), key=lambda index: other_data[index]["time"])
+    sorted_times = [other_data[index]["time"] for index in order]
+    return sorted_times, order
+
+
+def find_nearest_index(time_index, time):
+    """
+    Finds the position of the line with the nearest time value in O(log n) steps.
+    Gives the same result as a linear search with min: in case of equal differences,
+    the line that comes first in the original data is chosen.
+    """
+    sorted_times, order = time_index
+    position = bisect_left(sorted_times, time)
+    candidates = []
+    if position < len(sorted_times):
+        candidates.append(position)
+    if position > 0:
+        candidates.append(bisect_left(sorted_times, sorted_times[position - 1]))
+    nearest = min(candidates, key=lambda candidate: (abs(time - sorted_times[candidate]), order[candidate]))
+    return order[nearest]
+
+
 def extend_sonar_data(sonar_data, other_data, headers, frequency=0, corrupted_data=False):
     """
     Connects the data from different files based on their time value.
     For performance issues if there was no lines skipped during the reading of the other data
     the program simply uses the frequency to find closest time value in the other dataset.
     This only works when the device has a predefined frequency. 
-    In every other case the nearest value found based on the difference between the time values.
+    In every other case the nearest value is found with binary search in a sorted index of the time values,
+    so gaps or corrupted lines in the other data do not slow down the process.
     """
+    time_index = None
     for sonar_line in sonar_data:
         if not corrupted_data and frequency > 0 and sonar_line["time"] > 0:
             other_data_index = min(round(sonar_line["time"] * frequency), len(other_data) - 1)
-            matching_other_data_line = other_data[other_data_index]
         else:
-            matching_other_data_line = min(other_data, key=lambda x: abs(sonar_line["time"] - x["time"]))
+            if time_index is None:
+                time_index = create_time_index(other_data)
+            other_data_index = find_nearest_index(time_index, sonar_line["time"])
+        matching_other_data_line = other_data[other_data_index]
         for header in headers:
                 sonar_line[header] = matching_other_data_line[header]
     return sonar_data
+
+def interpolate_values(sonar_times, other_times, values, angular=False):
+    """
+    Interpolates the values of the other data to the sonar times with numpy.
+    Angles are unwrapped before the interpolation, so a jump between -pi and pi is interpolated along the shorter arc.
+    The result is wrapped back to the same range as the left neighbour, so at the measured times the original values are kept.
+    Outside of the time range of the other data the first or the last values are used.
+    """
+    if not angular:
+        return np.interp(sonar_times, other_times, values)
+    left_neighbours = np.clip(np.searchsorted(other_times, sonar_times, side="right") - 1, 0, len(other_times) - 1)
+    unwrapped_values = np.unwrap(values)
+    interpolated_values = np.interp(sonar_times, other_times, unwrapped_values)
+    interpolated_values -= (unwrapped_values - values)[left_neighbours]
+    return interpolated_values
+
+
+def interpolate_sonar_data(sonar_data, other_data, headers, angular_headers=[], number_type=Decimal):
+    """
+    Connects the data from different files by interpolating the other data to the time of each sonar line,
+    instead of choosing the nearest line. This way less frequent measurements (for example GNSS) are enough
+    to get the same precision. The interpolation is done for all sonar lines at once with numpy,
+    angles (headers in angular_headers) are interpolated along the shorter arc.
+    The other data has to be ordered by time (like the output of read_data).
+    The interpolated values are stored as number_type.
+    """
+    if other_data == []:
+        raise ValueError('No data to connect to the sonar data: ', headers)
+    sonar_times = np.array([float(sonar_line["time"]) for sonar_line in sonar_data], dtype=np.float64)
+    other_times = np.array([float(other_line["time"]) for other_line in other_data], dtype=np.float64)
+    for header in headers:
+        values = np.array([float(other_line[header]) for other_line in other_data], dtype=np.float64)
+        interpolated_values = interpolate_values(sonar_times, other_times, values, header in angular_headers)
+        for sonar_line, value in zip(sonar_data, interpolated_values.tolist()):
+            sonar_line[header] = number_type(value)
+    return sonar_data
+
+
+def find_nearest_indexes(sorted_times, times):
+    """
+    Vectorized version of find_nearest_index for sorted time values: finds the nearest line for all times at once.
+    In case of equal differences the earlier line is chosen.
+    """
+    positions = np.searchsorted(sorted_times, times, side="left")
+    right = np.minimum(positions, len(sorted_times) - 1)
+    left = np.maximum(positions - 1, 0)
+    left = np.searchsorted(sorted_times, sorted_times[left], side="left")
+    use_left = np.abs(times - sorted_times[left]) <= np.abs(sorted_times[right] - times)
+    return np.where(use_left, left, right)
+
+
+def extend_sonar_columns(sonar_columns, other_columns, headers, frequency=0, corrupted_data=False, first_line=0):
+    """
+    Columnar version of extend_sonar_data: stores the values of the matching lines in sonar_columns.ping_values.
+    The same rules are used to find the matching line: the frequency if no lines were skipped,
+    the nearest time value otherwise. The other data has to be ordered by time.
+    If only a part of the other file was read, first_line is the number of its first line.
+    """
+    if len(other_columns) == 0:
+        raise ValueError('No data to connect to the sonar data: ', headers)
+    indexes = find_nearest_indexes(other_columns.time, sonar_columns.time)
+    if not corrupted_data and frequency > 0:
+        by_frequency = sonar_columns.time > 0
+        frequency_indexes = np.clip(np.rint(sonar_columns.time * frequency).astype(np.int64) - first_line, 0, len(other_columns) - 1)
+        indexes = np.where(by_frequency, frequency_indexes, indexes)
+    for header in headers:
+        sonar_columns.ping_values[header] = other_columns.values[header][indexes]
+    return sonar_columns
+
+
+def interpolate_sonar_columns(sonar_columns, other_columns, headers, angular_headers=[]):
+    """
+    Columnar version of interpolate_sonar_data.
+    """
+    if len(other_columns) == 0:
+        raise ValueError('No data to connect to the sonar data: ', headers)
+    for header in headers:
+        sonar_columns.ping_values[header] = interpolate_values(sonar_columns.time, other_columns.time,
+                                                               other_columns.values[header], header in angular_headers)
+    return sonar_columns
+
+def iterate_lines(filename):
+    """
+    Generator version of read_from_file. Reads the file line by line, so only the current line is kept in memory.
+    The header is skipped, and the file is closed after the last line.
+    If the provided filename is invalid, it yields nothing, and prints an error message.
+    """
+    try:
+        data_file = open(filename, "r")
+    except FileNotFoundError:
+        print("Invalid filename provided: ", filename)
+        return
+    with data_file:
+        next(data_file, None)
+        for data_line in data_file:
+            yield data_line.rstrip('\n')
+
+
+def iterate_data(filename, start_time, frequency, headers, number_type=Decimal):
+    """
+    Generator version of read_data: yields the formatted lines one by one.
+    Corrupted lines are reported and skipped the same way as in read_data.
+    """
+    time = number_type(start_time)
+    for index, data_line in enumerate(iterate_lines(filename)):
+        if data_line != "":
+            split_data = re.split('\t| ', data_line)
+            formatted_data = format_data(split_data, time, headers, number_type)
+            if (formatted_data == {}):
+                print("Invalid or missing data in ", filename, " at line ", index)
+            else:
+                yield formatted_data
+            time += number_type(1) / number_type(frequency)
+
+
+def iterate_sonar_data(filename, start_time, number_type=Decimal):
+    """
+    Generator version of read_sonar_data: yields the formatted lines one by one.
+    The first line still qualifies as the starting time, corrupted timestamps are reported and skipped.
+    """
+    time_diff = None
+    for index, data_line in enumerate(iterate_lines(filename)):
+        if time_diff is None:
+            time_diff = number_type(re.split('\t| ', data_line)[0]) - number_type(start_time)
+        if data_line != "":
+            split_data = re.split('\t| ', data_line)
+            formatted_data = format_sonar_data(split_data, time_diff, number_type)
+            if (formatted_data == {}):
+                print("Sonar data timestamp corrupted at line ", index)
+            else:
+                yield formatted_data
+
+
+def extend_sonar_stream(sonar_stream, other_stream, headers, frequency=0):
+    """
+    Streaming version of extend_sonar_data. Both streams have to be ordered by time.
+    Only the two lines of the other stream around the time of the current sonar line are kept in memory,
+    the nearest one of them is connected. If the frequency of the other data is provided, the line is chosen
+    by the frequency the same way as in extend_sonar_data (the time multiplied by the frequency is rounded,
+    halves to even), as long as one of the two lines has that index. Otherwise, in case of equal differences
+    the earlier line is chosen.
+    """
+    previous_line = None
+    next_line = next(other_stream, None)
+    for sonar_line in sonar_stream:
+        while next_line is not None and next_line["time"] <= sonar_line["time"]:
+            previous_line = next_line
+            next_line = next(other_stream, None)
+        frequency_index = round(sonar_line["time"] * frequency) if frequency > 0 and sonar_line["time"] > 0 else None
+        if previous_line is None:
+            matching_other_data_line = next_line
+        elif next_line is None:
+            matching_other_data_line = previous_line
+        elif frequency_index is not None and round(previous_line["time"] * frequency) == frequency_index:
+            matching_other_data_line = previous_line
+        elif frequency_index is not None and round(next_line["time"] * frequency) == frequency_index:
+            matching_other_data_line = next_line
+        elif abs(sonar_line["time"] - previous_line["time"]) <= abs(next_line["time"] - sonar_line["time"]):
+            matching_other_data_line = previous_line
+        else:
+            matching_other_data_line = next_line
+        if matching_other_data_line is None:
+            raise ValueError('No data to connect to the sonar data: ', headers)
+        for header in headers:
+            sonar_line[header] = matching_other_data_line[header]
+        yield sonar_line
@@ -1,6 +1,11 @@
 import unittest
+import os
+import tempfile
 import data_handler
+import columnar
+import numpy as np
 from decimal import Decimal
+from math import pi
 
 class DataHandlerTest(unittest.TestCase):
 
@@ -303,5 +308,251 @@ class DataHandlerTest(unittest.TestCase):
         self.assertEqual(expected_result, actual_result)
 
 
+    def test_21_iterate_lines_not_exists(self):
+        invalid_filename = "file-not-exists.txt"
+        expected_outcome = []
+        actual_result = list(data_handler.iterate_lines(invalid_filename))
+        self.assertEqual(expected_outcome, actual_result)
+
+
+    def test_22_iterate_data_same_as_read_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "data.txt")
+            with open(filename, "w") as data_file:
+                data_file.write("# header\n1 2\ncorrupted 2\n3\t4\n\n")
+            headers = ["first", "second"]
+            expected_outcome, lines_skipped = data_handler.read_data(filename, 0, 2, headers)
+            actual_result = list(data_handler.iterate_data(filename, 0, 2, headers))
+        self.assertEqual(expected_outcome, actual_result)
+
+
+    def test_23_iterate_sonar_data_same_as_read_sonar_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "sonar.txt")
+            with open(filename, "w") as sonar_file:
+                sonar_file.write("# header\n10.5 1,1 2,2\ncorrupted 1,1\n11 3,3\n")
+            expected_outcome = data_handler.read_sonar_data(filename, 0)
+            actual_result = list(data_handler.iterate_sonar_data(filename, 0))
+        self.assertEqual(expected_outcome, actual_result)
+
+
+    def test_24_extend_sonar_stream_same_as_extend_sonar_data(self):
+        times = [Decimal(-1), Decimal("0.2"), Decimal("0.5"), Decimal("0.75"), Decimal(3)]
+        other_data = [{"time": Decimal(time) / 2, "data": time} for time in range(4)]
+        headers = ["data"]
+        expected_outcome = data_handler.extend_sonar_data([{"time": time} for time in times], other_data, headers, 0, True)
+        actual_result = list(data_handler.extend_sonar_stream(iter([{"time": time} for time in times]), iter(other_data), headers))
+        self.assertEqual(expected_outcome, actual_result)
+
+
+    def test_25_extend_sonar_stream_no_other_data(self):
+        sonar_stream = iter([{"time": Decimal(1)}])
+        self.assertRaises(ValueError, list, data_handler.extend_sonar_stream(sonar_stream, iter([]), ["data"]))
+
+
+    def test_26_extend_sonar_data_lines_skipped_same_as_linear_search(self):
+        other_data = [{"time": Decimal(time), "data": index} for index, time in enumerate([3, 0, 1, 1, 2, 5, 3])]
+        headers = ["data"]
+        for time in ["-1", "0", "0.5", "1", "1.5", "2.5", "3", "4", "4.5", "6"]:
+            sonar_data = [{"time": Decimal(time)}]
+            expected_result = min(other_data, key=lambda x: abs(Decimal(time) - x["time"]))["data"]
+            actual_result = data_handler.extend_sonar_data(sonar_data, other_data, headers, 1, True)[0]["data"]
+            self.assertEqual(expected_result, actual_result)
+
+
+    def test_27_find_nearest_index_equal_difference(self):
+        other_data = [{"time": Decimal(2)}, {"time": Decimal(0)}]
+        time_index = data_handler.create_time_index(other_data)
+        expected_result = 0
+        actual_result = data_handler.find_nearest_index(time_index, Decimal(1))
+        self.assertEqual(expected_result, actual_result)
+
+
+    def test_28_interpolate_sonar_data_linear(self):
+        sonar_data = [{"time": Decimal("0.25")}, {"time": Decimal(-1)}, {"time": Decimal(5)}]
+        other_data = [{"time": Decimal(0), "data": Decimal(1)}, {"time": Decimal(1), "data": Decimal(3)}]
+        expected_result = [Decimal("1.5"), Decimal(1), Decimal(3)]
+        actual_result = [line["data"] for line in data_handler.interpolate_sonar_data(sonar_data, other_data, ["data"])]
+        self.assertEqual(expected_result, actual_result)
+
+
+    def test_29_interpolate_sonar_data_angle_wraps_around(self):
+        sonar_data = [{"time": Decimal("0.5")}, {"time": Decimal(1)}]
+        other_data = [{"time": Decimal(0), "heading": Decimal("3.1")}, {"time": Decimal(1), "heading": Decimal("-3.1")}]
+        actual_result = data_handler.interpolate_sonar_data(sonar_data, other_data, ["heading"], ["heading"])
+        self.assertAlmostEqual(pi, abs(float(actual_result[0]["heading"])), 1)
+        self.assertAlmostEqual(-3.1, float(actual_result[1]["heading"]), 9)
+
+
+    def test_30_interpolate_sonar_data_no_other_data(self):
+        self.assertRaises(ValueError, data_handler.interpolate_sonar_data, [{"time": Decimal(1)}], [], ["data"])
+
+
+    def test_31_extend_sonar_columns_same_as_extend_sonar_data(self):
+        other_data = [{"time": Decimal(time) / 2, "data": Decimal(time)} for time in [0, 1, 2, 4, 5]]
+        times = ["-1", "0", "0.2", "0.25", "0.5", "1.25", "1.5", "2.6", "10"]
+        for frequency, lines_skipped in [(2, False), (2, True), (0, False)]:
+            expected_result = data_handler.extend_sonar_data([{"time": Decimal(time)} for time in times], other_data, ["data"], frequency, lines_skipped)
+            sonar_columns = columnar.SonarColumns(np.array([float(time) for time in times]), np.zeros(len(times) + 1, dtype=np.int64), np.zeros(0), np.zeros(0))
+            other_columns = columnar.TimeSeriesColumns.from_records(other_data, ["data"])
+            actual_result = data_handler.extend_sonar_columns(sonar_columns, other_columns, ["data"], frequency, lines_skipped)
+            self.assertEqual([float(line["data"]) for line in expected_result], actual_result.ping_values["data"].tolist())
+
+
+    def test_32_interpolate_sonar_columns(self):
+        sonar_columns = columnar.SonarColumns(np.array([0.25, 2.0]), np.zeros(3, dtype=np.int64), np.zeros(0), np.zeros(0))
+        other_columns = columnar.TimeSeriesColumns(np.array([0.0, 1.0]), {"data": np.array([1.0, 3.0])})
+        actual_result = data_handler.interpolate_sonar_columns(sonar_columns, other_columns, ["data"])
+        self.assertEqual([1.5, 3.0], actual_result.ping_values["data"].tolist())
+
+
+    def test_33_read_data_columns_same_as_read_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "data.txt")
+            with open(filename, "w") as data_file:
+                data_file.write("# header\n1 2\ncorrupted 2\n3\t4\n\n5  6\n7\n8 9 10\n-1.5e2\t0.25\n")
+            headers = ["first", "second"]
+            expected_outcome, expected_lines_skipped = data_handler.read_data(filename, 1, 4, headers)
+            actual_result, actual_lines_skipped = data_handler.read_data_columns(filename, 1, 4, headers)
+        self.assertEqual(expected_lines_skipped, actual_lines_skipped)
+        self.assertEqual([float(line["time"]) for line in expected_outcome], actual_result.time.tolist())
+        for header in headers:
+            self.assertEqual([float(line[header]) for line in expected_outcome], actual_result.values[header].tolist())
+
+
+    def test_34_read_data_columns_gnss_file(self):
+        headers = ["roll", "pitch", "heading", "latitude", "longitude", "altitude", "heave"]
+        expected_outcome, expected_lines_skipped = data_handler.read_data("gnss.txt", 0, 50, headers)
+        actual_result, actual_lines_skipped = data_handler.read_data_columns("gnss.txt", 0, 50, headers)
+        self.assertEqual(expected_lines_skipped, actual_lines_skipped)
+        self.assertEqual(len(expected_outcome), len(actual_result))
+        self.assertEqual([float(line["heading"]) for line in expected_outcome], actual_result.values["heading"].tolist())
+
+
+    def test_35_parse_numeric_block_invalid_number(self):
+        values, valid = data_handler.parse_numeric_block(["1 2", "1 x", "3 4"], 2)
+        self.assertEqual([True, False, True], valid.tolist())
+        self.assertEqual([[1, 2], [3, 4]], values.tolist())
+
+
+    def test_36_read_sonar_columns_same_as_read_sonar_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "sonar.txt")
+            with open(filename, "w") as sonar_file:
+                sonar_file.write("# header\n10.5 1,1 2,2\ncorrupted 1,1\n\n11\t3,3 x,4\n11.5 5,5\t\n12 11 6,6\n12.5 1,2,3\n13\n13.5 -0.5,2e3\t0.5,1000\n")
+            expected_outcome = data_handler.read_sonar_data(filename, 2)
+            actual_result = data_handler.read_sonar_columns(filename, 2)
+        self.assertEqual([float(line["time"]) for line in expected_outcome], actual_result.time.tolist())
+        self.assertEqual([len(line["angle_index_pairs"]) for line in expected_outcome], actual_result.beam_counts().tolist())
+        expected_pairs = [pair for line in expected_outcome for pair in line["angle_index_pairs"]]
+        self.assertEqual([float(pair["angle"]) for pair in expected_pairs], actual_result.angle.tolist())
+        self.assertEqual([float(pair["sample_index"]) for pair in expected_pairs], actual_result.sample_index.tolist())
+
+
+    def test_37_parse_sonar_block_clean_lines(self):
+        timestamps, valid, beam_counts, angle, sample_index = data_handler.parse_sonar_block(["1 1,2 3,4", "2", "3\t5,6"])
+        self.assertEqual([1, 2, 3], timestamps.tolist())
+        self.assertEqual([2, 0, 1], beam_counts.tolist())
+        self.assertEqual([1, 3, 5], angle.tolist())
+        self.assertEqual([2, 4, 6], sample_index.tolist())
+
+
+    def test_38_read_sonar_columns_not_exists(self):
+        actual_result = data_handler.read_sonar_columns("sonar-data-not-exists.txt", 0)
+        self.assertEqual(0, len(actual_result))
+
+
+    def test_39_read_data_columns_byte_ranges(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "gnss.txt")
+            with open(filename, "w") as gnss_file:
+                gnss_file.write("# header\n1 2\n3 4\n\nx 6\n7 8\n9 10")
+            expected_outcome, expected_lines_skipped = data_handler.read_data_columns(filename, 0, 2, ["a", "b"])
+            parts = [data_handler.read_data_columns(filename, 0, 2, ["a", "b"], start=start, end=end) for start, end in [(0, 12), (12, 20), (20, None)]]
+        self.assertTrue(expected_lines_skipped)
+        self.assertEqual([0, 0.5, 1.5, 2], expected_outcome.time.tolist())
+        self.assertEqual(expected_outcome.time.tolist(), [time for part, skipped in parts for time in part.time.tolist()])
+        self.assertEqual(expected_outcome.values["b"].tolist(), [value for part, skipped in parts for value in part.values["b"].tolist()])
+        self.assertEqual([False, True, False], [skipped for part, skipped in parts])
+
+
+    def test_40_read_sonar_columns_byte_ranges(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "sonar.txt")
+            with open(filename, "w") as sonar_file:
+                sonar_file.write("# header\n10 1,1 2,2\ncorrupted 1,1\n\n11 3,3\n12 4,4 5,5\n")
+            expected_outcome = data_handler.read_sonar_columns(filename, 2)
+            parts = [data_handler.read_sonar_columns(filename, 2, start=start, end=end) for start, end in [(0, 15), (15, 30), (30, None)]]
+        self.assertEqual([2, 3, 4], expected_outcome.time.tolist())
+        self.assertEqual(expected_outcome.time.tolist(), [time for part in parts for time in part.time.tolist()])
+        self.assertEqual(expected_outcome.angle.tolist(), [angle for part in parts for angle in part.angle.tolist()])
+
+
+    def test_41_align_to_line(self):
+        mapped = b"# header\nab\ncd"
+        self.assertEqual(0, data_handler.align_to_line(mapped, 0))
+        self.assertEqual(9, data_handler.align_to_line(mapped, 9))
+        self.assertEqual(12, data_handler.align_to_line(mapped, 10))
+        self.assertEqual(14, data_handler.align_to_line(mapped, 13))
+        self.assertEqual((2, 2), data_handler.count_lines(b"a\nb\n", 0, 4))
+        self.assertEqual((3, 2), data_handler.count_lines(b"a\n\nb\n", 0, 5, block_size=2))
+
+
+    def test_42_read_columns_parallel_same_as_sequential(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sonar_filename = os.path.join(directory, "sonar.txt")
+            gnss_filename = os.path.join(directory, "gnss.txt")
+            with open(sonar_filename, "w") as sonar_file:
+                sonar_file.write("# header\n" + "".join("%d %d,1 2,2\n" % (index, index) for index in range(10)) + "corrupted 1,1\n\n11 3,3\n")
+            with open(gnss_filename, "w") as gnss_file:
+                gnss_file.write("# header\n" + "".join("%d 1\n" % index for index in range(10)) + "x 1\n\n11 1\n")
+            expected_sonar = data_handler.read_sonar_columns(sonar_filename, 0)
+            actual_sonar = data_handler.read_sonar_columns_parallel(sonar_filename, 0, workers=3)
+            expected_gnss, expected_lines_skipped = data_handler.read_data_columns(gnss_filename, 0, 2, ["a", "b"])
+            actual_gnss, actual_lines_skipped = data_handler.read_data_columns_parallel(gnss_filename, 0, 2, ["a", "b"], workers=3)
+        self.assertEqual(expected_sonar.time.tolist(), actual_sonar.time.tolist())
+        self.assertEqual(expected_sonar.ping_offsets.tolist(), actual_sonar.ping_offsets.tolist())
+        self.assertEqual(expected_sonar.angle.tolist(), actual_sonar.angle.tolist())
+        self.assertEqual(expected_gnss.time.tolist(), actual_gnss.time.tolist())
+        self.assertEqual(expected_gnss.values["a"].tolist(), actual_gnss.values["a"].tolist())
+        self.assertEqual(expected_lines_skipped, actual_lines_skipped)
+
+
+    def test_43_split_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "data.txt")
+            with open(filename, "w") as data_file:
+                data_file.write("# header\n1 2\n\n3 4\n5 6\n")
+            byte_ranges = data_handler.split_file(filename, 2)
+        self.assertEqual([(9, 18, (0, 0)), (18, 22, (3, 2))], byte_ranges)
+
+
+    def test_44_read_data_float_number_type(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "gnss.txt")
+            with open(filename, "w") as gnss_file:
+                gnss_file.write("# header\n1 2\nx 4\n5 6\n")
+            actual_result, actual_lines_skipped = data_handler.read_data(filename, 0, 50, ["a", "b"], number_type=float)
+        self.assertTrue(actual_lines_skipped)
+        self.assertEqual([{"time": 0.0, "a": 1.0, "b": 2.0}, {"time": 0.04, "a": 5.0, "b": 6.0}], actual_result)
+        self.assertIsInstance(actual_result[0]["a"], float)
+
+
+    def test_45_format_sonar_data_float_number_type(self):
+        expected_outcome = {"time": 1.5, "angle_index_pairs": [{"angle": 0.5, "sample_index": 100.0}]}
+        actual_result = data_handler.format_sonar_data(["2.5", "0.5,100", "x,1"], 1.0, float)
+        self.assertEqual(expected_outcome, actual_result)
+
+
+    def test_46_extend_sonar_stream_half_interval_ties(self):
+        times = [Decimal("0.5"), Decimal("1.5"), Decimal("2.5"), Decimal("3.5"), Decimal("4.5"), Decimal(7)]
+        other_data = [{"time": Decimal(time), "data": time} for time in range(5)]
+        headers = ["data"]
+        expected_outcome = data_handler.extend_sonar_data([{"time": time} for time in times], other_data, headers, 1)
+        actual_result = list(data_handler.extend_sonar_stream(iter([{"time": time} for time in times]), iter(other_data), headers, 1))
+        self.assertEqual(expected_outcome, actual_result)
+        self.assertEqual([0, 2, 2, 4, 4, 4], [line["data"] for line in actual_result])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
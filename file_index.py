@@ -0,0 +1,227 @@
+import os
+import re
+from dataclasses import dataclass
+import numpy as np
+import columnar
+import data_handler
+import instrumentation
+
+"""
+Sidecar indexes over the input files, so a time window (for example one survey line out of a day-long log)
+can be processed without parsing the whole file. The index stores the byte offset of every INDEX_STEP-th
+non-empty data line, with the number of lines before it (for the line numbers of the messages and the time values),
+and for timestamped files (sonar) the timestamp of the line. The index is built once, and stored next to the file
+(<filename>.index.npz). It is built again if the size or the modification time of the file changed.
+The sonar lines of a time window are found with the timestamps of the index, the lines of the data without
+timestamps (GNSS, speed of sound) by their line number, which is calculated from the time and the frequency.
+"""
+
+INDEX_STEP = 1024
+INDEX_SUFFIX = ".index.npz"
+INDEX_VERSION = 1
+
+
+@dataclass
+class FileIndex:
+    """
+    The index of a file: the byte offsets of the indexed lines, the number of lines and non-empty lines before them
+    (see data_handler.count_lines), and their timestamps (NaN if the file has no timestamps or the timestamp is corrupted).
+    The size and the modification time of the indexed file are stored to check whether the index is still valid.
+    """
+    size: int
+    modification_time: int
+    timestamped: bool
+    offsets: np.ndarray
+    lines: np.ndarray
+    non_empty_lines: np.ndarray
+    timestamps: np.ndarray
+
+    def is_valid(self, filename):
+        status = os.stat(filename)
+        return self.size == status.st_size and self.modification_time == status.st_mtime_ns
+
+    def find_line(self, mapped, line):
+        """
+        Returns the byte offset of the beginning of the non-empty data line with the given number (counted from 0),
+        and the line counts before it. The nearest indexed line is looked up, and the file is scanned from there,
+        so at most INDEX_STEP lines are scanned. Returns the end of the data if the file has fewer lines.
+        """
+        data_start, data_end = data_handler.get_data_range(mapped)
+        if len(self.offsets) == 0:
+            return data_start, (0, 0)
+        checkpoint = max(int(np.searchsorted(self.non_empty_lines, line, side="right")) - 1, 0)
+        position, lines, non_empty_lines = int(self.offsets[checkpoint]), int(self.lines[checkpoint]), int(self.non_empty_lines[checkpoint])
+        while non_empty_lines < line and position < data_end:
+            newline = mapped.find(b'\n', position, data_end)
+            if mapped[position:position + 1] != b'\n':
+                non_empty_lines += 1
+            position = data_end if newline == -1 else newline + 1
+            lines += 1
+        return position, (lines, non_empty_lines)
+
+    def get_line_range(self, mapped, first_line, last_line):
+        """
+        Returns the byte range of the non-empty data lines from first_line to last_line (not included),
+        and the line counts before the range, in the format of data_handler.split_file.
+        """
+        start, line_counts = self.find_line(mapped, max(first_line, 0))
+        end = self.find_line(mapped, max(last_line, first_line, 0))[0]
+        return start, end, line_counts
+
+    def get_time_range(self, mapped, start_time, end_time):
+        """
+        Returns a byte range that contains every line with a timestamp between start_time and end_time
+        (the lines have to be ordered by time), and the line counts before it. The range is aligned to the indexed lines,
+        so it can contain other lines as well, they have to be filtered after parsing.
+        """
+        data_start, data_end = data_handler.get_data_range(mapped)
+        if len(self.offsets) == 0:
+            return data_start, data_end, (0, 0)
+        valid = ~np.isnan(self.timestamps)
+        before = np.flatnonzero(valid & (self.timestamps < start_time))
+        after = np.flatnonzero(valid & (self.timestamps > end_time))
+        first = before[-1] if len(before) > 0 else 0
+        end = int(self.offsets[after[0]]) if len(after) > 0 else data_end
+        return int(self.offsets[first]), max(end, int(self.offsets[first])), (int(self.lines[first]), int(self.non_empty_lines[first]))
+
+    def to_arrays(self):
+        return {"version": np.array(INDEX_VERSION), "size": np.array(self.size), "modification_time": np.array(self.modification_time),
+                "timestamped": np.array(self.timestamped), "offsets": self.offsets, "lines": self.lines,
+                "non_empty_lines": self.non_empty_lines, "timestamps": self.timestamps}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(int(arrays["size"]), int(arrays["modification_time"]), bool(arrays["timestamped"]), arrays["offsets"], arrays["lines"],
+                   arrays["non_empty_lines"], arrays["timestamps"])
+
+
+def parse_timestamp(data_line):
+    """Returns the timestamp at the beginning of a sonar line, or NaN if it is corrupted."""
+    try:
+        return float(re.split('\t| ', data_line)[0])
+    except ValueError:
+        return np.nan
+
+
+def build_file_index(filename, timestamped=False, step=INDEX_STEP):
+    """
+    Indexes every step-th non-empty data line of the file. The file is scanned block by block with numpy:
+    a non-empty line starts where a byte that is not a newline follows a newline.
+    """
+    status = os.stat(filename)
+    offsets, lines, non_empty_lines = [], [], []
+    with data_handler.map_file(filename) as mapped:
+        data_start, data_end = data_handler.get_data_range(mapped)
+        line_count, non_empty_line_count = 0, 0
+        previous_byte = b'\n'[0]
+        for block_start in range(data_start, data_end, data_handler.MMAP_BLOCK_SIZE):
+            block = np.frombuffer(mapped[block_start:min(block_start + data_handler.MMAP_BLOCK_SIZE, data_end)], dtype=np.uint8)
+            newlines = block == b'\n'[0]
+            line_starts = np.flatnonzero(~newlines & (np.concatenate([[previous_byte], block[:-1]]) == b'\n'[0]))
+            newlines_before = np.concatenate([[0], np.cumsum(newlines)])
+            indexed = (non_empty_line_count + np.arange(len(line_starts))) % step == 0
+            offsets.append(block_start + line_starts[indexed])
+            lines.append(line_count + newlines_before[line_starts[indexed]])
+            non_empty_lines.append(non_empty_line_count + np.flatnonzero(indexed))
+            line_count += int(newlines_before[-1])
+            non_empty_line_count += len(line_starts)
+            previous_byte = block[-1]
+        offsets = np.concatenate(offsets).astype(np.int64) if offsets else np.zeros(0, dtype=np.int64)
+        timestamps = np.full(len(offsets), np.nan)
+        if timestamped:
+            for index, offset in enumerate(offsets.tolist()):
+                timestamps[index] = parse_timestamp(mapped[offset:data_handler.align_to_line(mapped, offset + 1)].decode().rstrip('\n'))
+    return FileIndex(status.st_size, status.st_mtime_ns, timestamped, offsets,
+                     np.concatenate(lines).astype(np.int64) if lines else np.zeros(0, dtype=np.int64),
+                     np.concatenate(non_empty_lines).astype(np.int64) if non_empty_lines else np.zeros(0, dtype=np.int64),
+                     timestamps)
+
+
+def load_file_index(filename):
+    """Returns the stored index of the file, or None if there is no valid index."""
+    try:
+        with np.load(filename + INDEX_SUFFIX) as arrays:
+            if int(arrays["version"]) != INDEX_VERSION:
+                return None
+            file_index = FileIndex.from_arrays({name: arrays[name] for name in arrays.files})
+    except (OSError, KeyError, ValueError):
+        return None
+    return file_index if file_index.is_valid(filename) else None
+
+
+def store_file_index(filename, file_index):
+    """
+    Writes the index next to the file. It is written into a temporary file first and renamed,
+    so a stopped run never leaves a half written index. If the directory is not writable, the index is not stored.
+    """
+    temporary_filename = filename + INDEX_SUFFIX + ".writing"
+    try:
+        with open(temporary_filename, "wb") as index_file:
+            np.savez(index_file, **file_index.to_arrays())
+        os.replace(temporary_filename, filename + INDEX_SUFFIX)
+    except OSError:
+        if os.path.exists(temporary_filename):
+            os.remove(temporary_filename)
+
+
+def get_file_index(filename, timestamped=False, metrics=None):
+    """
+    Returns the index of the file, it is built and stored if there is no valid stored index
+    (or the stored index has no timestamps, but they are needed).
+    """
+    with instrumentation.stage(metrics, "index " + filename, 1):
+        file_index = load_file_index(filename)
+        if file_index is None or (timestamped and not file_index.timestamped):
+            file_index = build_file_index(filename, timestamped, INDEX_STEP)
+            store_file_index(filename, file_index)
+    return file_index
+
+
+def read_sonar_window(filename, start_time, time_range=None, ping_range=None, metrics=None):
+    """
+    Reads the pings of the sonar file with a time between the two values of time_range (included, in the time values
+    of data_handler.read_sonar_columns) and a ping number (the number of the non-empty data line, counted from 0)
+    in ping_range (the last one is not included). Only the lines in the range found with the index are parsed.
+    Returns a columnar.SonarColumns container, the same as the matching pings of read_sonar_columns.
+    """
+    try:
+        file_index = get_file_index(filename, True, metrics)
+    except FileNotFoundError:
+        print("Invalid filename provided: ", filename)
+        return columnar.SonarColumns(np.zeros(0), np.zeros(1, dtype=np.int64), np.zeros(0), np.zeros(0))
+    with data_handler.map_file(filename) as mapped:
+        data_start, data_end = data_handler.get_data_range(mapped)
+        byte_ranges = [(data_start, data_end, (0, 0))]
+        if ping_range is not None:
+            byte_ranges.append(file_index.get_line_range(mapped, ping_range[0], ping_range[1]))
+        if time_range is not None and data_start < data_end:
+            time_diff = parse_timestamp(mapped[data_start:data_handler.align_to_line(mapped, data_start + 1)].decode()) - float(start_time)
+            byte_ranges.append(file_index.get_time_range(mapped, time_range[0] + time_diff, time_range[1] + time_diff))
+        start, end, line_counts = max(byte_ranges, key=lambda byte_range: byte_range[0])
+        end = max(start, min(byte_range[1] for byte_range in byte_ranges))
+    sonar_columns = data_handler.read_sonar_columns(filename, start_time, metrics, start, end, line_counts)
+    if time_range is None:
+        return sonar_columns
+    first, last = np.searchsorted(sonar_columns.time, time_range[0], side="left"), np.searchsorted(sonar_columns.time, time_range[1], side="right")
+    return sonar_columns.select_pings(int(first), int(last))
+
+
+def read_data_window(filename, start_time, frequency, headers, time_range, metrics=None):
+    """
+    Reads the lines of a file without timestamps that are needed for the times between the two values of time_range:
+    the line numbers are calculated from the time and the frequency, one more line is read on both sides
+    (for the nearest and the interpolated values), and the byte offsets are found with the index.
+    Returns the container and whether lines were skipped (like data_handler.read_data_columns),
+    and the number of the first line that was read (needed to find the lines by frequency).
+    """
+    try:
+        file_index = get_file_index(filename, False, metrics)
+    except FileNotFoundError:
+        print("Invalid filename provided: ", filename)
+        return columnar.TimeSeriesColumns(np.zeros(0), {header: np.zeros(0) for header in headers}), True, 0
+    first_line = max(int(np.floor((time_range[0] - float(start_time)) * frequency)) - 1, 0)
+    last_line = max(int(np.ceil((time_range[1] - float(start_time)) * frequency)) + 2, first_line)
+    with data_handler.map_file(filename) as mapped:
+        start, end, line_counts = file_index.get_line_range(mapped, first_line, last_line)
+    columns, lines_skipped = data_handler.read_data_columns(filename, start_time, frequency, headers, metrics, start, end, line_counts)
+    return columns, lines_skipped, line_counts[1]
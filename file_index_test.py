@@ -0,0 +1,108 @@
+import unittest
+import os
+import io
+import tempfile
+import contextlib
+import main
+import file_index
+import data_handler
+import fixtures
+
+
+def create_sonar_content(count=100):
+    """A ping every 0.1 seconds, with an empty and a corrupted line."""
+    lines = ["# Time\tAngle,Sample index\n"]
+    for ping in range(count):
+        if ping == 17:
+            lines.append("\n")
+        timestamp = "x" if ping == 40 else repr(1000 + ping / 10)
+        lines.append(timestamp + "\t" + repr(-0.5 + ping / 200) + ",2000\t0.3," + str(2500 + ping) + "\n")
+    return "".join(lines)
+
+
+def write_sonar_file(filename, count=100):
+    with open(filename, "w") as sonar_file:
+        sonar_file.write(create_sonar_content(count))
+
+
+class FileIndexTest(unittest.TestCase):
+
+    def test_0_index_matches_line_counts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "data.txt")
+            with open(filename, "w") as data_file:
+                data_file.write("# header\n1\n\n2\n3\n\n\n4\n5\n6")
+            index = file_index.build_file_index(filename, step=2)
+            with data_handler.map_file(filename) as mapped:
+                data_start = data_handler.get_data_range(mapped)[0]
+                for offset, lines, non_empty_lines in zip(index.offsets, index.lines, index.non_empty_lines):
+                    self.assertEqual((lines, non_empty_lines), data_handler.count_lines(mapped, data_start, offset))
+                    self.assertNotEqual(b"\n", mapped[offset:offset + 1])
+        self.assertEqual([0, 2, 4], index.non_empty_lines.tolist())
+
+
+    def test_1_line_range_matches_full_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "data.txt")
+            with open(filename, "w") as data_file:
+                data_file.write("# header\n" + "".join(str(line) + "\t" + str(line * 2) + ("\n\n" if line % 7 == 0 else "\n") for line in range(50)))
+            index = file_index.build_file_index(filename, step=4)
+            expected_outcome, lines_skipped = data_handler.read_data_columns(filename, 0, 10, ["first", "second"])
+            with data_handler.map_file(filename) as mapped:
+                for first_line, last_line in [(0, 50), (5, 9), (13, 14), (45, 60), (60, 70)]:
+                    start, end, line_counts = index.get_line_range(mapped, first_line, last_line)
+                    actual_value, lines_skipped = data_handler.read_data_columns(filename, 0, 10, ["first", "second"], start=start, end=end, line_counts=line_counts)
+                    self.assertEqual(expected_outcome.time[first_line:last_line].tolist(), actual_value.time.tolist())
+                    self.assertEqual(expected_outcome.values["second"][first_line:last_line].tolist(), actual_value.values["second"].tolist())
+
+
+    def test_2_sonar_time_and_ping_windows(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "sonar.txt")
+            write_sonar_file(filename)
+            file_index.INDEX_STEP, original_step = 8, file_index.INDEX_STEP
+            try:
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    sonar_columns = data_handler.read_sonar_columns(filename, 5)
+                    time_window = file_index.read_sonar_window(filename, 5, time_range=(7.05, 8.4))
+                    ping_window = file_index.read_sonar_window(filename, 5, ping_range=(30, 45))
+                    both_windows = file_index.read_sonar_window(filename, 5, time_range=(7.05, 8.4), ping_range=(30, 45))
+            finally:
+                file_index.INDEX_STEP = original_step
+        self.assertEqual(output.getvalue().count("corrupted at line"), output.getvalue().count("corrupted at line  41"))
+        self.assertTrue(output.getvalue().count("corrupted at line  41") >= 2)
+        in_window = (sonar_columns.time >= 7.05) & (sonar_columns.time <= 8.4)
+        self.assertEqual(sonar_columns.time[in_window].tolist(), time_window.time.tolist())
+        self.assertEqual(sonar_columns.select_pings(30, 44).sample_index.tolist(), ping_window.sample_index.tolist())
+        self.assertEqual([8.0, 8.1, 8.2, 8.3, 8.4], [round(time, 6) for time in both_windows.time.tolist()])
+
+
+    def test_3_index_stored_and_rebuilt(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "sonar.txt")
+            write_sonar_file(filename, 10)
+            first_index = file_index.get_file_index(filename, True)
+            self.assertTrue(os.path.exists(filename + file_index.INDEX_SUFFIX))
+            self.assertEqual(first_index.timestamps.tolist(), file_index.load_file_index(filename).timestamps.tolist())
+            write_sonar_file(filename, 20)
+            os.utime(filename, ns=(first_index.modification_time + 1, first_index.modification_time + 1))
+            self.assertIsNone(file_index.load_file_index(filename))
+            self.assertTrue(file_index.get_file_index(filename, True).size > first_index.size)
+
+
+    def test_4_main_time_window_matches_full_processing(self):
+        with fixtures.temporary_survey(create_sonar_content(), START_TIME=0, TIME_WINDOW=None) as directory:
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected_outcome = main.get_sonar_columns()
+                main.TIME_WINDOW = (3.3, 5.05)
+                actual_value = main.get_sonar_columns()
+            index_filenames = sorted(filename for filename in os.listdir(directory) if filename.endswith(file_index.INDEX_SUFFIX))
+        self.assertEqual(["gnss.txt.index.npz", "sonar.txt.index.npz", "speed_of_sound.txt.index.npz"], index_filenames)
+        in_window = (expected_outcome.time >= 3.3) & (expected_outcome.time <= 5.05)
+        self.assertEqual(expected_outcome.time[in_window].tolist(), actual_value.time.tolist())
+        for header in main.GNSS_HEADERS + main.SPEED_OF_SOUND_HEADERS:
+            self.assertEqual(expected_outcome.ping_values[header][in_window].tolist(), actual_value.ping_values[header].tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
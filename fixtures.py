@@ -0,0 +1,37 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+import main
+
+"""
+Shared fixtures of the tests. A temporary survey is a sonar file with the given content and copies of the GNSS and
+speed of sound files of the repository in a temporary directory, so the tests never write into the repository
+(for example the sidecar indexes of the input files).
+"""
+
+SONAR_LINES = "# header\n100 -1,3000 0,2500\n100.33 1,3000\n101.5 0.5,2000\n"
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+@contextmanager
+def temporary_survey(sonar_content=SONAR_LINES, cache=False, **constants):
+    """
+    Creates a temporary survey, and points the constants of main to its files while the with block runs.
+    The output directory is in the temporary directory, the same as the cache directory if cache is True
+    (otherwise the cache is disabled). Other constants of main can be set by name.
+    The constants are restored afterwards. Yields the temporary directory.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filenames = {name: os.path.join(directory, os.path.basename(getattr(main, name)))
+                     for name in ["SONAR_FILENAME", "GNSS_FILENAME", "SPEED_OF_SOUND_FILENAME"]}
+        with open(filenames["SONAR_FILENAME"], "w") as sonar_file:
+            sonar_file.write(sonar_content)
+        for name in ["GNSS_FILENAME", "SPEED_OF_SOUND_FILENAME"]:
+            shutil.copyfile(os.path.join(REPOSITORY_DIRECTORY, os.path.basename(getattr(main, name))), filenames[name])
+        settings = dict(filenames, OUTPUT_DIRECTORY=os.path.join(directory, "output"),
+                        CACHE_DIRECTORY=os.path.join(directory, "cache") if cache else None)
+        settings.update(constants)
+        with mock.patch.multiple(main, **settings):
+            yield directory
@@ -0,0 +1,150 @@
+import os
+import numpy as np
+
+"""
+Streaming bathymetric gridding. The located points are accumulated into a grid of fixed resolution while the pings
+stream through, and only the statistics of the cells are kept (count, mean, minimum, maximum and standard deviation
+of the altitude), so the memory usage depends on the covered area, not on the number of points.
+The grid is stored in square tiles, which are created when the first point falls into them,
+so the extent of the survey does not have to be known in advance. The cells are aligned to the multiples
+of the resolution in every UTM zone, every zone has its own tiles.
+The mean and the standard deviation are merged batch by batch with the parallel variance formula, which
+(unlike a sum of squares) stays precise for large altitudes.
+"""
+
+TILE_SIZE = 256
+STATISTICS = ["count", "mean", "min", "max", "std"]
+
+
+class GridTile:
+    """
+    The statistics of TILE_SIZE * TILE_SIZE cells, stored in flat arrays (row by row).
+    """
+
+    def __init__(self, tile_size=TILE_SIZE):
+        cell_count = tile_size * tile_size
+        self.count = np.zeros(cell_count, dtype=np.int64)
+        self.mean = np.zeros(cell_count)
+        self.squared_deviations = np.zeros(cell_count)
+        self.min = np.full(cell_count, np.inf)
+        self.max = np.full(cell_count, -np.inf)
+
+    def add(self, cells, values):
+        """
+        Adds the values to the cells of the tile (cells is the index of the cell of every value, in increasing order),
+        with vectorized bin accumulation: the statistics of the batch are calculated per cell, then merged with the earlier ones.
+        """
+        cell_count = len(self.count)
+        batch_count = np.bincount(cells, minlength=cell_count)
+        touched = batch_count > 0
+        batch_mean = np.zeros(cell_count)
+        batch_mean[touched] = np.bincount(cells, weights=values, minlength=cell_count)[touched] / batch_count[touched]
+        batch_squared_deviations = np.bincount(cells, weights=(values - batch_mean[cells]) ** 2, minlength=cell_count)
+        total_count = self.count + batch_count
+        delta = batch_mean[touched] - self.mean[touched]
+        self.mean[touched] += delta * batch_count[touched] / total_count[touched]
+        self.squared_deviations[touched] += (batch_squared_deviations[touched]
+                                             + delta ** 2 * self.count[touched] * batch_count[touched] / total_count[touched])
+        self.count = total_count
+
+        starts = np.flatnonzero(np.concatenate([[True], cells[1:] != cells[:-1]]))
+        unique_cells = cells[starts]
+        self.min[unique_cells] = np.minimum(self.min[unique_cells], np.minimum.reduceat(values, starts))
+        self.max[unique_cells] = np.maximum(self.max[unique_cells], np.maximum.reduceat(values, starts))
+
+
+class BathymetryGrid:
+    """
+    Accumulates located points into grid cells of resolution * resolution meters.
+    Points can be added as arrays (add), columnar.LocatedPoints containers (add_located_points),
+    or the record based output of main.get_located_points (add_records), in any number of batches.
+    """
+
+    def __init__(self, resolution, tile_size=TILE_SIZE):
+        if not resolution > 0:
+            raise ValueError('Invalid grid resolution: ', resolution)
+        self.resolution = resolution
+        self.tile_size = tile_size
+        self.tiles = {}
+        self.point_count = 0
+
+    def add(self, x, y, altitude, zones):
+        """
+        Adds the points (UTM coordinates, altitude and zone of every point) to the grid.
+        The points of a zone are sorted once by tile and by cell inside the tiles, so every tile gets one slice.
+        """
+        x, y, altitude, zones = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), np.asarray(altitude, dtype=np.float64), np.asarray(zones)
+        valid = np.isfinite(x) & np.isfinite(y) & np.isfinite(altitude)
+        for zone in np.unique(zones[valid]).tolist():
+            in_zone = valid & (zones == zone)
+            cell_x = np.floor(x[in_zone] / self.resolution).astype(np.int64)
+            cell_y = np.floor(y[in_zone] / self.resolution).astype(np.int64)
+            tile_x, tile_y = cell_x // self.tile_size, cell_y // self.tile_size
+            cells = (cell_y - tile_y * self.tile_size) * self.tile_size + cell_x - tile_x * self.tile_size
+            first_tile_x, first_tile_y = tile_x.min(), tile_y.min()
+            tile_keys = (tile_x - first_tile_x) * (tile_y.max() - first_tile_y + 1) + tile_y - first_tile_y
+            order = np.argsort(tile_keys * self.tile_size * self.tile_size + cells)
+            tile_keys, cells, values = tile_keys[order], cells[order], altitude[in_zone][order]
+            starts = np.flatnonzero(np.concatenate([[True], tile_keys[1:] != tile_keys[:-1], [True]]))
+            for start, end in zip(starts[:-1].tolist(), starts[1:].tolist()):
+                key = (zone, int(tile_x[order[start]]), int(tile_y[order[start]]))
+                if key not in self.tiles:
+                    self.tiles[key] = GridTile(self.tile_size)
+                self.tiles[key].add(cells[start:end], values[start:end])
+        self.point_count += int(valid.sum())
+
+    def add_located_points(self, located_points):
+        """Adds the points of a columnar.LocatedPoints container, the zone of each ping is used for its points."""
+        self.add(located_points.X, located_points.Y, located_points.altitude, np.repeat(located_points.zone, np.diff(located_points.ping_offsets)))
+
+    def add_records(self, all_located_points):
+        """Adds the points of the output of main.get_located_points."""
+        points = [point for line in all_located_points for point in line["points"]]
+        self.add([float(point["X"]) for point in points], [float(point["Y"]) for point in points],
+                 [float(point["altitude"]) for point in points], [point["zone"] for point in points])
+
+    def get_grids(self):
+        """
+        Assembles the tiles of every zone into 2D arrays (the first index is the row, increasing with Y).
+        Returns a dictionary for every zone with the coordinates of the corner of the first cell (min_x, min_y),
+        the resolution, and one array for each of the STATISTICS. Empty cells are NaN (zero for the count).
+        """
+        grids = {}
+        for zone in sorted({zone for zone, tile_x, tile_y in self.tiles}):
+            tile_positions = [(tile_x, tile_y) for tile_zone, tile_x, tile_y in self.tiles if tile_zone == zone]
+            first_x, first_y = min(position[0] for position in tile_positions), min(position[1] for position in tile_positions)
+            columns = (max(position[0] for position in tile_positions) - first_x + 1) * self.tile_size
+            rows = (max(position[1] for position in tile_positions) - first_y + 1) * self.tile_size
+            grid = {
+                "min_x": first_x * self.tile_size * self.resolution,
+                "min_y": first_y * self.tile_size * self.resolution,
+                "resolution": self.resolution,
+                "count": np.zeros((rows, columns), dtype=np.int64)
+            }
+            for statistic in STATISTICS[1:]:
+                grid[statistic] = np.full((rows, columns), np.nan)
+            for tile_x, tile_y in tile_positions:
+                tile = self.tiles[(zone, tile_x, tile_y)]
+                row, column = (tile_y - first_y) * self.tile_size, (tile_x - first_x) * self.tile_size
+                area = (slice(row, row + self.tile_size), slice(column, column + self.tile_size))
+                shape = (self.tile_size, self.tile_size)
+                filled = tile.count.reshape(shape) > 0
+                grid["count"][area] = tile.count.reshape(shape)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    tile_statistics = {"mean": tile.mean, "min": tile.min, "max": tile.max, "std": np.sqrt(tile.squared_deviations / tile.count)}
+                for statistic, values in tile_statistics.items():
+                    grid[statistic][area] = np.where(filled, values.reshape(shape), np.nan)
+            grids[zone] = grid
+        return grids
+
+    def save(self, directory):
+        """
+        Writes the grid of every zone into a numpy .npz file (grid_<zone>.npz) in the directory.
+        Returns the names of the written files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        filenames = []
+        for zone, grid in self.get_grids().items():
+            filenames.append(os.path.join(directory, "grid_" + zone + ".npz"))
+            np.savez(filenames[-1], **grid)
+        return filenames
@@ -0,0 +1,77 @@
+import unittest
+import os
+import tempfile
+import gridding
+import columnar
+import numpy as np
+
+
+class GriddingTest(unittest.TestCase):
+
+    def test_0_cell_statistics(self):
+        grid = gridding.BathymetryGrid(1)
+        grid.add([0.5, 0.2, 1.5], [0.5, 0.9, 0.5], [-10, -12, -20], ["U10", "U10", "U10"])
+        result = grid.get_grids()["U10"]
+        self.assertEqual([2, 1], result["count"][0, :2].tolist())
+        self.assertEqual([-11, -20], result["mean"][0, :2].tolist())
+        self.assertEqual([-12, -20], result["min"][0, :2].tolist())
+        self.assertEqual([-10, -20], result["max"][0, :2].tolist())
+        self.assertEqual([1, 0], result["std"][0, :2].tolist())
+        self.assertTrue(np.isnan(result["mean"][1, 0]))
+
+
+    def test_1_batches_match_one_batch(self):
+        generator = np.random.default_rng(0)
+        x = generator.uniform(-300, 700, 5000)
+        y = generator.uniform(1000, 1400, 5000)
+        altitude = generator.normal(-5000, 3, 5000)
+        zones = np.where(x > 600, "U11", "U10")
+        expected_grid = gridding.BathymetryGrid(10, tile_size=16)
+        expected_grid.add(x, y, altitude, zones)
+        actual_grid = gridding.BathymetryGrid(10, tile_size=16)
+        for start in range(0, 5000, 777):
+            actual_grid.add(x[start:start + 777], y[start:start + 777], altitude[start:start + 777], zones[start:start + 777])
+        expected_outcome, actual_value = expected_grid.get_grids(), actual_grid.get_grids()
+        self.assertEqual(["U10", "U11"], sorted(actual_value))
+        for zone in expected_outcome:
+            for statistic in gridding.STATISTICS:
+                np.testing.assert_allclose(expected_outcome[zone][statistic], actual_value[zone][statistic], rtol=1e-9)
+
+
+    def test_2_statistics_match_brute_force(self):
+        generator = np.random.default_rng(1)
+        x = generator.uniform(0, 50, 2000)
+        y = generator.uniform(-50, 0, 2000)
+        altitude = generator.normal(-20, 1, 2000)
+        grid = gridding.BathymetryGrid(5, tile_size=4)
+        for start in range(0, 2000, 300):
+            grid.add(x[start:start + 300], y[start:start + 300], altitude[start:start + 300], ["U10"] * len(x[start:start + 300]))
+        result = grid.get_grids()["U10"]
+        column, row = int(23 // 5), int((-17 - result["min_y"]) // 5)
+        in_cell = (x >= 20) & (x < 25) & (y >= -20) & (y < -15)
+        self.assertEqual(in_cell.sum(), result["count"][row, column])
+        self.assertAlmostEqual(altitude[in_cell].mean(), result["mean"][row, column])
+        self.assertAlmostEqual(altitude[in_cell].std(), result["std"][row, column])
+        self.assertEqual(altitude[in_cell].min(), result["min"][row, column])
+
+
+    def test_3_located_points_and_save(self):
+        located_points = columnar.LocatedPoints(np.array([0.0, 1.0]), np.array([0, 2, 3]), np.array([1.0, 2.0, 3.0]), np.array([1.0, 2.0, np.nan]),
+                                                np.array([-1.0, -2.0, -3.0]), np.array(["U10", "U11"]))
+        grid = gridding.BathymetryGrid(2)
+        grid.add_located_points(located_points)
+        grid.add_records(located_points.to_records())
+        self.assertEqual(4, grid.point_count)
+        with tempfile.TemporaryDirectory() as directory:
+            grid.save(directory)
+            saved_grid = np.load(os.path.join(directory, "grid_U10.npz"))
+            self.assertEqual(4, saved_grid["count"].sum())
+            self.assertEqual(["grid_U10.npz"], os.listdir(directory))
+
+
+    def test_4_invalid_resolution(self):
+        self.assertRaises(ValueError, gridding.BathymetryGrid, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+"""
+Instrumentation of the processing stages. A Metrics object records the wall time, the number of calls,
+the number of processed items and (optionally) the memory allocations of each stage.
+The functions of the pipeline take an optional metrics argument, if it is None, nothing is recorded.
+Stages with the same name are accumulated, so a stage that runs once for every line of data
+(for example the projection of the decimal engine) has one record with the total time.
+"""
+
+
+class Metrics:
+    """
+    Collects the records of the stages. If trace_allocations is True, tracemalloc is started (if it is not running yet),
+    and the allocated memory (the difference of the traced memory before and after the stage)
+    and the peak memory (compared to the start of the stage) are recorded as well. Tracing slows down the processing.
+    The callback (if provided) is called with the name and the record of the stage every time a stage finishes.
+    """
+
+    def __init__(self, trace_allocations=False, callback=None):
+        self.records = {}
+        self.trace_allocations = trace_allocations
+        self.callback = callback
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, items=None):
+        """
+        Measures the stage running in the with block. The number of processed items can be given in advance,
+        or set later by assigning the "items" key of the yielded dictionary.
+        """
+        current = {"items": items}
+        if self.trace_allocations:
+            memory_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield current
+        finally:
+            wall_time = time.perf_counter() - start
+            record = self.records.setdefault(name, {"calls": 0, "wall_time": 0.0, "items": 0})
+            record["calls"] += 1
+            record["wall_time"] += wall_time
+            record["items"] += current["items"] or 0
+            if self.trace_allocations:
+                memory_after, memory_peak = tracemalloc.get_traced_memory()
+                record["allocated"] = record.get("allocated", 0) + memory_after - memory_before
+                record["peak"] = max(record.get("peak", 0), memory_peak - memory_before)
+            if self.callback is not None:
+                self.callback(name, record)
+
+    def to_dict(self):
+        """Returns the records with the throughput (items per second) of every stage."""
+        return {name: dict(record, items_per_second=record["items"] / record["wall_time"] if record["wall_time"] > 0 else None)
+                for name, record in self.records.items()}
+
+    def to_json(self, filename=None):
+        """Returns the records as a JSON string, and writes them into a file, if the filename is provided."""
+        json_data = json.dumps(self.to_dict(), indent=4)
+        if filename is not None:
+            with open(filename, "w") as json_file:
+                json_file.write(json_data)
+        return json_data
+
+
+@contextmanager
+def stage(metrics, name, items=None):
+    """
+    Measures a stage with the metrics object, or does nothing if metrics is None.
+    Yields a dictionary in both cases, so the number of items can be set the same way.
+    """
+    if metrics is None:
+        yield {"items": items}
+    else:
+        with metrics.stage(name, items) as current:
+            yield current
@@ -0,0 +1,74 @@
+import unittest
+import json
+import os
+import tempfile
+import instrumentation
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_0_stage_accumulates(self):
+        metrics = instrumentation.Metrics()
+        for items in [2, 3]:
+            with metrics.stage("stage", items):
+                pass
+        record = metrics.records["stage"]
+        self.assertEqual(2, record["calls"])
+        self.assertEqual(5, record["items"])
+        self.assertGreaterEqual(record["wall_time"], 0)
+
+
+    def test_1_stage_items_set_later(self):
+        metrics = instrumentation.Metrics()
+        with metrics.stage("stage") as current:
+            current["items"] = 7
+        self.assertEqual(7, metrics.records["stage"]["items"])
+
+
+    def test_2_stage_without_metrics(self):
+        with instrumentation.stage(None, "stage", 1) as current:
+            current["items"] = 2
+        self.assertEqual(2, current["items"])
+
+
+    def test_3_trace_allocations(self):
+        metrics = instrumentation.Metrics(trace_allocations=True)
+        with metrics.stage("allocation"):
+            data = [[index] for index in range(10000)]
+        self.assertGreater(metrics.records["allocation"]["allocated"], 0)
+        self.assertGreaterEqual(metrics.records["allocation"]["peak"], metrics.records["allocation"]["allocated"])
+        del data
+
+
+    def test_4_callback(self):
+        finished_stages = []
+        metrics = instrumentation.Metrics(callback=lambda name, record: finished_stages.append(name))
+        with metrics.stage("first"):
+            pass
+        with metrics.stage("second"):
+            pass
+        self.assertEqual(["first", "second"], finished_stages)
+
+
+    def test_5_to_json(self):
+        metrics = instrumentation.Metrics()
+        with metrics.stage("stage", 1):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "metrics.json")
+            json_data = metrics.to_json(filename)
+            with open(filename) as json_file:
+                self.assertEqual(json.loads(json_data), json.load(json_file))
+        self.assertEqual(1, json.loads(json_data)["stage"]["items"])
+
+
+    def test_6_stage_recorded_on_exception(self):
+        metrics = instrumentation.Metrics()
+        with self.assertRaises(ValueError):
+            with metrics.stage("failing"):
+                raise ValueError()
+        self.assertEqual(1, metrics.records["failing"]["calls"])
+
+
+if __name__ == '__main__':
+    unittest.main()
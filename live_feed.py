@@ -0,0 +1,183 @@
+import time
+import numpy as np
+import columnar
+import data_handler
+import main
+
+"""
+Live feed mode: the points are located while the input files are still being written, ping by ping.
+The files are followed like with "tail -f" (a named pipe can be followed the same way),
+only the recent part of the GNSS and speed of sound data is kept in memory (a sliding window),
+and a ping is located as soon as the auxiliary data after its time arrives, or when it waited
+longer than the maximal latency (then the latest available auxiliary data is used).
+"""
+
+WINDOW_SECONDS = 10
+MAX_LATENCY_SECONDS = 2
+POLL_INTERVAL_SECONDS = 0.1
+
+
+class FileTail:
+    """
+    Follows a growing text file. read_lines returns the complete lines appended since the last call,
+    an unfinished last line is kept until its end arrives. The header (first line) is skipped.
+    If the file does not exist yet, no lines are returned until it is created.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.data_file = None
+        self.buffer = ""
+        self.header_skipped = False
+
+    def read_lines(self):
+        if self.data_file is None:
+            try:
+                self.data_file = open(self.filename, "r")
+            except FileNotFoundError:
+                return []
+        self.buffer += self.data_file.read()
+        data_lines = self.buffer.split('\n')
+        self.buffer = data_lines.pop()
+        if not self.header_skipped and data_lines:
+            data_lines = data_lines[1:]
+            self.header_skipped = True
+        return data_lines
+
+    def close(self):
+        if self.data_file is not None:
+            self.data_file.close()
+
+
+class AuxiliaryWindow:
+    """
+    The recent lines of data without timestamps (GNSS, speed of sound). The time of each line is calculated
+    from its position and the frequency, the same way as in data_handler.read_data, corrupted lines are reported and skipped.
+    """
+
+    def __init__(self, filename, start_time, frequency, headers):
+        self.tail = FileTail(filename)
+        self.start_time = start_time
+        self.frequency = frequency
+        self.headers = headers
+        self.line_count = 0
+        self.time = np.zeros(0)
+        self.values = np.zeros((0, len(headers)))
+
+    def update(self):
+        """Reads the new lines and adds the valid ones to the window."""
+        data_lines = [data_line for data_line in self.tail.read_lines() if data_line != ""]
+        if data_lines == []:
+            return
+        values, valid = data_handler.parse_numeric_block(data_lines, len(self.headers))
+        for index in np.flatnonzero(~valid):
+            print("Invalid or missing data in ", self.tail.filename, " at line ", self.line_count + index)
+        time = self.start_time + (self.line_count + np.flatnonzero(valid)) / self.frequency
+        self.line_count += len(data_lines)
+        self.time = np.concatenate([self.time, time])
+        self.values = np.concatenate([self.values, values])
+
+    @property
+    def latest_time(self):
+        return self.time[-1] if len(self.time) else None
+
+    def prune(self, time):
+        """Removes the lines older than the given time, except the last one of them (it can still be the nearest)."""
+        first_kept = max(int(np.searchsorted(self.time, time, side="left")) - 1, 0)
+        self.time = self.time[first_kept:]
+        self.values = self.values[first_kept:]
+
+    def extend(self, sonar_columns):
+        """Connects the nearest lines of the window to the pings, see data_handler.extend_sonar_columns."""
+        other_columns = columnar.TimeSeriesColumns(self.time, {header: self.values[:, index] for index, header in enumerate(self.headers)})
+        data_handler.extend_sonar_columns(sonar_columns, other_columns, self.headers, corrupted_data=True)
+
+
+class LiveLocator:
+    """
+    Locates the points of the pings of growing input files. Call poll regularly (or use run),
+    it returns the located points of the pings that became ready since the last call.
+    The clock can be replaced for testing, it has to return the time in seconds.
+    """
+
+    def __init__(self, sonar_filename, gnss_filename, speed_of_sound_filename, start_time=main.START_TIME,
+                 window=WINDOW_SECONDS, max_latency=MAX_LATENCY_SECONDS, clock=time.monotonic):
+        self.sonar_tail = FileTail(sonar_filename)
+        self.auxiliary_windows = [
+            AuxiliaryWindow(gnss_filename, start_time, main.GNSS_FREQUENCY, main.GNSS_HEADERS),
+            AuxiliaryWindow(speed_of_sound_filename, start_time, main.SPEED_OF_SOUND_FREQUENCY, main.SPEED_OF_SOUND_HEADERS)
+        ]
+        self.start_time = start_time
+        self.window = window
+        self.max_latency = max_latency
+        self.clock = clock
+        self.time_diff = None
+        self.sonar_line_count = 0
+        self.pending_pings = []
+
+    def read_pings(self):
+        """Parses the new sonar lines and adds them to the pending pings with their arrival time."""
+        data_lines = [data_line for data_line in self.sonar_tail.read_lines() if data_line != ""]
+        if data_lines == []:
+            return
+        timestamps, valid, beam_counts, angle, sample_index = data_handler.parse_sonar_block(data_lines)
+        for index in np.flatnonzero(~valid):
+            print("Sonar data timestamp corrupted at line ", self.sonar_line_count + index)
+        self.sonar_line_count += len(data_lines)
+        if self.time_diff is None and valid.any():
+            self.time_diff = timestamps[np.argmax(valid)] - self.start_time
+        arrival = self.clock()
+        ping_offsets = columnar.create_ping_offsets(beam_counts)
+        for index in np.flatnonzero(valid):
+            start, end = ping_offsets[index], ping_offsets[index + 1]
+            self.pending_pings.append((timestamps[index] - self.time_diff, angle[start:end], sample_index[start:end], arrival))
+
+    def is_ready(self, ping, now):
+        ping_time, angle, sample_index, arrival = ping
+        if any(window.latest_time is None for window in self.auxiliary_windows):
+            return False
+        if now - arrival >= self.max_latency:
+            return True
+        return all(window.latest_time >= ping_time for window in self.auxiliary_windows)
+
+    def poll(self):
+        """
+        Reads the new lines of all sources, and locates the pings that are ready, in the order of their arrival.
+        Returns a columnar.LocatedPoints container (empty if no ping was ready).
+        """
+        self.read_pings()
+        for window in self.auxiliary_windows:
+            window.update()
+        now = self.clock()
+        ready_count = 0
+        while ready_count < len(self.pending_pings) and self.is_ready(self.pending_pings[ready_count], now):
+            ready_count += 1
+        ready_pings, self.pending_pings = self.pending_pings[:ready_count], self.pending_pings[ready_count:]
+        sonar_columns = columnar.SonarColumns(
+            np.array([ping[0] for ping in ready_pings], dtype=np.float64),
+            columnar.create_ping_offsets([len(ping[1]) for ping in ready_pings]),
+            np.concatenate([ping[1] for ping in ready_pings]) if ready_pings else np.zeros(0),
+            np.concatenate([ping[2] for ping in ready_pings]) if ready_pings else np.zeros(0))
+        if ready_pings:
+            for window in self.auxiliary_windows:
+                window.extend(sonar_columns)
+                window.prune(sonar_columns.time[-1] - self.window)
+            return main.locate_columns(sonar_columns)
+        return columnar.LocatedPoints(sonar_columns.time, sonar_columns.ping_offsets, np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0, dtype=str))
+
+    def run(self, callback, poll_interval=POLL_INTERVAL_SECONDS, duration=None):
+        """
+        Polls the sources every poll_interval seconds, and calls the callback with the located points
+        of every poll that located at least one ping. Runs until duration seconds passed (forever if None).
+        """
+        end = None if duration is None else self.clock() + duration
+        while end is None or self.clock() < end:
+            located_points = self.poll()
+            if len(located_points):
+                callback(located_points)
+            time.sleep(poll_interval)
+
+    def close(self):
+        self.sonar_tail.close()
+        for window in self.auxiliary_windows:
+            window.tail.close()
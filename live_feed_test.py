@@ -0,0 +1,109 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import columnar
+import data_handler
+import live_feed
+import main
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class LiveFeedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filenames = [os.path.join(self.directory.name, filename) for filename in ["sonar.txt", "gnss.txt", "speed_of_sound.txt"]]
+        with open("gnss.txt") as gnss_file:
+            self.gnss_lines = gnss_file.read().split("\n")
+        with open("speed_of_sound.txt") as speed_file:
+            self.speed_lines = speed_file.read().split("\n")
+        self.sonar_lines = ["# header", "100 -1,3000 0,2500", "100.5 1,3000", "101.5 0.5,2000 -0.5,2100", "102 0,2000"]
+        self.clock = FakeClock()
+        self.live_locator = live_feed.LiveLocator(*self.filenames, window=1, clock=self.clock)
+
+
+    def tearDown(self):
+        self.live_locator.close()
+        self.directory.cleanup()
+
+
+    def append(self, filename, lines):
+        with open(filename, "a") as data_file:
+            data_file.write("".join(line + "\n" for line in lines))
+
+
+    def test_0_file_tail_partial_lines(self):
+        tail = live_feed.FileTail(self.filenames[0])
+        self.assertEqual([], tail.read_lines())
+        with open(self.filenames[0], "a") as data_file:
+            data_file.write("# header\n1 1,1\n2 2,")
+        self.assertEqual(["1 1,1"], tail.read_lines())
+        with open(self.filenames[0], "a") as data_file:
+            data_file.write("2\n")
+        self.assertEqual(["2 2,2"], tail.read_lines())
+        tail.close()
+
+
+    def test_1_ping_waits_for_auxiliary_data(self):
+        self.append(self.filenames[0], self.sonar_lines[:3])
+        self.append(self.filenames[1], self.gnss_lines[:2])
+        self.append(self.filenames[2], self.speed_lines[:2])
+        self.assertEqual(1, len(self.live_locator.poll()))
+        self.append(self.filenames[1], self.gnss_lines[2:30])
+        self.assertEqual(0, len(self.live_locator.poll()))
+        self.append(self.filenames[2], self.speed_lines[2:3])
+        self.assertEqual(1, len(self.live_locator.poll()))
+
+
+    def test_2_max_latency(self):
+        self.append(self.filenames[0], self.sonar_lines[:3])
+        self.append(self.filenames[1], self.gnss_lines[:2])
+        self.append(self.filenames[2], self.speed_lines[:2])
+        self.assertEqual(1, len(self.live_locator.poll()))
+        self.clock.now = live_feed.MAX_LATENCY_SECONDS
+        self.assertEqual(1, len(self.live_locator.poll()))
+
+
+    def test_3_same_as_batch_processing(self):
+        steps = [(self.sonar_lines[:2], self.gnss_lines[:30], self.speed_lines[:3]),
+                 (self.sonar_lines[2:3], self.gnss_lines[30:60], []),
+                 (self.sonar_lines[3:4], self.gnss_lines[60:110], []),
+                 (self.sonar_lines[4:], self.gnss_lines[110:200], self.speed_lines[3:5])]
+        located_parts = []
+        for step in steps:
+            for filename, lines in zip(self.filenames, step):
+                self.append(filename, lines)
+            located_parts.append(self.live_locator.poll())
+        live_points = columnar.LocatedPoints.concatenate(located_parts)
+        sonar_columns = data_handler.read_sonar_columns(self.filenames[0], 0)
+        for filename, frequency, headers in [(self.filenames[1], main.GNSS_FREQUENCY, main.GNSS_HEADERS),
+                                             (self.filenames[2], main.SPEED_OF_SOUND_FREQUENCY, main.SPEED_OF_SOUND_HEADERS)]:
+            other_columns, lines_skipped = data_handler.read_data_columns(filename, 0, frequency, headers)
+            data_handler.extend_sonar_columns(sonar_columns, other_columns, headers, 0, True)
+        batch_points = main.locate_columns(sonar_columns)
+        self.assertEqual(4, len(live_points))
+        np.testing.assert_allclose(batch_points.X, live_points.X)
+        np.testing.assert_allclose(batch_points.altitude, live_points.altitude)
+
+
+    def test_4_window_is_pruned(self):
+        self.append(self.filenames[0], self.sonar_lines)
+        self.append(self.filenames[1], self.gnss_lines[:200])
+        self.append(self.filenames[2], self.speed_lines[:5])
+        self.live_locator.poll()
+        gnss_window = self.live_locator.auxiliary_windows[0]
+        self.assertLess(len(gnss_window.time), 199)
+        self.assertLessEqual(gnss_window.time[0], 2 - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,54 +1,285 @@
+import os
 from decimal import Decimal
 import data_handler
 from math import sin, cos, pi
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 from pyproj import Proj
+import columnar
+import vectorized_locator
+import projection
+import point_writer
+import instrumentation
+import ray_tracing
+import gridding
+import result_cache
+import file_index
 
 
 _projections = {}
 
-
-def get_sonar_data():
+SAMPLE_FREQUENCY = 78125
+ENGINES = ["decimal", "numpy"]
+STREAM_CHUNK_SIZE = 1000
+PARALLEL_CHUNK_SIZE = 1000
+
+"""
+The constants are containing information about the current data format and devices.
+If we change these in the future, we only need to manipulate the constants.
+"""
+START_TIME = 0
+
+GNSS_FREQUENCY = 50
+GNSS_HEADERS = ["roll", "pitch", "heading", "latitude", "longitude", "altitude", "heave"]
+GNSS_FILENAME = "gnss.txt"
+
+SPEED_OF_SOUND_FREQUENCY = 1
+SPEED_OF_SOUND_HEADERS = ["speed"]
+SPEED_OF_SOUND_FILENAME = "speed_of_sound.txt"
+
+SONAR_FILENAME = "sonar.txt"
+OUTPUT_DIRECTORY = "located_points"
+METRICS_FILENAME = "metrics.json"
+
+"""
+If the grid resolution (in meters) is set, the main function grids the located points as well (see the gridding module),
+and saves the grid of every zone into the output directory.
+"""
+GRID_RESOLUTION = None
+
+"""
+The parsed inputs and the outputs of the main function are cached in the cache directory (set it to None to disable
+the cache), see the result_cache module. The cache version has to be increased if the processing changes.
+"""
+CACHE_DIRECTORY = result_cache.CACHE_DIRECTORY
+CACHE_SIZE = result_cache.MAX_CACHE_SIZE
+CACHE_VERSION = 1
+
+ANGULAR_HEADERS = ["roll", "pitch", "heading"]
+
+"""
+Georeferencing of the vectorized engine: the attitude model can be "legacy" (the formulas of calculate_coordinates)
+or "rotation" (full 3D rotation of the beams, see vectorized_locator.locate_beams_rotated).
+The lever arm is the position of the sonar compared to the GNSS antenna (forward, starboard, down in meters),
+it is only used by the rotation model, the same as the heave correction.
+"""
+ATTITUDE_MODEL = "legacy"
+LEVER_ARM = [0, 0, 0]
+HEAVE_CORRECTION = False
+
+"""
+If a sound velocity profile file is set (depth and speed pairs, see the ray_tracing module), the vectorized engine
+bends the rays according to the profile (with the rotation model) instead of using straight rays.
+"""
+SOUND_VELOCITY_PROFILE_FILENAME = None
+ALIGNMENTS = ["nearest", "interpolate"]
+
+"""
+Precision of the record based pipeline: "decimal" (the original Decimal arithmetic) or "float64" (native floats,
+much faster). The trigonometric functions work with floats anyway, so the results of the two precisions
+differ far less than PRECISION_TOLERANCE (in meters), see check_precision.
+The main function uses PRECISION.
+"""
+PRECISIONS = {"decimal": Decimal, "float64": float}
+PRECISION = "float64"
+PRECISION_TOLERANCE = 0.001
+
+"""
+Selective processing: if the time window is set (the first and the last time, in the time values of the output),
+or the ping window (the first ping and the ping after the last one, counted from 0 in the sonar file),
+only the matching pings are processed. The lines are found with the sidecar indexes of the input files
+(see the file_index module), so the rest of the files is not parsed.
+"""
+TIME_WINDOW = None
+PING_WINDOW = None
+
+
+def get_sonar_data(alignment="nearest", metrics=None, precision="decimal"):
     """
     A simple function to read and manage the data contained in the text files.
-    The constants are containing information about the current data format and devices.
-    If we change these in the future, we only need to manipulate the constants.
     Returns an array of extended sonar data, each element contains:
     the time (compared to the START_TIME reference point), an array of angle/sample index pairs,
     the relevant location and orientation data of that time (roll, pitch, heading, longitude, latitude, altitude, heave),
     and the speed of sound.
+    The alignment can be "nearest" (the values of the nearest GNSS and speed of sound lines are used)
+    or "interpolate" (the values are interpolated to the time of the sonar line).
+    If a metrics object is provided (see the instrumentation module), every stage is recorded.
+    The precision (see PRECISIONS) decides the type of the numbers: Decimal or float.
     """
-    START_TIME = 0
+    if alignment not in ALIGNMENTS:
+        raise ValueError('Unknown alignment: ', alignment)
+    if precision not in PRECISIONS:
+        raise ValueError('Unknown precision: ', precision)
+    number_type = PRECISIONS[precision]
+    print("Collecting data...")
+    sonar_data = data_handler.read_sonar_data(SONAR_FILENAME, START_TIME, metrics, number_type)
+    gnss_data, lines_skipped = data_handler.read_data(GNSS_FILENAME, START_TIME, GNSS_FREQUENCY, GNSS_HEADERS, metrics, number_type)
+    with instrumentation.stage(metrics, "join " + GNSS_FILENAME, len(sonar_data)):
+        if alignment == "interpolate":
+            sonar_data = data_handler.interpolate_sonar_data(sonar_data, gnss_data, GNSS_HEADERS, ANGULAR_HEADERS, number_type)
+        else:
+            sonar_data = data_handler.extend_sonar_data(sonar_data, gnss_data, GNSS_HEADERS, GNSS_FREQUENCY, lines_skipped)
+    speed_of_sound_data, lines_skipped = data_handler.read_data(SPEED_OF_SOUND_FILENAME, START_TIME, SPEED_OF_SOUND_FREQUENCY, SPEED_OF_SOUND_HEADERS,
+                                                                metrics, number_type)
+    with instrumentation.stage(metrics, "join " + SPEED_OF_SOUND_FILENAME, len(sonar_data)):
+        if alignment == "interpolate":
+            sonar_data = data_handler.interpolate_sonar_data(sonar_data, speed_of_sound_data, SPEED_OF_SOUND_HEADERS, number_type=number_type)
+        else:
+            sonar_data = data_handler.extend_sonar_data(sonar_data, speed_of_sound_data, SPEED_OF_SOUND_HEADERS, SPEED_OF_SOUND_FREQUENCY, lines_skipped)
+    return sonar_data
+
+
+def get_input_filenames():
+    """Returns the input files of the processing (the files the results depend on)."""
+    filenames = [SONAR_FILENAME, GNSS_FILENAME, SPEED_OF_SOUND_FILENAME]
+    if SOUND_VELOCITY_PROFILE_FILENAME is not None:
+        filenames.append(SOUND_VELOCITY_PROFILE_FILENAME)
+    return filenames
+
+
+def get_processing_parameters():
+    """Returns the constants that the results depend on, for the keys of the result cache."""
+    return {
+        "version": CACHE_VERSION,
+        "start_time": START_TIME,
+        "sample_frequency": SAMPLE_FREQUENCY,
+        "gnss": [GNSS_FREQUENCY, GNSS_HEADERS],
+        "speed_of_sound": [SPEED_OF_SOUND_FREQUENCY, SPEED_OF_SOUND_HEADERS],
+        "angular_headers": ANGULAR_HEADERS,
+        "precision": PRECISION,
+        "attitude": [ATTITUDE_MODEL, LEVER_ARM, HEAVE_CORRECTION],
+        "grid_resolution": GRID_RESOLUTION,
+        "window": [TIME_WINDOW, PING_WINDOW]
+    }
 
-    GNSS_FREQUENCY = 50
-    GNSS_HEADERS = ["roll", "pitch", "heading", "latitude", "longitude", "altitude", "heave"]
-    GNSS_FILENAME = "gnss.txt"
 
-    SPEED_OF_SOUND_FREQUENCY = 1
-    SPEED_OF_SOUND_HEADERS = ["speed"]
-    SPEED_OF_SOUND_FILENAME = "speed_of_sound.txt"
+def get_cache():
+    """Returns the result cache, or None if the cache is disabled."""
+    return None if CACHE_DIRECTORY is None else result_cache.ResultCache(CACHE_DIRECTORY, CACHE_SIZE)
 
-    SONAR_FILENAME = "sonar.txt"
 
+def get_sonar_columns(alignment="nearest", metrics=None, workers=1, cache=None):
+    """
+    Columnar version of get_sonar_data: returns a columnar.SonarColumns container
+    extended with the GNSS and speed of sound values of each ping.
+    If workers is not 1, the sonar and GNSS files are parsed in parallel, split into byte ranges
+    (None means one worker for every core), the result is the same as in the sequential case.
+    If a result_cache.ResultCache is provided, the result is loaded from the cache if the input files
+    and the constants did not change, otherwise it is stored in the cache.
+    """
+    if alignment not in ALIGNMENTS:
+        raise ValueError('Unknown alignment: ', alignment)
+    if cache is not None:
+        key = cache.get_key(get_input_filenames()[:3], ["sonar columns", alignment, get_processing_parameters()])
+        with instrumentation.stage(metrics, "cache") as current:
+            arrays = cache.load_arrays(key)
+        if arrays is not None:
+            sonar_columns = columnar.SonarColumns.from_arrays(arrays)
+            current["items"] = len(sonar_columns)
+            return sonar_columns
+        sonar_columns = join_sonar_columns(get_sonar_beams(metrics, workers, cache), alignment, metrics, workers)
+        cache.store_arrays(key, sonar_columns.to_arrays())
+        return sonar_columns
     print("Collecting data...")
-    sonar_data = data_handler.read_sonar_data(SONAR_FILENAME, START_TIME)
-    gnss_data, lines_skipped = data_handler.read_data(GNSS_FILENAME, START_TIME, GNSS_FREQUENCY, GNSS_HEADERS)
-    sonar_data = data_handler.extend_sonar_data(sonar_data, gnss_data, GNSS_HEADERS, GNSS_FREQUENCY, lines_skipped)
-    speed_of_sound_data, lines_skipped = data_handler.read_data(SPEED_OF_SOUND_FILENAME, START_TIME, SPEED_OF_SOUND_FREQUENCY, SPEED_OF_SOUND_HEADERS)
-    sonar_data = data_handler.extend_sonar_data(sonar_data, speed_of_sound_data, SPEED_OF_SOUND_HEADERS, SPEED_OF_SOUND_FREQUENCY, lines_skipped)
+    return join_sonar_columns(get_sonar_beams(metrics, workers), alignment, metrics, workers)
+
+
+def get_sonar_beams(metrics=None, workers=1, cache=None):
+    """
+    Reads the sonar file into a columnar.SonarColumns container (without the values of the other files),
+    with the two way travel time of every beam, which is the part of the distance calculation
+    that does not depend on the speed of sound.
+    If a result_cache.ResultCache is provided, the beams are stored in the cache with a key that only depends on
+    the sonar file and the constants of the sonar data, so if only the GNSS or the speed of sound file changes,
+    the sonar file is not parsed again.
+    """
+    if cache is not None:
+        parameters = {"version": CACHE_VERSION, "start_time": START_TIME, "sample_frequency": SAMPLE_FREQUENCY,
+                      "window": [TIME_WINDOW, PING_WINDOW]}
+        key = cache.get_key([SONAR_FILENAME], ["sonar beams", parameters])
+        with instrumentation.stage(metrics, "cache") as current:
+            arrays = cache.load_arrays(key)
+        if arrays is not None:
+            sonar_columns = columnar.SonarColumns.from_arrays(arrays)
+            current["items"] = len(sonar_columns)
+            return sonar_columns
+        sonar_columns = get_sonar_beams(metrics, workers)
+        cache.store_arrays(key, sonar_columns.to_arrays())
+        return sonar_columns
+    if TIME_WINDOW is not None or PING_WINDOW is not None:
+        sonar_columns = file_index.read_sonar_window(SONAR_FILENAME, START_TIME, TIME_WINDOW, PING_WINDOW, metrics)
+    elif workers == 1:
+        sonar_columns = data_handler.read_sonar_columns(SONAR_FILENAME, START_TIME, metrics)
+    else:
+        sonar_columns = data_handler.read_sonar_columns_parallel(SONAR_FILENAME, START_TIME, workers, metrics)
+    with instrumentation.stage(metrics, "travel time", sonar_columns.beam_count):
+        sonar_columns.travel_time = sonar_columns.sample_index / SAMPLE_FREQUENCY
+    return sonar_columns
+
+
+def join_sonar_columns(sonar_columns, alignment="nearest", metrics=None, workers=1):
+    """
+    Extends the sonar beams (see get_sonar_beams) with the GNSS and speed of sound values of each ping.
+    The GNSS file is parsed in parallel if workers is not 1. If a time or ping window is set,
+    only the lines of the other files around the time of the pings are read (see file_index.read_data_window).
+    """
+    if alignment not in ALIGNMENTS:
+        raise ValueError('Unknown alignment: ', alignment)
+    time_range = (START_TIME, START_TIME) if len(sonar_columns) == 0 else (sonar_columns.time.min(), sonar_columns.time.max())
+    for filename, frequency, headers in [(GNSS_FILENAME, GNSS_FREQUENCY, GNSS_HEADERS),
+                                         (SPEED_OF_SOUND_FILENAME, SPEED_OF_SOUND_FREQUENCY, SPEED_OF_SOUND_HEADERS)]:
+        first_line = 0
+        if TIME_WINDOW is not None or PING_WINDOW is not None:
+            other_columns, lines_skipped, first_line = file_index.read_data_window(filename, START_TIME, frequency, headers, time_range, metrics)
+        elif workers == 1 or filename == SPEED_OF_SOUND_FILENAME:
+            other_columns, lines_skipped = data_handler.read_data_columns(filename, START_TIME, frequency, headers, metrics)
+        else:
+            other_columns, lines_skipped = data_handler.read_data_columns_parallel(filename, START_TIME, frequency, headers, workers, metrics)
+        with instrumentation.stage(metrics, "join " + filename, len(sonar_columns)):
+            if alignment == "interpolate":
+                data_handler.interpolate_sonar_columns(sonar_columns, other_columns, headers, ANGULAR_HEADERS)
+            else:
+                data_handler.extend_sonar_columns(sonar_columns, other_columns, headers, frequency, lines_skipped, first_line)
+    return sonar_columns
+
+
+def iterate_sonar_data(precision="decimal"):
+    """
+    Streaming version of get_sonar_data. The files are read line by line, and the lines of extended sonar data
+    are yielded one by one, so the memory usage does not depend on the size of the files.
+    The files have to be ordered by time, which is true for the current devices.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError('Unknown precision: ', precision)
+    number_type = PRECISIONS[precision]
+    sonar_data = data_handler.iterate_sonar_data(SONAR_FILENAME, START_TIME, number_type)
+    gnss_data = data_handler.iterate_data(GNSS_FILENAME, START_TIME, GNSS_FREQUENCY, GNSS_HEADERS, number_type)
+    sonar_data = data_handler.extend_sonar_stream(sonar_data, gnss_data, GNSS_HEADERS, GNSS_FREQUENCY)
+    speed_of_sound_data = data_handler.iterate_data(SPEED_OF_SOUND_FILENAME, START_TIME, SPEED_OF_SOUND_FREQUENCY, SPEED_OF_SOUND_HEADERS,
+                                                    number_type)
+    sonar_data = data_handler.extend_sonar_stream(sonar_data, speed_of_sound_data, SPEED_OF_SOUND_HEADERS,
+                                                SPEED_OF_SOUND_FREQUENCY)
     return sonar_data
 
 
+def get_number_type(value):
+    """
+    Returns the type of numbers used for the calculations with the value:
+    float for floats (float64 precision), Decimal for everything else (the original precision).
+    """
+    return float if isinstance(value, float) else Decimal
+
+
 def calculate_distance(sample_index: Decimal, speed_of_sound: Decimal):
     """
     Calculates the distance between the located point and the sonar,
     using the sample frequency, sample index and the speed of sound.
-    Frequency stored in a variable, and later can be changed if a different frequency is used.
+    Frequency stored in a module level constant, so the vectorized engine uses the same value.
     In case of negative sample index or speed an exception is raised. Future idea: depending on the usage of the data 
     this could be handled by a default value instead of an exception.
     """
     if not (sample_index > 0 and speed_of_sound > 0):
         raise ValueError('Cannot calculate distance, invalid data: ', sample_index, ', ', speed_of_sound)
-    SAMPLE_FREQUENCY = 78125
     distance = sample_index / SAMPLE_FREQUENCY * speed_of_sound / 2
     return distance
 
@@ -62,7 +293,7 @@ def calculate_horizontal_distance(distance: Decimal, sample_angle: Decimal, data
     heading = dataline["horizontal_heading"]
     pitch_head_diff = dataline["horizontal_pitch_head_diff"]
     rolling_angle = dataline["roll"]
-    horizontal_distance = distance * ((-1) * Decimal(sin(sample_angle + rolling_angle)) * heading + pitch_head_diff)
+    horizontal_distance = distance * ((-1) * get_number_type(distance)(sin(sample_angle + rolling_angle)) * heading + pitch_head_diff)
     return horizontal_distance
 
 
@@ -75,7 +306,7 @@ def calculate_vertical_distance(distance: Decimal, sample_angle: Decimal, datali
     heading = dataline["vertical_heading"]
     pitch_head_diff = dataline["vertical_pitch_head_diff"]
     rolling_angle = dataline["roll"]
-    vertical_distance = distance * (Decimal(sin(sample_angle + rolling_angle)) * heading + pitch_head_diff)
+    vertical_distance = distance * (get_number_type(distance)(sin(sample_angle + rolling_angle)) * heading + pitch_head_diff)
     return vertical_distance
 
 
@@ -85,7 +316,7 @@ def calculate_altitude_of_point(distance: Decimal, sample_angle: Decimal, sonar_
     based on the distance, the cosine of the sample angle and the altitude of the sonar.
     It ignores the heave correction for now, but later it can be added easily, if necessary.
     """
-    altitude_difference = (-1) * distance * Decimal(cos(sample_angle))
+    altitude_difference = (-1) * distance * get_number_type(distance)(cos(sample_angle))
     altitude_of_point = sonar_altitude + altitude_difference
     return altitude_of_point
 
@@ -123,10 +354,10 @@ def transform_coordinates(longitude, latitude):
     The constants are based on conventions, not likely to change in the future.
     The current coordinates are on the northern hemisphere, but in case of other locations in the future
     the code can calculate with the southern hemisphere's offset as well.
-    Future idea: should replace this function with a more convinient and more efficient one.
+    For many positions at once use projection.transform_coordinates_bulk, it is much more efficient.
     """
     SOUTHERN_HEMISPHERE_OFFSET = 10000000
-    RAD_DEGREE_CONVERT_RATE = Decimal(180 / pi)
+    RAD_DEGREE_CONVERT_RATE = get_number_type(longitude)(180 / pi)
 
     longitude *= RAD_DEGREE_CONVERT_RATE
     latitude *= RAD_DEGREE_CONVERT_RATE
@@ -151,23 +382,27 @@ def calculate_coordinates(angle_index_pair, dataline, utm_base_coordinates):
     distance = calculate_distance(sample_index, dataline["speed"])
     horizontal_distance = calculate_horizontal_distance(distance, angle, dataline)
     vertical_distance = calculate_vertical_distance(distance, angle, dataline)
-    utm_x = Decimal(utm_base_coordinates[0]) + horizontal_distance
-    utm_y = Decimal(utm_base_coordinates[1]) + vertical_distance
+    utm_x = get_number_type(distance)(utm_base_coordinates[0]) + horizontal_distance
+    utm_y = get_number_type(distance)(utm_base_coordinates[1]) + vertical_distance
     altitude = calculate_altitude_of_point(distance, angle, dataline["altitude"])
     return utm_x, utm_y, altitude
 
 
 def store_trigonometric_values(dataline):
-    """Calculates and stores the trigonometric values for each dataline."""
+    """
+    Calculates and stores the trigonometric values for each dataline.
+    The values have the same type as the angles (Decimal or float, depending on the precision).
+    """
     heading_angle = dataline["heading"]
     pitching_angle = dataline["pitch"]
-    dataline["vertical_pitch_head_diff"] = Decimal(sin(pitching_angle)) * Decimal(cos(heading_angle))
-    dataline["horizontal_pitch_head_diff"] = Decimal(sin(pitching_angle)) * Decimal(sin(heading_angle))
-    dataline["vertical_heading"] = Decimal(sin(heading_angle))
-    dataline["horizontal_heading"] = Decimal(cos(heading_angle))
+    number_type = get_number_type(heading_angle)
+    dataline["vertical_pitch_head_diff"] = number_type(sin(pitching_angle)) * number_type(cos(heading_angle))
+    dataline["horizontal_pitch_head_diff"] = number_type(sin(pitching_angle)) * number_type(sin(heading_angle))
+    dataline["vertical_heading"] = number_type(sin(heading_angle))
+    dataline["horizontal_heading"] = number_type(cos(heading_angle))
 
 
-def locate_points(dataline):
+def locate_points(dataline, metrics=None):
     """
     Finds the 3D location of every point in one line of data. Data lines are based on time.
     One line of data means all the detected points that can be assigned to the timestamp of the line.
@@ -176,47 +411,220 @@ def locate_points(dataline):
     If this structure is too complex, points can be tuples instead of dictionaries.
     If (for some reason in the future) we need to know the position of the sonar 
     in the moment it detected these points, we can store the position data as well.
+    If a metrics object is provided, the projection, the trigonometric values and the beam loop are recorded.
     """
     located_points = []
     angle_index_pairs = dataline["angle_index_pairs"]
-    utm_base_coordinates = transform_coordinates(dataline["longitude"], dataline["latitude"])
-    store_trigonometric_values(dataline)
-    for angle_index_pair in angle_index_pairs:
-        utm_x, utm_y, altitude = calculate_coordinates(angle_index_pair, dataline, utm_base_coordinates)
-        point = {
-            "X": utm_x,
-            "Y": utm_y,
-            "zone": utm_base_coordinates[2],
-            "altitude": altitude
-        }
-        located_points.append(point)
-        data_by_time = {
-            "time": dataline["time"],
-            "points": located_points
-        }
+    with instrumentation.stage(metrics, "projection", 1):
+        utm_base_coordinates = transform_coordinates(dataline["longitude"], dataline["latitude"])
+    with instrumentation.stage(metrics, "trigonometric values", 1):
+        store_trigonometric_values(dataline)
+    with instrumentation.stage(metrics, "beam loop", len(angle_index_pairs)):
+        for angle_index_pair in angle_index_pairs:
+            utm_x, utm_y, altitude = calculate_coordinates(angle_index_pair, dataline, utm_base_coordinates)
+            point = {
+                "X": utm_x,
+                "Y": utm_y,
+                "zone": utm_base_coordinates[2],
+                "altitude": altitude
+            }
+            located_points.append(point)
+            data_by_time = {
+                "time": dataline["time"],
+                "points": located_points
+            }
     return data_by_time
 
 
-def get_located_points(data):
+def locate_columns(sonar_columns, metrics=None, attitude_model=None, sound_velocity_profile=None):
+    """
+    Locates every point of the extended sonar data (a columnar.SonarColumns container) with the vectorized engine.
+    The UTM base coordinates of all pings are calculated with the bulk projection,
+    and the rest of the calculation is done for all the beams at once.
+    The attitude model is ATTITUDE_MODEL by default, see vectorized_locator.ATTITUDE_MODELS.
+    If a sound velocity profile is provided (or SOUND_VELOCITY_PROFILE_FILENAME is set), the rays are traced
+    through it with a cached ray table, this always uses the rotation model.
+    Returns a columnar.LocatedPoints container.
+    """
+    attitude_model = ATTITUDE_MODEL if attitude_model is None else attitude_model
+    if attitude_model not in vectorized_locator.ATTITUDE_MODELS:
+        raise ValueError('Unknown attitude model: ', attitude_model)
+    if sound_velocity_profile is None and SOUND_VELOCITY_PROFILE_FILENAME is not None:
+        sound_velocity_profile = ray_tracing.load_sound_velocity_profile(SOUND_VELOCITY_PROFILE_FILENAME)
+    ray_table = None
+    if sound_velocity_profile is not None and sonar_columns.beam_count > 0:
+        with instrumentation.stage(metrics, "ray table", 1):
+            ray_table = ray_tracing.get_ray_table(sound_velocity_profile, float(sonar_columns.sample_index.max()) / SAMPLE_FREQUENCY / 2)
+    with instrumentation.stage(metrics, "projection", len(sonar_columns)):
+        utm_base_x, utm_base_y, zones = projection.transform_coordinates_bulk(sonar_columns.ping_values["longitude"],
+                                                                              sonar_columns.ping_values["latitude"])
+    with instrumentation.stage(metrics, "beam calculation", sonar_columns.beam_count):
+        if attitude_model == "rotation" or ray_table is not None:
+            utm_x, utm_y, altitude = vectorized_locator.locate_beams_rotated(sonar_columns, utm_base_x, utm_base_y, SAMPLE_FREQUENCY,
+                                                                             LEVER_ARM, HEAVE_CORRECTION, ray_table)
+        else:
+            utm_x, utm_y, altitude = vectorized_locator.locate_beams(sonar_columns, utm_base_x, utm_base_y, SAMPLE_FREQUENCY)
+    return columnar.LocatedPoints(sonar_columns.time, sonar_columns.ping_offsets, utm_x, utm_y, altitude, zones)
+
+
+def locate_points_vectorized(data, metrics=None):
+    """
+    Locates every point of the extended sonar data (array of dictionaries) with the vectorized engine.
+    The result has the same structure as the decimal engine's result, but the values are floats instead of Decimals.
+    """
+    with instrumentation.stage(metrics, "convert to columns", len(data)):
+        sonar_columns = columnar.SonarColumns.from_records(data, vectorized_locator.PING_HEADERS + ["longitude", "latitude"])
+    located_points = locate_columns(sonar_columns, metrics)
+    with instrumentation.stage(metrics, "convert to records", len(data)):
+        return located_points.to_records()
+
+
+def locate_columns_parallel(sonar_columns, workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """
+    Parallel version of locate_columns. The pings are split into chunks of chunk_size pings,
+    and the chunks are located in a process pool with the given number of workers (all cores by default).
+    The results are concatenated in the original order, so the output is the same as the output of locate_columns.
+    """
+    chunks = [sonar_columns.select_pings(start, min(start + chunk_size, len(sonar_columns)))
+              for start in range(0, len(sonar_columns), chunk_size)]
+    if chunks == []:
+        return locate_columns(sonar_columns)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return columnar.LocatedPoints.concatenate(list(executor.map(locate_columns, chunks)))
+
+
+def get_located_points(data, engine="decimal", workers=1, metrics=None):
     """
     Collect all the located points from the extended sonar data, and arrange them into an array of dictionaries.
     Each dictionary contains a time field, and the array of points that were located in that time.
     Based on the usage of the points further arrangements are possible, 
     but this data storing model can be a decent base for many future applications of the data.
-    Future idea: write the data into a file.
+    The engine can be "decimal" (the original, point by point calculation, with the type of numbers of the data,
+    see PRECISIONS) or "numpy" (vectorized float64 calculation, much faster for large datasets).
+    If workers is not 1, the lines are shared between a pool of worker processes (None means one for every core),
+    the order of the result is the same as in the sequential case.
+    If a metrics object is provided, the stages are recorded (in parallel mode only the total time is recorded).
+    To write the points into a file use the point_writer module with the columnar version (locate_columns).
+    """
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine: ', engine)
+    locate_chunk = locate_points_vectorized if engine == "numpy" else locate_points_sequential
+    if engine == "numpy":
+        print("Calculating coordinates...")
+    else:
+        print("Calculating coordinates, this might take around half a minute")
+    if workers == 1:
+        return locate_chunk(data, metrics)
+    chunks = [data[start:start + PARALLEL_CHUNK_SIZE] for start in range(0, len(data), PARALLEL_CHUNK_SIZE)]
+    all_located_points = []
+    with instrumentation.stage(metrics, "parallel location", len(data)):
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for located_chunk in executor.map(locate_chunk, chunks):
+                all_located_points.extend(located_chunk)
+    return all_located_points
+
+
+def locate_points_sequential(data, metrics=None):
+    """
+    Locates the points of the lines of data one by one with the decimal engine.
     """
-    print("Calculating coordinates, this might take around half a minute")
     all_located_points = []
     for data_line in data:
-        one_line_of_located_points = locate_points(data_line)
+        one_line_of_located_points = locate_points(data_line, metrics)
         all_located_points.append(one_line_of_located_points)
     return all_located_points
 
 
+def check_precision(alignment="nearest", tolerance=PRECISION_TOLERANCE):
+    """
+    Regression check of the float64 precision: the points of the input files are located with the point by point
+    engine in both precisions, and the largest difference of the coordinates (X, Y or altitude) is returned.
+    Raises an exception if the difference is larger than the tolerance (in meters).
+    """
+    decimal_points = get_located_points(get_sonar_data(alignment, precision="decimal"))
+    float_points = get_located_points(get_sonar_data(alignment, precision="float64"))
+    if len(decimal_points) != len(float_points):
+        raise ValueError('Different number of located lines: ', len(decimal_points), ', ', len(float_points))
+    largest_difference = 0
+    for decimal_line, float_line in zip(decimal_points, float_points):
+        for decimal_point, float_point in zip(decimal_line["points"], float_line["points"]):
+            for key in ["X", "Y", "altitude"]:
+                largest_difference = max(largest_difference, abs(float(decimal_point[key]) - float_point[key]))
+    if largest_difference > tolerance:
+        raise ValueError('The float64 precision is out of tolerance: ', largest_difference)
+    return largest_difference
+
+
+def iterate_located_columns(data, chunk_size=STREAM_CHUNK_SIZE, metrics=None):
+    """
+    Streaming version of locate_columns: takes any iterable of extended sonar data lines (for example the generator
+    of iterate_sonar_data), and yields a columnar.LocatedPoints container for every chunk_size lines.
+    """
+    data = iter(data)
+    chunk = list(islice(data, chunk_size))
+    while chunk:
+        with instrumentation.stage(metrics, "convert to columns", len(chunk)):
+            sonar_columns = columnar.SonarColumns.from_records(chunk, vectorized_locator.PING_HEADERS + ["longitude", "latitude"])
+        yield locate_columns(sonar_columns, metrics)
+        chunk = list(islice(data, chunk_size))
+
+
+def iterate_located_beams(sonar_columns, chunk_size=STREAM_CHUNK_SIZE, metrics=None):
+    """
+    Locates the points of an extended columnar.SonarColumns container in chunks of chunk_size pings,
+    and yields a columnar.LocatedPoints container for every chunk, so only the points of one chunk are in the memory.
+    """
+    for start in range(0, len(sonar_columns), chunk_size):
+        yield locate_columns(sonar_columns.select_pings(start, min(start + chunk_size, len(sonar_columns))), metrics)
+
+
+def iterate_located_points(data, engine="decimal", chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streaming version of get_located_points: yields the located points of the lines of data one by one.
+    The data can be any iterable (for example the generator of iterate_sonar_data).
+    The numpy engine processes chunk_size lines at once, so the memory usage is bounded by the chunk size.
+    """
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine: ', engine)
+    if engine == "decimal":
+        for data_line in data:
+            yield locate_points(data_line)
+        return
+    for located_points in iterate_located_columns(data, chunk_size):
+        yield from located_points.to_records()
+
+
 def main():
-    data = get_sonar_data()
-    located_points = get_located_points(data)
-    print("Finished")
+    """
+    Locates the points of the input files and writes them into OUTPUT_DIRECTORY (see point_writer).
+    Returns the number of located points.
+    """
+    cache = get_cache()
+    if cache is not None:
+        key = cache.get_key(get_input_filenames(), ["main", OUTPUT_DIRECTORY, get_processing_parameters()])
+        if cache.restore_files(key, OUTPUT_DIRECTORY):
+            print("The input files and the constants did not change, points restored from the cache to ", OUTPUT_DIRECTORY)
+            return len(point_writer.read_located_points(OUTPUT_DIRECTORY)["X"])
+    print("Collecting data and calculating coordinates...")
+    metrics = instrumentation.Metrics()
+    grid = None if GRID_RESOLUTION is None else gridding.BathymetryGrid(GRID_RESOLUTION)
+    with point_writer.LocatedPointsWriter(OUTPUT_DIRECTORY) as writer:
+        if cache is None and TIME_WINDOW is None and PING_WINDOW is None:
+            all_located_points = iterate_located_columns(iterate_sonar_data(PRECISION), metrics=metrics)
+        else:
+            all_located_points = iterate_located_beams(join_sonar_columns(get_sonar_beams(metrics, cache=cache), metrics=metrics), metrics=metrics)
+        for located_points in all_located_points:
+            with instrumentation.stage(metrics, "write", located_points.point_count):
+                writer.write(located_points)
+            if grid is not None:
+                with instrumentation.stage(metrics, "grid", located_points.point_count):
+                    grid.add_located_points(located_points)
+    grid_filenames = [] if grid is None else grid.save(OUTPUT_DIRECTORY)
+    metrics.to_json(os.path.join(OUTPUT_DIRECTORY, METRICS_FILENAME))
+    if cache is not None:
+        cache.store_files(key, [writer.get_filename(column) for column in point_writer.COLUMNS] + grid_filenames)
+    print("Finished, points written to ", OUTPUT_DIRECTORY, ": ", writer.point_count)
+    return writer.point_count
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
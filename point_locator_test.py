@@ -1,5 +1,6 @@
 import unittest
 import main
+import fixtures
 from decimal import Decimal
 
 
@@ -90,5 +91,18 @@ class PointLocatorTest(unittest.TestCase):
         self.assertAlmostEqual(expected_outcome, actual_value, 0)
 
 
+    def test_9_float_precision_matches_decimal_precision(self):
+        with fixtures.temporary_survey():
+            for alignment in main.ALIGNMENTS:
+                self.assertLess(main.check_precision(alignment), main.PRECISION_TOLERANCE)
+            float_data = main.get_sonar_data(precision="float64")
+        self.assertIsInstance(float_data[0]["angle_index_pairs"][0]["angle"], float)
+        self.assertIsInstance(main.get_located_points(float_data)[0]["points"][0]["X"], float)
+
+
+    def test_10_unknown_precision(self):
+        self.assertRaises(ValueError, main.get_sonar_data, "nearest", None, "unknown")
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+
+"""
+Binary output of the located points. Every column is stored in its own .npy file in the output directory,
+one element per point, so the columns can be memory-mapped with numpy.load(filename, mmap_mode="r")
+without parsing anything. The files can be appended: the data is written to the end of the files,
+and the shape in the .npy header is updated after every write. The header has a fixed size,
+so updating it never moves the data.
+The UTM zone is stored as a number: zone_number * 100 + the ASCII code of the zone letter.
+"""
+
+COLUMNS = {
+    "time": np.float64,
+    "X": np.float64,
+    "Y": np.float64,
+    "altitude": np.float32,
+    "zone_code": np.int16,
+    "ping_id": np.int64
+}
+PING_COLUMNS = ["time", "zone_code", "ping_id"]
+HEADER_SIZE = 128
+NPY_PREFIX_SIZE = 10
+
+
+def encode_zones(zones):
+    """
+    Converts the zone strings (for example "U10") into zone codes (1085).
+    """
+    return np.array([int(zone[1:]) * 100 + ord(zone[0]) for zone in np.asarray(zones).tolist()], dtype=np.int16)
+
+
+def decode_zones(zone_codes):
+    """
+    Converts the zone codes back to zone strings.
+    """
+    return [chr(zone_code % 100) + str(zone_code // 100) for zone_code in np.asarray(zone_codes).tolist()]
+
+
+def create_npy_header(dtype, length):
+    """
+    Creates a version 1.0 .npy header for a one dimensional array, padded to HEADER_SIZE bytes.
+    """
+    header = "{'descr': %r, 'fortran_order': False, 'shape': (%d,), }" % (np.lib.format.dtype_to_descr(np.dtype(dtype)), length)
+    header = header.ljust(HEADER_SIZE - NPY_PREFIX_SIZE - 1) + "\n"
+    return np.lib.format.MAGIC_PREFIX + bytes([1, 0]) + len(header).to_bytes(2, "little") + header.encode("latin1")
+
+
+def read_located_points(directory, mmap_mode="r"):
+    """
+    Opens the columns written by LocatedPointsWriter. By default the files are memory-mapped, not read.
+    Returns a dictionary with one array for each column.
+    """
+    return {column: np.load(os.path.join(directory, column + ".npy"), mmap_mode=mmap_mode) for column in COLUMNS}
+
+
+class LocatedPointsWriter:
+    """
+    Streaming writer for columnar.LocatedPoints containers. The points of each container are appended to the
+    column files, the pings get consecutive ids. If append is True and the directory already contains output,
+    the points are added to the end of it, and the ping ids continue from the last one.
+    Can be used as a context manager.
+    """
+
+    def __init__(self, directory, append=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.point_count = 0
+        self.ping_count = 0
+        if append and all(os.path.exists(self.get_filename(column)) for column in COLUMNS):
+            existing_columns = read_located_points(directory)
+            lengths = {len(values) for values in existing_columns.values()}
+            if len(lengths) != 1:
+                raise ValueError('Corrupted output, the columns have different lengths: ', directory)
+            self.point_count = lengths.pop()
+            if self.point_count > 0:
+                self.ping_count = int(existing_columns["ping_id"][-1]) + 1
+            del existing_columns
+            self.files = {column: open(self.get_filename(column), "r+b") for column in COLUMNS}
+        else:
+            self.files = {column: open(self.get_filename(column), "w+b") for column in COLUMNS}
+            self.update_headers()
+
+    def get_filename(self, column):
+        return os.path.join(self.directory, column + ".npy")
+
+    def update_headers(self):
+        for column, dtype in COLUMNS.items():
+            self.files[column].seek(0)
+            self.files[column].write(create_npy_header(dtype, self.point_count))
+            self.files[column].flush()
+
+    def write(self, located_points):
+        """
+        Appends the points of a columnar.LocatedPoints container to the output.
+        """
+        columns = {
+            "time": located_points.time,
+            "X": located_points.X,
+            "Y": located_points.Y,
+            "altitude": located_points.altitude,
+            "zone_code": encode_zones(located_points.zone),
+            "ping_id": np.arange(self.ping_count, self.ping_count + len(located_points))
+        }
+        beam_counts = np.diff(located_points.ping_offsets)
+        for column, dtype in COLUMNS.items():
+            values = columns[column]
+            if column in PING_COLUMNS:
+                values = np.repeat(values, beam_counts)
+            self.files[column].seek(0, os.SEEK_END)
+            self.files[column].write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        self.point_count += located_points.point_count
+        self.ping_count += len(located_points)
+        self.update_headers()
+
+    def close(self):
+        for data_file in self.files.values():
+            data_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
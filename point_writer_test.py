@@ -0,0 +1,63 @@
+import unittest
+import tempfile
+import columnar
+import point_writer
+import numpy as np
+
+
+def create_located_points(first_time):
+    return columnar.LocatedPoints(np.array([first_time, first_time + 1]), np.array([0, 2, 3]), np.array([1.0, 2.0, 3.0]),
+                                  np.array([4.0, 5.0, 6.0]), np.array([-7.0, -8.0, -9.0]), np.array(["U10", "V11"]))
+
+
+class PointWriterTest(unittest.TestCase):
+
+    def test_0_encode_and_decode_zones(self):
+        zones = ["U10", "C1", "X60"]
+        self.assertEqual([1085, 167, 6088], point_writer.encode_zones(zones).tolist())
+        self.assertEqual(zones, point_writer.decode_zones(point_writer.encode_zones(zones)))
+
+
+    def test_1_write_and_read(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with point_writer.LocatedPointsWriter(directory) as writer:
+                writer.write(create_located_points(0))
+            columns = point_writer.read_located_points(directory)
+            self.assertEqual([0, 0, 1], columns["time"].tolist())
+            self.assertEqual([1, 2, 3], columns["X"].tolist())
+            self.assertEqual(["U10", "U10", "V11"], point_writer.decode_zones(columns["zone_code"]))
+            self.assertEqual([0, 0, 1], columns["ping_id"].tolist())
+            del columns
+
+
+    def test_2_append(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with point_writer.LocatedPointsWriter(directory) as writer:
+                writer.write(create_located_points(0))
+            with point_writer.LocatedPointsWriter(directory, append=True) as writer:
+                writer.write(create_located_points(2))
+            columns = point_writer.read_located_points(directory, mmap_mode=None)
+        self.assertEqual([0, 0, 1, 2, 2, 3], columns["time"].tolist())
+        self.assertEqual([0, 0, 1, 2, 2, 3], columns["ping_id"].tolist())
+        self.assertEqual([-7, -8, -9, -7, -8, -9], columns["altitude"].tolist())
+
+
+    def test_3_overwrite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for first_time in [0, 5]:
+                with point_writer.LocatedPointsWriter(directory) as writer:
+                    writer.write(create_located_points(first_time))
+            columns = point_writer.read_located_points(directory, mmap_mode=None)
+        self.assertEqual([5, 5, 6], columns["time"].tolist())
+
+
+    def test_4_empty_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with point_writer.LocatedPointsWriter(directory) as writer:
+                pass
+            columns = point_writer.read_located_points(directory, mmap_mode=None)
+        self.assertEqual(0, len(columns["X"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import numpy as np
+from pyproj import CRS, Transformer
+
+"""
+Bulk version of main.transform_coordinates. Instead of projecting the position of each line of data one by one,
+the positions are grouped by UTM zone, and every group is projected with one call.
+The zone numbers and letters are calculated with the same rules as main.get_zone and main.get_letter.
+"""
+
+UTM_OFFSET = 1
+UTM_ANGLE_DEGREES = 6
+SOUTHERN_HEMISPHERE_OFFSET = 10000000
+ZONE_LETTERS = np.array(list('CDEFGHJKLMNPQRSTUVWXX'))
+
+_transformers = {}
+
+
+def get_transformer(zone_number):
+    """
+    Returns the cached transformer from longitude/latitude to the given UTM zone.
+    Creating a transformer is expensive, so one is created per zone and reused afterwards.
+    """
+    if zone_number not in _transformers:
+        _transformers[zone_number] = Transformer.from_crs(CRS(proj='longlat', ellps='WGS84'),
+                                                          CRS(proj='utm', zone=zone_number, ellps='WGS84'),
+                                                          always_xy=True)
+    return _transformers[zone_number]
+
+
+def get_zones(longitudes, latitudes):
+    """
+    Calculates the UTM zone number for every position (in degrees), including the Norway and Svalbard exceptions.
+    """
+    zones = ((longitudes + 180) / UTM_ANGLE_DEGREES).astype(np.int64) + UTM_OFFSET
+    zones[(56 <= latitudes) & (latitudes < 64) & (3 <= longitudes) & (longitudes < 12)] = 32
+    svalbard = (72 <= latitudes) & (latitudes < 84) & (0 <= longitudes) & (longitudes < 42)
+    zones[svalbard] = np.select([longitudes[svalbard] < 9, longitudes[svalbard] < 21, longitudes[svalbard] < 33], [31, 33, 35], 37)
+    return zones
+
+
+def get_letters(longitudes):
+    """
+    Finds the letter of the zone for every position, the same way as main.get_letter does.
+    """
+    return ZONE_LETTERS[((longitudes + 80) / 8).astype(np.int64)]
+
+
+def transform_coordinates_bulk(longitudes, latitudes):
+    """
+    Transforms arrays of longitude and latitude angles (in radians) into UTM coordinates.
+    Returns three arrays: the X and Y coordinates, and the zone (letter and zone number) of each position.
+    """
+    longitudes = np.degrees(np.asarray(longitudes, dtype=np.float64))
+    latitudes = np.degrees(np.asarray(latitudes, dtype=np.float64))
+    zone_numbers = get_zones(longitudes, latitudes)
+    utm_x = np.empty(len(longitudes), dtype=np.float64)
+    utm_y = np.empty(len(longitudes), dtype=np.float64)
+    for zone_number in np.unique(zone_numbers):
+        in_zone = zone_numbers == zone_number
+        utm_x[in_zone], utm_y[in_zone] = get_transformer(int(zone_number)).transform(longitudes[in_zone], latitudes[in_zone])
+    utm_y[utm_y < 0] += SOUTHERN_HEMISPHERE_OFFSET
+    zones = np.char.add(get_letters(longitudes), zone_numbers.astype(str))
+    return utm_x, utm_y, zones
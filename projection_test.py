@@ -0,0 +1,50 @@
+import unittest
+import main
+import projection
+import numpy as np
+from decimal import Decimal
+
+
+class ProjectionTest(unittest.TestCase):
+
+    def test_0_transform_coordinates_bulk_x(self):
+        longitudes = np.array([1.0])
+        latitudes = np.array([1.0])
+        expected_outcome = 517825.18
+        actual_value = projection.transform_coordinates_bulk(longitudes, latitudes)[0][0]
+        self.assertAlmostEqual(expected_outcome, actual_value, 0)
+
+
+    def test_1_transform_coordinates_bulk_southern_hemisphere(self):
+        longitudes = np.array([1.0])
+        latitudes = np.array([-1.0])
+        expected_outcome = 3649649.73
+        actual_value = projection.transform_coordinates_bulk(longitudes, latitudes)[1][0]
+        self.assertAlmostEqual(expected_outcome, actual_value, 0)
+
+
+    def test_2_transform_coordinates_bulk_matches_single_transform(self):
+        """
+        Positions from several zones, including the Norway and Svalbard exceptions.
+        """
+        degrees = [(-122.6, 45.6), (5, 60), (10, 75), (25, 78), (-70, -33)]
+        longitudes = np.radians([longitude for longitude, latitude in degrees])
+        latitudes = np.radians([latitude for longitude, latitude in degrees])
+        utm_x, utm_y, zones = projection.transform_coordinates_bulk(longitudes, latitudes)
+        for index in range(len(degrees)):
+            expected_x, expected_y, expected_zone = main.transform_coordinates(Decimal(longitudes[index]), Decimal(latitudes[index]))
+            self.assertAlmostEqual(expected_x, utm_x[index], 6)
+            self.assertAlmostEqual(expected_y, utm_y[index], 6)
+            self.assertEqual(expected_zone, zones[index])
+
+
+    def test_3_get_zones_norway_exception(self):
+        longitudes = np.array([5.0, 5.0])
+        latitudes = np.array([60.0, 50.0])
+        expected_outcome = [32, 31]
+        actual_value = projection.get_zones(longitudes, latitudes).tolist()
+        self.assertEqual(expected_outcome, actual_value)
+
+
+if __name__ == '__main__':
+    unittest.main()
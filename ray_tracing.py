@@ -0,0 +1,148 @@
+import os
+from dataclasses import dataclass
+import numpy as np
+import data_handler
+
+"""
+Ray tracing through a sound velocity profile. The straight ray model (main.calculate_distance) uses one speed of sound
+for the whole water column, but the speed changes with the depth, and the rays bend (Snell's law).
+The profile is handled as layers of constant speed, so the path of a ray is exact inside a layer.
+Tracing every beam separately would be very slow, so a ray table is calculated once for a profile:
+the horizontal and vertical offsets of the ray on a regular grid of one-way travel times and launch angles.
+A beam is located with a bilinear interpolation in the table. The tables are cached, and reused
+as long as the profile does not change.
+"""
+
+ANGLE_STEP = np.radians(0.1)
+TIME_STEP = 0.0005
+MAX_LAUNCH_ANGLE = np.radians(89.9)
+PROFILE_HEADERS = ["depth", "speed"]
+
+_ray_tables = {}
+_profiles = {}
+
+
+@dataclass
+class SoundVelocityProfile:
+    """
+    Speed of sound (m/s) at increasing depths (m, positive downwards, compared to the sonar).
+    Below the last depth the last speed is used.
+    """
+    depth: np.ndarray
+    speed: np.ndarray
+
+    def __post_init__(self):
+        self.depth = np.asarray(self.depth, dtype=np.float64)
+        self.speed = np.asarray(self.speed, dtype=np.float64)
+        if len(self.depth) == 0 or len(self.depth) != len(self.speed):
+            raise ValueError('Invalid sound velocity profile, the number of depths and speeds: ', len(self.depth), ', ', len(self.speed))
+        if (np.diff(self.depth) <= 0).any() or (self.speed <= 0).any():
+            raise ValueError('Invalid sound velocity profile, the depths have to increase and the speeds have to be positive')
+
+    def key(self):
+        """The profile as bytes, to find its cached ray tables."""
+        return self.depth.tobytes() + self.speed.tobytes()
+
+
+def read_sound_velocity_profile(filename):
+    """
+    Reads a profile file: a header, then one depth and speed pair per line (separated by a tab or a space).
+    Corrupted lines are reported and skipped by data_handler.read_data_columns.
+    """
+    columns, lines_skipped = data_handler.read_data_columns(filename, 0, 1, PROFILE_HEADERS)
+    return SoundVelocityProfile(columns.values["depth"], columns.values["speed"])
+
+
+def load_sound_velocity_profile(filename):
+    """
+    Cached version of read_sound_velocity_profile, the file is read again only if it was modified.
+    """
+    modification_time = os.path.getmtime(filename)
+    if filename not in _profiles or _profiles[filename][0] != modification_time:
+        _profiles[filename] = (modification_time, read_sound_velocity_profile(filename))
+    return _profiles[filename][1]
+
+
+def trace_layers(profile, launch_angles, max_travel_time):
+    """
+    Traces the rays of the launch angles (from the vertical, in radians) through the layers of the profile.
+    The speed of a layer is the mean of the speeds at its two ends, and a last layer with the last speed is added,
+    deep enough for max_travel_time. Returns the one-way travel time, the horizontal and the vertical offset
+    at every layer boundary (arrays of shape (number of angles, number of boundaries)).
+    After a ray turns back (total reflection), its travel time is infinite.
+    """
+    bottom = profile.depth[-1] + profile.speed.max() * max_travel_time * 2
+    boundaries = np.concatenate([[0], profile.depth[profile.depth > 0], [bottom]])
+    boundary_speeds = np.interp(boundaries, profile.depth, profile.speed)
+    layer_speeds = (boundary_speeds[:-1] + boundary_speeds[1:]) / 2
+    layer_thickness = np.diff(boundaries)
+
+    ray_parameters = np.sin(launch_angles) / layer_speeds[0]
+    sin_angles = ray_parameters[:, None] * layer_speeds[None, :]
+    turned = np.cumsum(sin_angles >= 1, axis=1) > 0
+    cos_angles = np.sqrt(np.clip(1 - sin_angles ** 2, 0, 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        layer_times = np.where(turned, np.inf, layer_thickness / (layer_speeds * cos_angles))
+        layer_offsets = np.where(turned, 0, layer_thickness * sin_angles / cos_angles)
+    zeros = np.zeros((len(launch_angles), 1))
+    travel_times = np.concatenate([zeros, np.cumsum(layer_times, axis=1)], axis=1)
+    horizontal = np.concatenate([zeros, np.cumsum(layer_offsets, axis=1)], axis=1)
+    vertical = np.broadcast_to(boundaries, travel_times.shape)
+    return travel_times, horizontal, vertical
+
+
+class RayTable:
+    """
+    The horizontal and vertical offsets of the rays on a grid of one-way travel times (from zero to max_travel_time,
+    with time_step) and launch angles (from zero to MAX_LAUNCH_ANGLE, with angle_step).
+    Inside a layer the offsets change linearly with the time, so the interpolation is exact except near the
+    layer boundaries, the steps control the precision and the size of the table.
+    """
+
+    def __init__(self, profile, max_travel_time, time_step=TIME_STEP, angle_step=ANGLE_STEP):
+        self.max_travel_time = max_travel_time
+        self.time_step = time_step
+        self.angle_step = angle_step
+        self.launch_angles = np.arange(0, MAX_LAUNCH_ANGLE + angle_step, angle_step)
+        self.travel_times = np.arange(0, max_travel_time + 2 * time_step, time_step)
+        layer_times, layer_horizontal, layer_vertical = trace_layers(profile, self.launch_angles, self.travel_times[-1])
+        self.horizontal = np.empty((len(self.launch_angles), len(self.travel_times)))
+        self.vertical = np.empty((len(self.launch_angles), len(self.travel_times)))
+        for index in range(len(self.launch_angles)):
+            reached = np.isfinite(layer_times[index])
+            self.horizontal[index] = np.interp(self.travel_times, layer_times[index][reached], layer_horizontal[index][reached], right=np.nan)
+            self.vertical[index] = np.interp(self.travel_times, layer_times[index][reached], layer_vertical[index][reached], right=np.nan)
+
+    def lookup(self, travel_time, launch_angle):
+        """
+        Finds the horizontal and vertical offsets for one-way travel times and launch angles (arrays of the same size)
+        with bilinear interpolation. The offsets of rays that turned back before the travel time are NaN.
+        Raises an exception if a value is outside of the table.
+        """
+        if (travel_time < 0).any() or (travel_time > self.max_travel_time).any():
+            raise ValueError('Travel time outside of the ray table: ', travel_time.min(), ', ', travel_time.max())
+        if (launch_angle < 0).any() or (launch_angle > MAX_LAUNCH_ANGLE).any():
+            raise ValueError('Launch angle outside of the ray table: ', launch_angle.min(), ', ', launch_angle.max())
+        angle_position = launch_angle / self.angle_step
+        time_position = travel_time / self.time_step
+        angle_index = np.minimum(angle_position.astype(np.int64), len(self.launch_angles) - 2)
+        time_index = np.minimum(time_position.astype(np.int64), len(self.travel_times) - 2)
+        angle_weight = angle_position - angle_index
+        time_weight = time_position - time_index
+        results = []
+        for table in [self.horizontal, self.vertical]:
+            results.append((table[angle_index, time_index] * (1 - time_weight) + table[angle_index, time_index + 1] * time_weight) * (1 - angle_weight)
+                           + (table[angle_index + 1, time_index] * (1 - time_weight) + table[angle_index + 1, time_index + 1] * time_weight) * angle_weight)
+        return results[0], results[1]
+
+
+def get_ray_table(profile, max_travel_time):
+    """
+    Returns a cached ray table of the profile that covers max_travel_time. A new table is calculated only
+    for a new profile, or if the travel time is longer than the cached table covers (then twice the time is covered,
+    so a slowly growing travel time does not recalculate the table every time).
+    """
+    key = profile.key()
+    if key not in _ray_tables or _ray_tables[key].max_travel_time < max_travel_time:
+        _ray_tables[key] = RayTable(profile, max_travel_time * 2)
+    return _ray_tables[key]
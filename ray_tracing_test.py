@@ -0,0 +1,87 @@
+import unittest
+import os
+import tempfile
+import main
+import ray_tracing
+import columnar
+import numpy as np
+from math import asin, sin, cos, tan, radians
+
+
+class RayTracingTest(unittest.TestCase):
+
+    def test_0_constant_profile_straight_rays(self):
+        profile = ray_tracing.SoundVelocityProfile([0, 100], [1500, 1500])
+        ray_table = ray_tracing.RayTable(profile, 0.2)
+        travel_time = np.array([0.01, 0.05, 0.1234])
+        launch_angle = np.array([0, radians(30), radians(61.23)])
+        horizontal, vertical = ray_table.lookup(travel_time, launch_angle)
+        np.testing.assert_allclose(1500 * travel_time * np.sin(launch_angle), horizontal, atol=1e-3)
+        np.testing.assert_allclose(1500 * travel_time * np.cos(launch_angle), vertical, atol=1e-3)
+
+
+    def test_1_two_layers_snell_law(self):
+        """
+        1500 m/s in the first 10 meters, 1550 m/s below (the speed changes in a thin layer at 10 meters).
+        """
+        profile = ray_tracing.SoundVelocityProfile([0, 10, 10.001, 100], [1500, 1500, 1550, 1550])
+        ray_table = ray_tracing.RayTable(profile, 0.1)
+        launch_angle = radians(30)
+        refracted_angle = asin(sin(launch_angle) / 1500 * 1550)
+        first_layer_time = 10 / (1500 * cos(launch_angle))
+        travel_time = first_layer_time + 0.01
+        expected_horizontal = 10 * tan(launch_angle) + 1550 * 0.01 * sin(refracted_angle)
+        expected_vertical = 10 + 1550 * 0.01 * cos(refracted_angle)
+        horizontal, vertical = ray_table.lookup(np.array([travel_time]), np.array([launch_angle]))
+        self.assertAlmostEqual(expected_horizontal, horizontal[0], 2)
+        self.assertAlmostEqual(expected_vertical, vertical[0], 2)
+
+
+    def test_2_turned_ray_is_nan(self):
+        profile = ray_tracing.SoundVelocityProfile([0, 10, 11], [1500, 1500, 1800])
+        ray_table = ray_tracing.RayTable(profile, 0.1)
+        horizontal, vertical = ray_table.lookup(np.array([0.05, 0.05]), np.array([radians(70), radians(10)]))
+        self.assertTrue(np.isnan(horizontal[0]))
+        self.assertFalse(np.isnan(horizontal[1]))
+
+
+    def test_3_ray_table_cache(self):
+        profile = ray_tracing.SoundVelocityProfile([0, 50], [1480, 1490])
+        first_table = ray_tracing.get_ray_table(profile, 0.05)
+        self.assertIs(first_table, ray_tracing.get_ray_table(ray_tracing.SoundVelocityProfile([0, 50], [1480, 1490]), 0.08))
+        self.assertIsNot(first_table, ray_tracing.get_ray_table(profile, 0.2))
+        self.assertIsNot(first_table, ray_tracing.get_ray_table(ray_tracing.SoundVelocityProfile([0, 50], [1480, 1500]), 0.05))
+        self.assertRaises(ValueError, first_table.lookup, np.array([1.0]), np.array([0.0]))
+
+
+    def test_4_invalid_profile(self):
+        self.assertRaises(ValueError, ray_tracing.SoundVelocityProfile, [0, 10, 5], [1500, 1500, 1500])
+        self.assertRaises(ValueError, ray_tracing.SoundVelocityProfile, [0, 10], [1500, -1])
+        self.assertRaises(ValueError, ray_tracing.SoundVelocityProfile, [], [])
+
+
+    def test_5_locate_columns_constant_profile_matches_straight_rays(self):
+        sonar_columns = columnar.SonarColumns(np.array([0.0, 1.0]), np.array([0, 2, 3]), np.array([-0.8, 0.3, 1.1]), np.array([2500.0, 2100.0, 4000.0]),
+                                              {"roll": np.array([0.03, -0.02]), "pitch": np.array([0.01, 0.02]), "heading": np.array([0.5, 3.0]),
+                                               "latitude": np.array([0.796, 0.796]), "longitude": np.array([-2.14, -2.14]),
+                                               "altitude": np.array([-20.3, -20.3]), "heave": np.zeros(2), "speed": np.array([1480.0, 1480.0])})
+        expected_outcome = main.locate_columns(sonar_columns, attitude_model="rotation")
+        actual_value = main.locate_columns(sonar_columns, sound_velocity_profile=ray_tracing.SoundVelocityProfile([0], [1480]))
+        np.testing.assert_allclose(expected_outcome.X, actual_value.X, atol=1e-3)
+        np.testing.assert_allclose(expected_outcome.Y, actual_value.Y, atol=1e-3)
+        np.testing.assert_allclose(expected_outcome.altitude, actual_value.altitude, atol=1e-3)
+
+
+    def test_6_read_sound_velocity_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "svp.txt")
+            with open(filename, "w") as profile_file:
+                profile_file.write("# Depth (m)\tSpeed (m/s)\n0\t1480\n10\t1485.5\n")
+            profile = ray_tracing.load_sound_velocity_profile(filename)
+            self.assertIs(profile, ray_tracing.load_sound_velocity_profile(filename))
+        self.assertEqual([0, 10], profile.depth.tolist())
+        self.assertEqual([1480, 1485.5], profile.speed.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+
+"""
+On-disk cache of parsed inputs and located outputs. An entry is identified by a key calculated from the input files
+(their path, size and modification time, or optionally their content) and the processing parameters,
+so any change in the files or the constants leads to a new key, and the old entry is never used again.
+An entry is a directory, it contains either a set of arrays (arrays.npz) or copies of output files.
+The entries are written into a temporary directory first and renamed at the end, so a stopped run never leaves
+a half written entry. If the size of the cache is larger than the limit, the least recently used entries are removed.
+"""
+
+CACHE_DIRECTORY = ".point_locator_cache"
+MAX_CACHE_SIZE = 2 * 1024 ** 3
+ARRAYS_FILENAME = "arrays.npz"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file_content(filename):
+    """Returns the SHA-256 hash of the content of the file, read in blocks."""
+    file_hash = hashlib.sha256()
+    with open(filename, "rb") as data_file:
+        for block in iter(lambda: data_file.read(HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def describe_file(filename, hash_contents=False):
+    """
+    Describes the state of an input file for the cache key: the absolute path, the size and the modification time,
+    or the hash of the content (slower, but the key does not change if only the modification time changed).
+    A missing file is described as missing, so creating it later changes the key.
+    """
+    if not os.path.exists(filename):
+        return [os.path.abspath(filename), None]
+    if hash_contents:
+        return [os.path.abspath(filename), hash_file_content(filename)]
+    status = os.stat(filename)
+    return [os.path.abspath(filename), status.st_size, status.st_mtime_ns]
+
+
+class ResultCache:
+    """
+    The cache in the given directory, limited to max_size bytes. If hash_contents is True,
+    the keys are based on the content of the input files instead of their size and modification time.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_size=MAX_CACHE_SIZE, hash_contents=False):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_size = max_size
+        self.hash_contents = hash_contents
+
+    def get_key(self, filenames, parameters):
+        """
+        Calculates the key of the result of processing the files with the parameters
+        (any JSON serializable value, for example a dictionary of the constants).
+        """
+        description = {
+            "files": [describe_file(filename, self.hash_contents) for filename in filenames],
+            "parameters": parameters
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get_entry_directory(self, key):
+        return os.path.join(self.directory, key)
+
+    def contains(self, key):
+        return os.path.isdir(self.get_entry_directory(key))
+
+    def touch(self, key):
+        """Marks the entry as recently used."""
+        os.utime(self.get_entry_directory(key))
+
+    def load_arrays(self, key):
+        """Returns the arrays stored with the key as a dictionary, or None if they are not in the cache."""
+        if not self.contains(key):
+            return None
+        self.touch(key)
+        with np.load(os.path.join(self.get_entry_directory(key), ARRAYS_FILENAME)) as arrays:
+            return {name: arrays[name] for name in arrays.files}
+
+    def store_arrays(self, key, arrays):
+        """Stores a dictionary of arrays with the key."""
+        def write(entry_directory):
+            np.savez(os.path.join(entry_directory, ARRAYS_FILENAME), **arrays)
+        self.store(key, write)
+
+    def restore_files(self, key, directory):
+        """
+        Copies the files stored with the key into the directory. Returns False if they are not in the cache.
+        """
+        if not self.contains(key):
+            return False
+        self.touch(key)
+        os.makedirs(directory, exist_ok=True)
+        for filename in os.listdir(self.get_entry_directory(key)):
+            shutil.copyfile(os.path.join(self.get_entry_directory(key), filename), os.path.join(directory, filename))
+        return True
+
+    def store_files(self, key, filenames):
+        """Stores copies of the files with the key (only the names of the files are kept, not their directories)."""
+        def write(entry_directory):
+            for filename in filenames:
+                shutil.copyfile(filename, os.path.join(entry_directory, os.path.basename(filename)))
+        self.store(key, write)
+
+    def store(self, key, write):
+        """
+        Creates an entry: the write function is called with a temporary directory, which is renamed to the entry
+        if the writing finished. Then the old entries are evicted if the cache is too large.
+        """
+        temporary_directory = tempfile.mkdtemp(dir=self.directory, prefix=".writing-")
+        try:
+            write(temporary_directory)
+            if self.contains(key):
+                shutil.rmtree(self.get_entry_directory(key))
+            os.replace(temporary_directory, self.get_entry_directory(key))
+        except BaseException:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+            raise
+        self.evict()
+
+    def get_entries(self):
+        """Returns the key, the last usage time and the size of every entry."""
+        entries = []
+        for key in os.listdir(self.directory):
+            entry_directory = self.get_entry_directory(key)
+            if key.startswith(".") or not os.path.isdir(entry_directory):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_directory, filename)) for filename in os.listdir(entry_directory))
+            entries.append((key, os.path.getmtime(entry_directory), size))
+        return entries
+
+    def evict(self):
+        """Removes the least recently used entries until the size of the cache is within the limit."""
+        entries = sorted(self.get_entries(), key=lambda entry: entry[1])
+        total_size = sum(entry[2] for entry in entries)
+        for key, last_used, size in entries:
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(self.get_entry_directory(key), ignore_errors=True)
+            total_size -= size
+
+    def clear(self):
+        for key, last_used, size in self.get_entries():
+            shutil.rmtree(self.get_entry_directory(key), ignore_errors=True)
@@ -0,0 +1,119 @@
+import unittest
+import os
+import time
+import tempfile
+import contextlib
+import io
+from unittest import mock
+import main
+import result_cache
+import point_writer
+import fixtures
+import numpy as np
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def test_0_key_depends_on_files_and_parameters(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = result_cache.ResultCache(os.path.join(directory, "cache"))
+            filename = os.path.join(directory, "data.txt")
+            with open(filename, "w") as data_file:
+                data_file.write("1\n")
+            key = cache.get_key([filename], {"frequency": 50})
+            self.assertEqual(key, cache.get_key([filename], {"frequency": 50}))
+            self.assertNotEqual(key, cache.get_key([filename], {"frequency": 10}))
+            with open(filename, "w") as data_file:
+                data_file.write("12\n")
+            self.assertNotEqual(key, cache.get_key([filename], {"frequency": 50}))
+
+
+    def test_1_content_hash_ignores_modification_time(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = result_cache.ResultCache(os.path.join(directory, "cache"), hash_contents=True)
+            filename = os.path.join(directory, "data.txt")
+            with open(filename, "w") as data_file:
+                data_file.write("1\n")
+            key = cache.get_key([filename], None)
+            os.utime(filename, (0, 0))
+            self.assertEqual(key, cache.get_key([filename], None))
+
+
+    def test_2_store_and_load_arrays(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = result_cache.ResultCache(directory)
+            self.assertIsNone(cache.load_arrays("key"))
+            cache.store_arrays("key", {"time": np.array([1.0, 2.0]), "ping_values.roll": np.array([3.0])})
+            arrays = cache.load_arrays("key")
+            self.assertEqual([1.0, 2.0], arrays["time"].tolist())
+            self.assertEqual([3.0], arrays["ping_values.roll"].tolist())
+            self.assertEqual(["key"], os.listdir(directory))
+
+
+    def test_3_store_and_restore_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = result_cache.ResultCache(os.path.join(directory, "cache"))
+            filename = os.path.join(directory, "X.npy")
+            np.save(filename, np.array([1.0, 2.0]))
+            cache.store_files("key", [filename])
+            self.assertFalse(cache.restore_files("other key", os.path.join(directory, "output")))
+            self.assertTrue(cache.restore_files("key", os.path.join(directory, "output")))
+            self.assertEqual([1.0, 2.0], np.load(os.path.join(directory, "output", "X.npy")).tolist())
+
+
+    def test_4_least_recently_used_entries_evicted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = result_cache.ResultCache(directory, max_size=2500)
+            for key in ["first", "second"]:
+                cache.store_arrays(key, {"values": np.zeros(100)})
+                os.utime(cache.get_entry_directory(key), (time.time() - 100 + len(key), time.time() - 100 + len(key)))
+            cache.load_arrays("first")
+            cache.store_arrays("third", {"values": np.zeros(100)})
+            self.assertEqual(["first", "third"], sorted(key for key, last_used, size in cache.get_entries()))
+
+
+    def test_5_main_restores_output_from_cache(self):
+        with fixtures.temporary_survey(cache=True):
+            outputs = []
+            for run in range(2):
+                with contextlib.redirect_stdout(io.StringIO()) as output:
+                    main.main()
+                outputs.append(output.getvalue())
+                columns = point_writer.read_located_points(main.OUTPUT_DIRECTORY, mmap_mode=None)
+                if run == 0:
+                    expected_outcome = columns["X"].tolist()
+                    for filename in os.listdir(main.OUTPUT_DIRECTORY):
+                        os.remove(os.path.join(main.OUTPUT_DIRECTORY, filename))
+            sonar_columns = main.get_sonar_columns(cache=main.get_cache())
+            cached_sonar_columns = main.get_sonar_columns(cache=main.get_cache())
+        self.assertEqual(expected_outcome, columns["X"].tolist())
+        self.assertIn("restored from the cache", outputs[1])
+        self.assertEqual(sonar_columns.time.tolist(), cached_sonar_columns.time.tolist())
+        self.assertEqual(sonar_columns.ping_values["roll"].tolist(), cached_sonar_columns.ping_values["roll"].tolist())
+
+
+    def test_6_new_gnss_file_reuses_sonar_beams(self):
+        with fixtures.temporary_survey(cache=True):
+            with open(main.GNSS_FILENAME) as gnss_file:
+                gnss_lines = gnss_file.readlines()[:200]
+            altitudes = []
+            for altitude_change in [0, 1]:
+                with open(main.GNSS_FILENAME, "w") as gnss_file:
+                    gnss_file.write(gnss_lines[0])
+                    for line in gnss_lines[1:]:
+                        values = line.split()
+                        values[5] = repr(float(values[5]) + altitude_change)
+                        gnss_file.write("\t".join(values) + "\n")
+                with contextlib.redirect_stdout(io.StringIO()), \
+                        mock.patch("data_handler.read_sonar_columns", side_effect=AssertionError) if altitude_change else contextlib.nullcontext():
+                    main.main()
+                altitudes.append(point_writer.read_located_points(main.OUTPUT_DIRECTORY, mmap_mode=None)["altitude"])
+            with contextlib.redirect_stdout(io.StringIO()), mock.patch.object(main, "CACHE_DIRECTORY", None):
+                main.main()
+            expected_outcome = point_writer.read_located_points(main.OUTPUT_DIRECTORY, mmap_mode=None)["altitude"]
+        np.testing.assert_allclose(altitudes[0] + 1, altitudes[1])
+        np.testing.assert_allclose(expected_outcome, altitudes[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import numpy as np
+
+"""
+Spatial index over the located points, for quality control tools that query small areas of large surveys.
+The coordinates of different UTM zones cannot be compared, so every zone has its own uniform grid:
+the points are sorted by their grid cell, and the start of every cell is stored (like the ping offsets of the
+columnar containers), so the points of a cell are a contiguous slice. A query only checks the points of the cells
+around the queried area. The queries return the indexes of the points, in the order of the indexed data
+(for the record based output of main.get_located_points the points of all lines are counted one after the other).
+"""
+
+POINTS_PER_CELL = 16
+MAX_CELLS = 2 ** 24
+
+
+class ZoneGrid:
+    """
+    Uniform grid over the points of one UTM zone. If the cell size is not provided, it is chosen so that
+    a cell contains about POINTS_PER_CELL points on average (but the grid has at most MAX_CELLS cells).
+    """
+
+    def __init__(self, x, y, point_indexes, cell_size=None):
+        self.min_x, self.min_y = float(x.min()), float(y.min())
+        width, height = float(x.max()) - self.min_x, float(y.max()) - self.min_y
+        if cell_size is None:
+            cell_size = max(np.sqrt(max(width, 1e-3) * max(height, 1e-3) * POINTS_PER_CELL / len(x)), 1e-3)
+        cell_size = max(cell_size, np.sqrt(width * height / MAX_CELLS), 2 * max(width, height) / MAX_CELLS)
+        self.cell_size = cell_size
+        self.columns = int(width // cell_size) + 1
+        self.rows = int(height // cell_size) + 1
+        cells = self.get_rows(y) * self.columns + self.get_columns(x)
+        order = np.argsort(cells, kind="stable")
+        self.x, self.y, self.point_indexes = x[order], y[order], point_indexes[order]
+        self.cell_starts = np.searchsorted(cells[order], np.arange(self.columns * self.rows + 1))
+
+    def get_columns(self, x):
+        return np.clip(((np.asarray(x) - self.min_x) // self.cell_size).astype(np.int64), 0, self.columns - 1)
+
+    def get_rows(self, y):
+        return np.clip(((np.asarray(y) - self.min_y) // self.cell_size).astype(np.int64), 0, self.rows - 1)
+
+    def candidates(self, min_x, min_y, max_x, max_y):
+        """
+        Returns the positions (in the sorted arrays) of the points in the cells that overlap the rectangle.
+        The cells of one row are next to each other, so every row of the rectangle is one slice.
+        """
+        if max_x < self.min_x or max_y < self.min_y or min_x > self.min_x + self.columns * self.cell_size \
+                or min_y > self.min_y + self.rows * self.cell_size:
+            return np.zeros(0, dtype=np.int64)
+        first_column, last_column = self.get_columns(min_x), self.get_columns(max_x)
+        rows = np.arange(self.get_rows(min_y), self.get_rows(max_y) + 1)
+        starts = self.cell_starts[rows * self.columns + first_column]
+        ends = self.cell_starts[rows * self.columns + last_column + 1]
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts.tolist(), ends.tolist())])
+
+    def query_bbox(self, min_x, min_y, max_x, max_y):
+        positions = self.candidates(min_x, min_y, max_x, max_y)
+        inside = (self.x[positions] >= min_x) & (self.x[positions] <= max_x) & (self.y[positions] >= min_y) & (self.y[positions] <= max_y)
+        return np.sort(self.point_indexes[positions[inside]])
+
+    def query_radius(self, x, y, radius):
+        positions = self.candidates(x - radius, y - radius, x + radius, y + radius)
+        distances = np.hypot(self.x[positions] - x, self.y[positions] - y)
+        positions, distances = positions[distances <= radius], distances[distances <= radius]
+        order = np.lexsort((self.point_indexes[positions], distances))
+        return self.point_indexes[positions[order]], distances[order]
+
+    def query_nearest(self, x, y, k):
+        """
+        Searches in a growing square around the position, until it contains k points that are closer than
+        the half size of the square (points outside of the square cannot be closer than those).
+        """
+        half_size = self.cell_size
+        while True:
+            positions = self.candidates(x - half_size, y - half_size, x + half_size, y + half_size)
+            distances = np.hypot(self.x[positions] - x, self.y[positions] - y)
+            covers_grid = (x - half_size <= self.min_x and y - half_size <= self.min_y
+                           and x + half_size >= self.min_x + self.columns * self.cell_size
+                           and y + half_size >= self.min_y + self.rows * self.cell_size)
+            if covers_grid or (len(distances) >= k and np.partition(distances, k - 1)[k - 1] <= half_size):
+                order = np.lexsort((self.point_indexes[positions], distances))[:k]
+                return self.point_indexes[positions[order]], distances[order]
+            half_size *= 2
+
+
+class SpatialIndex:
+    """
+    Spatial index over points with UTM coordinates and zones (one zone string per point).
+    The queries take the zone as well, and return the indexes of the points (empty if the zone has no points).
+    """
+
+    def __init__(self, x, y, zones, cell_size=None):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        zones = np.asarray(zones)
+        if not (len(x) == len(y) == len(zones)):
+            raise ValueError('The number of coordinates and zones are different: ', len(x), ', ', len(y), ', ', len(zones))
+        self.point_count = len(x)
+        self.grids = {}
+        for zone in np.unique(zones).tolist():
+            point_indexes = np.flatnonzero(zones == zone)
+            self.grids[zone] = ZoneGrid(x[point_indexes], y[point_indexes], point_indexes, cell_size)
+
+    @classmethod
+    def from_located_points(cls, located_points, cell_size=None):
+        """Creates the index over a columnar.LocatedPoints container, the zone of each ping is used for its points."""
+        return cls(located_points.X, located_points.Y, np.repeat(located_points.zone, np.diff(located_points.ping_offsets)), cell_size)
+
+    @classmethod
+    def from_records(cls, all_located_points, cell_size=None):
+        """Creates the index over the output of main.get_located_points."""
+        points = [point for line in all_located_points for point in line["points"]]
+        return cls([float(point["X"]) for point in points], [float(point["Y"]) for point in points],
+                   [point["zone"] for point in points], cell_size)
+
+    def query_bbox(self, zone, min_x, min_y, max_x, max_y):
+        """Returns the indexes of the points inside the rectangle (including its border), in increasing order."""
+        if zone not in self.grids:
+            return np.zeros(0, dtype=np.int64)
+        return self.grids[zone].query_bbox(min_x, min_y, max_x, max_y)
+
+    def query_radius(self, zone, x, y, radius):
+        """Returns the indexes and the distances of the points within the radius, ordered by the distance."""
+        if zone not in self.grids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return self.grids[zone].query_radius(x, y, radius)
+
+    def query_nearest(self, zone, x, y, k=1):
+        """Returns the indexes and the distances of the k nearest points (less if the zone has less points)."""
+        if k < 1:
+            raise ValueError('Invalid number of neighbours: ', k)
+        if zone not in self.grids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        return self.grids[zone].query_nearest(x, y, k)
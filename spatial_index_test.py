@@ -0,0 +1,70 @@
+import unittest
+import spatial_index
+import columnar
+import numpy as np
+
+
+def create_test_points(count=2000, seed=0):
+    """Random points of two zones, the second zone has far fewer points."""
+    generator = np.random.default_rng(seed)
+    x = generator.uniform(500000, 501000, count)
+    y = generator.uniform(5000000, 5000500, count)
+    zones = np.where(np.arange(count) % 10 == 0, "U11", "U10")
+    return x, y, zones
+
+
+class SpatialIndexTest(unittest.TestCase):
+
+    def test_0_query_bbox_matches_brute_force(self):
+        x, y, zones = create_test_points()
+        index = spatial_index.SpatialIndex(x, y, zones)
+        for zone in ["U10", "U11"]:
+            expected_outcome = np.flatnonzero((zones == zone) & (x >= 500100) & (x <= 500250) & (y >= 5000200) & (y <= 5000230))
+            actual_value = index.query_bbox(zone, 500100, 5000200, 500250, 5000230)
+            self.assertEqual(expected_outcome.tolist(), actual_value.tolist())
+
+
+    def test_1_query_radius_matches_brute_force(self):
+        x, y, zones = create_test_points()
+        index = spatial_index.SpatialIndex(x, y, zones, cell_size=7)
+        distances = np.hypot(x - 500500, y - 5000250)
+        expected_outcome = np.flatnonzero((zones == "U10") & (distances <= 40))
+        actual_indexes, actual_distances = index.query_radius("U10", 500500, 5000250, 40)
+        self.assertEqual(sorted(expected_outcome.tolist()), sorted(actual_indexes.tolist()))
+        self.assertEqual(sorted(actual_distances.tolist()), actual_distances.tolist())
+
+
+    def test_2_query_nearest_matches_brute_force(self):
+        x, y, zones = create_test_points()
+        index = spatial_index.SpatialIndex(x, y, zones)
+        for zone, position in [("U10", (500001, 5000499)), ("U11", (500500, 5000250)), ("U11", (400000, 5000250))]:
+            distances = np.where(zones == zone, np.hypot(x - position[0], y - position[1]), np.inf)
+            expected_outcome = np.argsort(distances, kind="stable")[:5]
+            actual_indexes, actual_distances = index.query_nearest(zone, position[0], position[1], 5)
+            self.assertEqual(expected_outcome.tolist(), actual_indexes.tolist())
+            np.testing.assert_allclose(distances[expected_outcome], actual_distances)
+
+
+    def test_3_query_nearest_more_than_available(self):
+        index = spatial_index.SpatialIndex([1.0, 2.0, 3.0], [1.0, 1.0, 1.0], ["U10", "U10", "U11"])
+        actual_indexes, actual_distances = index.query_nearest("U10", 0, 1, 5)
+        self.assertEqual([0, 1], actual_indexes.tolist())
+        self.assertEqual(0, len(index.query_nearest("V10", 0, 1)[0]))
+        self.assertEqual(0, len(index.query_bbox("U10", 10, 10, 20, 20)))
+
+
+    def test_4_from_located_points_and_records(self):
+        located_points = columnar.LocatedPoints(np.array([0.0, 1.0]), np.array([0, 2, 3]), np.array([1.0, 2.0, 3.0]), np.array([1.0, 2.0, 3.0]),
+                                                np.zeros(3), np.array(["U10", "U11"]))
+        for index in [spatial_index.SpatialIndex.from_located_points(located_points),
+                      spatial_index.SpatialIndex.from_records(located_points.to_records())]:
+            self.assertEqual([0, 1], index.query_bbox("U10", 0, 0, 5, 5).tolist())
+            self.assertEqual([2], index.query_bbox("U11", 0, 0, 5, 5).tolist())
+
+
+    def test_5_different_lengths(self):
+        self.assertRaises(ValueError, spatial_index.SpatialIndex, [1.0, 2.0], [1.0], ["U10", "U10"])
+
+
+if __name__ == '__main__':
+    unittest.main()
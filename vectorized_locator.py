@@ -0,0 +1,131 @@
+import numpy as np
+
+"""
+Vectorized point locator. It calculates the same values as the Decimal based functions of the main module
+(distance, horizontal and vertical distance, altitude of the point), but for every beam of every ping at once,
+using float64 array operations instead of a Python loop.
+The input is a columnar.SonarColumns container, extended with the PING_HEADERS values.
+Besides the original ("legacy") formulas, the "rotation" attitude model is available: a rotation matrix is calculated
+once for every ping from the roll, pitch and heading, and it is applied to all the beam vectors of the ping,
+which gives the full 3D position of the points (optionally with heave and lever arm corrections).
+"""
+
+PING_HEADERS = ["roll", "pitch", "heading", "altitude", "heave", "speed"]
+ATTITUDE_MODELS = ["legacy", "rotation"]
+
+
+def calculate_distances(sample_index, speed_of_sound, sample_frequency, travel_time=None):
+    """
+    Vectorized version of main.calculate_distance, speed_of_sound has to be already expanded to one value per beam.
+    If the two way travel times (sample_index / sample_frequency) are already known, they are used,
+    the result is exactly the same. Raises the same exception as the original function if any of the values are invalid.
+    """
+    invalid = ~((sample_index > 0) & (speed_of_sound > 0))
+    if invalid.any():
+        first_invalid = np.argmax(invalid)
+        raise ValueError('Cannot calculate distance, invalid data: ', sample_index[first_invalid], ', ', speed_of_sound[first_invalid])
+    if travel_time is None:
+        travel_time = sample_index / sample_frequency
+    return travel_time * speed_of_sound / 2
+
+
+def locate_beams(columns, utm_base_x, utm_base_y, sample_frequency):
+    """
+    Calculates the UTM coordinates and the altitude of every beam.
+    The per ping values (attitude, position, speed of sound) are repeated for each beam of the ping,
+    then the same formulas are used as in the main module.
+    Returns three arrays (X, Y, altitude), with one element per beam.
+    """
+    roll = columns.repeat_for_beams(columns.ping_values["roll"])
+    pitch = columns.repeat_for_beams(columns.ping_values["pitch"])
+    heading = columns.repeat_for_beams(columns.ping_values["heading"])
+    speed = columns.repeat_for_beams(columns.ping_values["speed"])
+    angle = columns.angle
+
+    distance = calculate_distances(columns.sample_index, speed, sample_frequency, columns.travel_time)
+    sin_heading = np.sin(heading)
+    cos_heading = np.cos(heading)
+    sin_pitch = np.sin(pitch)
+    sin_beam = np.sin(angle + roll)
+
+    horizontal_distance = distance * ((-1) * sin_beam * cos_heading + sin_pitch * sin_heading)
+    vertical_distance = distance * (sin_beam * sin_heading + sin_pitch * cos_heading)
+    utm_x = columns.repeat_for_beams(utm_base_x) + horizontal_distance
+    utm_y = columns.repeat_for_beams(utm_base_y) + vertical_distance
+    altitude = columns.repeat_for_beams(columns.ping_values["altitude"]) - distance * np.cos(angle)
+    return utm_x, utm_y, altitude
+
+
+
+def rotation_matrices(roll, pitch, heading):
+    """
+    Calculates the attitude rotation matrix of every ping: heading * pitch * roll (rotations around the down,
+    the starboard and the forward axis), which rotates a vector from the vessel frame (forward, starboard, down)
+    into the local frame (north, east, down). Returns an array of shape (number of pings, 3, 3).
+    """
+    sin_roll, cos_roll = np.sin(roll), np.cos(roll)
+    sin_pitch, cos_pitch = np.sin(pitch), np.cos(pitch)
+    sin_heading, cos_heading = np.sin(heading), np.cos(heading)
+    matrices = np.empty((len(roll), 3, 3))
+    matrices[:, 0, 0] = cos_heading * cos_pitch
+    matrices[:, 0, 1] = cos_heading * sin_pitch * sin_roll - sin_heading * cos_roll
+    matrices[:, 0, 2] = cos_heading * sin_pitch * cos_roll + sin_heading * sin_roll
+    matrices[:, 1, 0] = sin_heading * cos_pitch
+    matrices[:, 1, 1] = sin_heading * sin_pitch * sin_roll + cos_heading * cos_roll
+    matrices[:, 1, 2] = sin_heading * sin_pitch * cos_roll - cos_heading * sin_roll
+    matrices[:, 2, 0] = -sin_pitch
+    matrices[:, 2, 1] = cos_pitch * sin_roll
+    matrices[:, 2, 2] = cos_pitch * cos_roll
+    return matrices
+
+
+def bend_rays(directions, sample_index, sample_frequency, ray_table):
+    """
+    Calculates the offsets of the beams (north, east, down) with ray tracing instead of straight rays.
+    The direction of each beam (a unit vector in the local frame) gives the launch angle from the vertical
+    and the azimuth, the one-way travel time comes from the sample index, the offsets are looked up in the ray table.
+    """
+    launch_angle = np.arccos(np.clip(directions[:, 2], -1, 1))
+    horizontal, vertical = ray_table.lookup(sample_index / sample_frequency / 2, launch_angle)
+    horizontal_length = np.hypot(directions[:, 0], directions[:, 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(horizontal_length > 0, horizontal / horizontal_length, 0)
+    return np.stack([directions[:, 0] * scale, directions[:, 1] * scale, vertical], axis=1)
+
+
+def locate_beams_rotated(columns, utm_base_x, utm_base_y, sample_frequency, lever_arm=None, heave_correction=False, ray_table=None):
+    """
+    Calculates the UTM coordinates and the altitude of every beam with the rotation attitude model.
+    The beam vector in the vessel frame is (0, -sin(angle), cos(angle)) * distance (the angles are positive
+    to port, the same as in the formulas of the main module), and it is rotated with the matrix of its ping.
+    The lever arm is the position of the sonar compared to the GNSS position (forward, starboard, down in meters),
+    it is rotated once per ping. If heave_correction is set, the heave (positive upwards) is added to the altitude.
+    With zero roll and pitch the result is the same as the result of locate_beams.
+    If a ray table (see ray_tracing.RayTable) is provided, the rays are bent according to its sound velocity profile,
+    and the speed of sound values of the pings are not used.
+    Returns three arrays (X, Y, altitude), with one element per beam.
+    """
+    matrices = rotation_matrices(columns.ping_values["roll"], columns.ping_values["pitch"], columns.ping_values["heading"])
+    ping_indexes = columns.repeat_for_beams(np.arange(len(columns)))
+    if ray_table is None:
+        speed = columns.repeat_for_beams(columns.ping_values["speed"])
+        distance = calculate_distances(columns.sample_index, speed, sample_frequency, columns.travel_time)
+        beam_vectors = np.stack([np.zeros_like(distance), (-1) * distance * np.sin(columns.angle), distance * np.cos(columns.angle)], axis=1)
+        north_east_down = np.einsum("bij,bj->bi", matrices[ping_indexes], beam_vectors)
+    else:
+        if (columns.sample_index <= 0).any():
+            raise ValueError('Cannot calculate distance, invalid sample index: ', columns.sample_index.min())
+        beam_directions = np.stack([np.zeros(len(columns.angle)), (-1) * np.sin(columns.angle), np.cos(columns.angle)], axis=1)
+        directions = np.einsum("bij,bj->bi", matrices[ping_indexes], beam_directions)
+        north_east_down = bend_rays(directions, columns.sample_index, sample_frequency, ray_table)
+
+    sonar_altitude = np.asarray(columns.ping_values["altitude"], dtype=np.float64)
+    if heave_correction:
+        sonar_altitude = sonar_altitude + columns.ping_values["heave"]
+    ping_offsets = np.zeros((len(columns), 3))
+    if lever_arm is not None:
+        ping_offsets = matrices @ np.asarray(lever_arm, dtype=np.float64)
+    utm_x = columns.repeat_for_beams(utm_base_x + ping_offsets[:, 1]) + north_east_down[:, 1]
+    utm_y = columns.repeat_for_beams(utm_base_y + ping_offsets[:, 0]) + north_east_down[:, 0]
+    altitude = columns.repeat_for_beams(sonar_altitude - ping_offsets[:, 2]) - north_east_down[:, 2]
+    return utm_x, utm_y, altitude
@@ -0,0 +1,148 @@
+import unittest
+import main
+import fixtures
+import vectorized_locator
+import columnar
+import instrumentation
+import numpy as np
+from decimal import Decimal
+
+
+def create_test_data():
+    """
+    Creates a small extended sonar dataset, similar to the output of main.get_sonar_data.
+    The second line has no angle/sample index pairs, to check the handling of empty pings.
+    """
+    data = []
+    for time, pairs in [(0, [(-1, 3000), (0, 2500), (1, 3000)]), (1, []), (2, [(0.5, 2000), (-0.5, 2100)])]:
+        data.append({
+            "time": Decimal(time),
+            "angle_index_pairs": [{"angle": Decimal(angle), "sample_index": Decimal(sample_index)} for angle, sample_index in pairs],
+            "roll": Decimal("0.03"),
+            "pitch": Decimal("0.008") * (time + 1),
+            "heading": Decimal("0.54") + Decimal(time) / 10,
+            "latitude": Decimal("0.796065554459841"),
+            "longitude": Decimal("-2.14037505126519"),
+            "altitude": Decimal("-20.3"),
+            "heave": Decimal("0.003"),
+            "speed": Decimal("1434.07")
+        })
+    return data
+
+
+class VectorizedLocatorTest(unittest.TestCase):
+
+    def test_0_calculate_distances_matches_decimal(self):
+        sample_index = np.array([10.0, 5.0])
+        speed_of_sound = np.array([10.0, 20.0])
+        expected_outcome = [float(main.calculate_distance(Decimal(10), Decimal(10))), float(main.calculate_distance(Decimal(5), Decimal(20)))]
+        actual_value = vectorized_locator.calculate_distances(sample_index, speed_of_sound, main.SAMPLE_FREQUENCY)
+        np.testing.assert_allclose(expected_outcome, actual_value)
+
+
+    def test_1_calculate_distances_negative_sample_index(self):
+        sample_index = np.array([10.0, -5.0])
+        speed_of_sound = np.array([10.0, 10.0])
+        self.assertRaises(ValueError, vectorized_locator.calculate_distances, sample_index, speed_of_sound, main.SAMPLE_FREQUENCY)
+
+
+    def test_2_numpy_engine_matches_decimal_engine(self):
+        expected_outcome = main.get_located_points([line for line in create_test_data() if line["angle_index_pairs"]])
+        actual_value = main.get_located_points([line for line in create_test_data() if line["angle_index_pairs"]], engine="numpy")
+        self.assertEqual(len(expected_outcome), len(actual_value))
+        for expected_line, actual_line in zip(expected_outcome, actual_value):
+            self.assertEqual(expected_line["time"], actual_line["time"])
+            for expected_point, actual_point in zip(expected_line["points"], actual_line["points"]):
+                self.assertEqual(expected_point["zone"], actual_point["zone"])
+                for key in ["X", "Y", "altitude"]:
+                    self.assertAlmostEqual(float(expected_point[key]), actual_point[key], 6)
+
+
+    def test_3_numpy_engine_empty_ping(self):
+        actual_value = main.get_located_points(create_test_data(), engine="numpy")
+        self.assertEqual([], actual_value[1]["points"])
+
+
+    def test_4_unknown_engine(self):
+        self.assertRaises(ValueError, main.get_located_points, create_test_data(), "unknown")
+
+
+    def test_5_iterate_located_points_chunks(self):
+        expected_outcome = main.get_located_points(create_test_data(), engine="numpy")
+        actual_value = list(main.iterate_located_points(iter(create_test_data()), engine="numpy", chunk_size=2))
+        self.assertEqual(expected_outcome, actual_value)
+
+
+    def test_6_columnar_pipeline_matches_record_pipeline(self):
+        with fixtures.temporary_survey():
+            for alignment in main.ALIGNMENTS:
+                expected_outcome = main.get_located_points(main.get_sonar_data(alignment))
+                actual_value = main.locate_columns(main.get_sonar_columns(alignment)).to_records()
+                for expected_line, actual_line in zip(expected_outcome, actual_value):
+                    for expected_point, actual_point in zip(expected_line["points"], actual_line["points"]):
+                        self.assertAlmostEqual(float(expected_point["X"]), actual_point["X"], 6)
+                        self.assertAlmostEqual(float(expected_point["altitude"]), actual_point["altitude"], 6)
+
+
+    def test_7_parallel_engines_match_sequential(self):
+        data = create_test_data() * 3
+        for engine in main.ENGINES:
+            expected_outcome = main.get_located_points([line for line in data if line["angle_index_pairs"]], engine)
+            actual_value = main.get_located_points([line for line in data if line["angle_index_pairs"]], engine, workers=2)
+            self.assertEqual(expected_outcome, actual_value)
+
+
+    def test_8_locate_columns_parallel(self):
+        sonar_columns = columnar.SonarColumns.from_records(create_test_data() * 3)
+        expected_outcome = main.locate_columns(sonar_columns).to_records()
+        actual_value = main.locate_columns_parallel(sonar_columns, workers=2, chunk_size=2).to_records()
+        self.assertEqual(expected_outcome, actual_value)
+
+
+    def test_9_get_located_points_metrics(self):
+        for engine, stages in [("decimal", ["projection", "trigonometric values", "beam loop"]), ("numpy", ["projection", "beam calculation"])]:
+            metrics = instrumentation.Metrics()
+            main.get_located_points(create_test_data()[:1], engine, metrics=metrics)
+            for stage in stages:
+                self.assertIn(stage, metrics.records)
+            self.assertEqual(3, metrics.records[stages[-1]]["items"])
+
+
+    def test_10_rotation_matrices_orthonormal(self):
+        matrices = vectorized_locator.rotation_matrices(np.array([0.1, -0.3]), np.array([0.05, 0.2]), np.array([1.0, 4.0]))
+        for matrix in matrices:
+            np.testing.assert_allclose(np.eye(3), matrix @ matrix.T, atol=1e-12)
+            self.assertAlmostEqual(1, np.linalg.det(matrix))
+        np.testing.assert_allclose(np.eye(3), vectorized_locator.rotation_matrices(np.zeros(1), np.zeros(1), np.zeros(1))[0])
+
+
+    def test_11_rotation_model_matches_legacy_without_roll_and_pitch(self):
+        data = create_test_data()
+        for data_line in data:
+            data_line["roll"] = Decimal(0)
+            data_line["pitch"] = Decimal(0)
+        sonar_columns = columnar.SonarColumns.from_records(data)
+        expected_outcome = main.locate_columns(sonar_columns, attitude_model="legacy")
+        actual_value = main.locate_columns(sonar_columns, attitude_model="rotation")
+        np.testing.assert_allclose(expected_outcome.X, actual_value.X)
+        np.testing.assert_allclose(expected_outcome.Y, actual_value.Y)
+        np.testing.assert_allclose(expected_outcome.altitude, actual_value.altitude)
+
+
+    def test_12_rotation_model_lever_arm_and_heave(self):
+        sonar_columns = columnar.SonarColumns(np.array([0.0]), np.array([0, 1]), np.array([0.0]), np.array([2 * main.SAMPLE_FREQUENCY / 1500]),
+                                              {"roll": np.zeros(1), "pitch": np.zeros(1), "heading": np.array([np.pi / 2]),
+                                               "altitude": np.array([-10.0]), "heave": np.array([0.5]), "speed": np.array([1500.0])})
+        utm_x, utm_y, altitude = vectorized_locator.locate_beams_rotated(sonar_columns, np.array([100.0]), np.array([200.0]), main.SAMPLE_FREQUENCY,
+                                                                         lever_arm=[2, 0, 1], heave_correction=True)
+        np.testing.assert_allclose([102.0], utm_x)
+        np.testing.assert_allclose([200.0], utm_y, atol=1e-12)
+        np.testing.assert_allclose([-11.5], altitude)
+
+
+    def test_13_unknown_attitude_model(self):
+        self.assertRaises(ValueError, main.locate_columns, columnar.SonarColumns.from_records(create_test_data()), None, "unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()